@@ -1,22 +1,25 @@
 # auth.py
-import os, json
+import threading
 from flask import Blueprint, render_template, request, redirect, url_for, session
 from markupsafe import escape
+from user_store import UserStore
 
 auth_bp = Blueprint('auth_bp', __name__, url_prefix='/auth')
 
-USERDATA_FILE = 'users.json'  # In production, store in a real DB
+USERDATA_FILE = 'users.json'  # legacy plaintext file, imported into USERS_DB once and removed
+USERS_DB = 'users.db'
 
-def load_users():
-    """Load user database from JSON file."""
-    if not os.path.exists(USERDATA_FILE):
-        return {}
-    with open(USERDATA_FILE,'r',encoding='utf-8') as f:
-        return json.load(f)
+_users = None
+_users_lock = threading.Lock()
 
-def save_users(users):
-    with open(USERDATA_FILE,'w',encoding='utf-8') as f:
-        json.dump(users,f,indent=2)
+def get_users():
+    """User store (SQLite, hashed passwords), created on first use."""
+    global _users
+    if _users is None:
+        with _users_lock:
+            if _users is None:
+                _users = UserStore(USERS_DB, legacy_json=USERDATA_FILE)
+    return _users
 
 @auth_bp.route('/', methods=['GET'])
 def auth_index():
@@ -31,13 +34,10 @@ def register():
         return render_template('auth.html',
                                message="Username/Password cannot be empty",
                                session=session)
-    users = load_users()
-    if username in users:
+    if not get_users().create(username, password):
         return render_template('auth.html',
                                message="Username already exists!",
                                session=session)
-    users[username] = {"password": password}
-    save_users(users)
     return render_template('auth.html', message="Registered OK! You can login now.", session=session)
 
 @auth_bp.route('/login', methods=['GET', 'POST'])
@@ -47,9 +47,7 @@ def login():
 
     username = request.form.get('username','').strip()
     password = request.form.get('password','').strip()
-    users = load_users()
-
-    if username in users and users[username]["password"] == password:
+    if get_users().verify(username, password):
         session['user_id'] = username
         # После логина перенаправляем в /account
         return redirect(url_for('account_bp.account'))
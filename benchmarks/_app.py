@@ -0,0 +1,26 @@
+"""Общие помощники для бенчмарков: загрузка приложения из "import random.py"."""
+import os
+import sys
+import importlib.util
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def load_app():
+    """Flask-приложение проекта (модуль с пробелом в имени грузим через importlib)."""
+    os.chdir(ROOT)
+    spec = importlib.util.spec_from_file_location("main_app", os.path.join(ROOT, "import random.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.app
+
+
+def use_calendar_dir(backend, tmpdir):
+    """Направляем календарь во временную папку (чтобы не трогать calendar.db проекта)."""
+    import mycalendar
+    mycalendar.CALENDAR_BACKEND = backend
+    mycalendar.CALENDAR_DB = os.path.join(tmpdir, "calendar.db")
+    mycalendar.EVENTS_FILE = os.path.join(tmpdir, "calendar_events.json")
+    mycalendar._store = None
+    return mycalendar.get_store()
@@ -0,0 +1,66 @@
+"""
+Пропускная способность логина при 100k пользователей:
+старый users.json (читаем весь файл на каждый вход) против UserStore.
+Для UserStore показываем, сколько стоит само хэширование при разной
+стоимости PBKDF2 — это и есть ручка "скорость логина vs стойкость".
+
+Запуск из корня проекта:
+    python benchmarks/bench_auth_login.py
+"""
+import os
+import sys
+import json
+import time
+import random
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from user_store import UserStore, hash_password
+
+N_USERS = 100_000
+LOGINS = 200
+
+
+def legacy_login(path, username, password):
+    with open(path, 'r', encoding='utf-8') as f:
+        users = json.load(f)
+    return username in users and users[username]["password"] == password
+
+
+def rate(fn, names, password):
+    t0 = time.perf_counter()
+    for name in names:
+        assert fn(name, password)
+    return len(names) / (time.perf_counter() - t0)
+
+
+def main():
+    names = [f"user{i}" for i in range(N_USERS)]
+    sample = random.sample(names, LOGINS)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        legacy = os.path.join(tmpdir, "users.json")
+        with open(legacy, 'w', encoding='utf-8') as f:
+            json.dump({n: {"password": "secret"} for n in names}, f)
+        print(f"users: {N_USERS}")
+        print(f"  legacy users.json:           {rate(lambda u, p: legacy_login(legacy, u, p), sample[:20], 'secret'):>9.1f} logins/s")
+
+        for iterations, count in ((1_000, LOGINS), (100_000, 20), (600_000, 5)):
+            store = UserStore(os.path.join(tmpdir, f"users_{iterations}.db"), iterations=iterations)
+            # одинаковый хэш для всех — нас интересует поиск, а не уникальность соли
+            pwhash = hash_password("secret", iterations)
+            with store._conn() as conn:
+                conn.executemany("INSERT INTO users(username, password_hash) VALUES (?, ?)",
+                                 ((n, pwhash) for n in names))
+            cold = rate(store.verify, sample[:count], "secret")
+            warm = rate(store.verify, sample[:count], "secret")
+            t0 = time.perf_counter()
+            for n in sample:
+                store._get_hash(n)
+            lookup_us = (time.perf_counter() - t0) / len(sample) * 1e6
+            print(f"  UserStore pbkdf2 {iterations:>7} it: {cold:>9.1f} logins/s cold, "
+                  f"{warm:>9.1f} warm, lookup {lookup_us:.1f} us")
+
+
+if __name__ == "__main__":
+    main()
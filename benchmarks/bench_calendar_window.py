@@ -0,0 +1,50 @@
+"""
+Время рендера /calendar/ в зависимости от размера истории дедлайнов.
+Благодаря индексу по дате и окну from/to/limit оно не должно расти.
+
+Запуск из корня проекта:
+    python benchmarks/bench_calendar_window.py
+"""
+import os
+import sys
+import time
+import random
+import datetime
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from _app import load_app, use_calendar_dir
+
+REPEAT = 20
+
+
+def main():
+    app = load_app()
+    today = datetime.date.today()
+    print(f"{'deadlines':>10} {'render, ms':>11} {'api, ms':>8}")
+    for n in (1_000, 10_000, 50_000):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            store = use_calendar_dir("sqlite", tmpdir)
+            conn = store._conn()
+            conn.execute("BEGIN")
+            for i in range(n):
+                # в основном прошлые дедлайны, немного будущих
+                day = today + datetime.timedelta(days=random.randint(-20 * 365, 60))
+                store._insert(conn, {"id": None, "isCategory": False, "date": day.isoformat(),
+                                     "title": f"d{i}", "color": "#000", "subtasks": [],
+                                     "category_id": 0})
+            conn.execute("COMMIT")
+            client = app.test_client()
+            timings = []
+            for url in ("/calendar/", "/calendar/api/deadlines?limit=100"):
+                client.get(url)
+                t0 = time.perf_counter()
+                for _ in range(REPEAT):
+                    assert client.get(url).status_code == 200
+                timings.append((time.perf_counter() - t0) / REPEAT * 1000)
+            print(f"{n:>10} {timings[0]:>11.1f} {timings[1]:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Бенчмарк выбора неправильных вариантов для multiple choice:
+старый способ (список всего словаря на каждый пропуск) против DistractorSampler.
+Корректность выбора (правильное слово не попадает в варианты) —
+tests/test_quiz_engine.py.
+
+Запуск из корня проекта:
+    python benchmarks/bench_distractors.py
+"""
+import os
+import sys
+import time
+import random
+import string
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from quiz_engine import DistractorSampler
+
+LEGACY_SAMPLE = 300  # старый способ квадратичный — меряем на части пропусков
+
+
+def make_vocab(n, seed=0):
+    rnd = random.Random(seed)
+    vocab = set()
+    while len(vocab) < n:
+        w = "".join(rnd.choice(string.ascii_lowercase) for _ in range(rnd.randint(2, 12)))
+        vocab.add(w.capitalize() if rnd.random() < 0.2 else w)
+    return list(vocab)
+
+
+def legacy_wrongs(unique_words, correct):
+    inc = [w for w in unique_words if w != correct]
+    if len(inc) > 2:
+        return random.sample(inc, 2)
+    return inc[:2]
+
+
+def main():
+    print(f"{'vocab':>7} {'gaps':>7} {'legacy, s':>10} {'sampler, s':>11} {'length, s':>10}")
+    for n in (1_000, 10_000, 50_000):
+        vocab = make_vocab(n)
+        unique_words = set(vocab)
+        # документ, где каждое слово встречается ~2 раза, скрыто 50%
+        gaps = [random.choice(vocab) for _ in range(n)]
+
+        t0 = time.perf_counter()
+        for correct in gaps[:LEGACY_SAMPLE]:
+            legacy_wrongs(unique_words, correct)
+        t_legacy = (time.perf_counter() - t0) * len(gaps) / min(len(gaps), LEGACY_SAMPLE)
+
+        timings = []
+        for prefer in (None, "length"):
+            t0 = time.perf_counter()
+            sampler = DistractorSampler(vocab, prefer=prefer)
+            for correct in gaps:
+                sampler.sample(correct, 2)
+            timings.append(time.perf_counter() - t0)
+        print(f"{n:>7} {len(gaps):>7} {t_legacy:>10.3f} {timings[0]:>11.3f} {timings[1]:>10.3f}")
+    print("(legacy time extrapolated from the first %d gaps)" % LEGACY_SAMPLE)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Импорт квиза из таблицы: pandas.read_excel + iterrows (как было) против
+потокового импорта (openpyxl read_only / csv). Время и пик памяти
+(tracemalloc) на банке вопросов до 50k строк; заодно проверка ошибок.
+
+Запуск из корня проекта:
+    python benchmarks/bench_excel_import.py
+"""
+import io
+import os
+import sys
+import csv
+import time
+import random
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from openpyxl import Workbook
+from markupsafe import escape
+
+from quiz_import import import_quiz, QuizImportError, QUIZ_COLUMNS
+
+try:
+    import pandas as pd
+except ImportError:
+    pd = None
+
+
+def make_rows(n, seed=0):
+    rnd = random.Random(seed)
+    for i in range(n):
+        yield (f"Question {i}: what is {rnd.randint(1, 99)} + {rnd.randint(1, 99)}?",
+               rnd.randint(2, 198), f"wrong {i}a", f"wrong {i}b", rnd.random())
+
+
+def make_xlsx(n):
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
+    ws.append(QUIZ_COLUMNS)
+    for row in make_rows(n):
+        ws.append(row)
+    buf = io.BytesIO()
+    wb.save(buf)
+    return buf.getvalue()
+
+
+def make_csv(n):
+    text = io.StringIO()
+    writer = csv.writer(text)
+    writer.writerow(QUIZ_COLUMNS)
+    writer.writerows(make_rows(n))
+    return text.getvalue().encode("utf-8")
+
+
+def legacy_import(data):
+    """Исходный вариант из quizz.quizz — для сравнения."""
+    df = pd.read_excel(io.BytesIO(data))
+    quiz_questions = []
+    for idx, row in df.iterrows():
+        question = row['Question']
+        correct = row['Correct']
+        options = [correct, row['Option1'], row['Option2'], row['Option3']]
+        random.shuffle(options)
+        question_html = f'<div class="quiz-question"><p>{question}</p>'
+        for opt in options:
+            question_html += f'<button class="mc-option-btn" data-correct="{escape(correct)}">{opt}</button>'
+        question_html += '</div>'
+        quiz_questions.append(question_html)
+    return quiz_questions
+
+
+def measure(run):
+    """Время — отдельным прогоном: tracemalloc сильно замедляет код."""
+    t0 = time.perf_counter()
+    out = run()
+    elapsed = time.perf_counter() - t0
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return out, elapsed, peak / 2**20
+
+
+def check_validation():
+    bad = b"Question,Correct,Option1,Option2,Option3\nq1,a,b,c,d\nq2,,b,c,d\n\nq4,a,b,,\n"
+    try:
+        import_quiz(io.BytesIO(bad), ".csv")
+    except QuizImportError as e:
+        print("row errors:", e)
+    try:
+        import_quiz(io.BytesIO(b"Question,Answer\nq,a\n"), ".csv")
+    except QuizImportError as e:
+        print("header error:", e)
+
+
+def main():
+    check_validation()
+    print(f"{'rows':>7} {'format':>6} {'time, s':>8} {'peak, MB':>9}")
+    for n in (1_000, 10_000, 50_000):
+        xlsx, csv_data = make_xlsx(n), make_csv(n)
+        if pd is not None:
+            out, t, peak = measure(lambda: legacy_import(xlsx))
+            print(f"{n:>7} {'pandas':>6} {t:>8.2f} {peak:>9.1f}")
+        out, t, peak = measure(lambda: import_quiz(io.BytesIO(xlsx), ".xlsx"))
+        assert len(out) == n
+        print(f"{n:>7} {'xlsx':>6} {t:>8.2f} {peak:>9.1f}")
+        out, t, peak = measure(lambda: import_quiz(io.BytesIO(csv_data), ".csv"))
+        assert len(out) == n
+        print(f"{n:>7} {'csv':>6} {t:>8.2f} {peak:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
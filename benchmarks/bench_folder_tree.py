@@ -0,0 +1,100 @@
+"""
+Move-модалка (/library/all_folders_json): старый рекурсивный обход
+против дерева папок из индекса. Первый ответ 200, повторные — 304 по ETag.
+Что после create/move/rename/delete дерево совпадает с полным обходом
+диска, проверяет tests/test_library_index.py.
+
+Запуск из корня проекта:
+    python benchmarks/bench_folder_tree.py
+"""
+import os
+import sys
+import time
+import shutil
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from _app import load_app
+
+from library_cache import is_hidden_entry
+
+BENCH_USER = "_bench_folder_tree"
+REPEAT = 20
+
+
+def legacy_gather_all_folders(base_dir, rel=""):
+    """Исходный обход (listdir + isdir на каждую запись) — для сравнения."""
+    results = []
+    folder_path = os.path.join(base_dir, rel)
+    if os.path.isdir(folder_path):
+        for entry in os.listdir(folder_path):
+            if is_hidden_entry(entry):
+                continue
+            full = os.path.join(folder_path, entry)
+            if os.path.isdir(full):
+                sub_rel = os.path.join(rel, entry).replace("\\", "/")
+                results.append(sub_rel if sub_rel else ".")
+                results.extend(legacy_gather_all_folders(base_dir, sub_rel))
+    return results
+
+
+def make_tree(root, n_folders, files_per_folder=3):
+    """Дерево примерно из n_folders папок: по 10 подпапок на уровень."""
+    made, queue = 0, [""]
+    while made < n_folders:
+        parent = queue.pop(0)
+        for i in range(10):
+            if made >= n_folders:
+                break
+            rel = os.path.join(parent, f"dir{made}")
+            os.makedirs(os.path.join(root, rel))
+            for j in range(files_per_folder):
+                with open(os.path.join(root, rel, f"f{j}.txt"), "w") as f:
+                    f.write("x")
+            queue.append(rel)
+            made += 1
+
+
+def client_for(app):
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess["user_id"] = BENCH_USER
+    return client
+
+
+def main():
+    app = load_app()
+    root = os.path.join("static", "library", BENCH_USER)
+    try:
+        shutil.rmtree(root, ignore_errors=True)
+        print(f"{'folders':>8} {'legacy, ms':>11} {'200, ms':>8} {'304, ms':>8}")
+        for n in (10, 1_000, 10_000):
+            shutil.rmtree(root, ignore_errors=True)
+            make_tree(root, n)
+            client = client_for(app)
+            for _ in range(5):  # разовое построение дерева + прогрев
+                client.get("/library/all_folders_json")
+
+            t0 = time.perf_counter()
+            for _ in range(REPEAT):
+                legacy_gather_all_folders(root)
+            t_legacy = (time.perf_counter() - t0) / REPEAT * 1000
+
+            t0 = time.perf_counter()
+            for _ in range(REPEAT):
+                resp = client.get("/library/all_folders_json")
+            t_full = (time.perf_counter() - t0) / REPEAT * 1000
+            etag = resp.headers["ETag"]
+
+            t0 = time.perf_counter()
+            for _ in range(REPEAT):
+                resp = client.get("/library/all_folders_json", headers={"If-None-Match": etag})
+                assert resp.status_code == 304
+            t_304 = (time.perf_counter() - t0) / REPEAT * 1000
+            print(f"{n:>8} {t_legacy:>11.2f} {t_full:>8.2f} {t_304:>8.2f}")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
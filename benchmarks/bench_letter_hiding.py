@@ -0,0 +1,85 @@
+"""
+Скрытие букв на главной странице: прежний process_rich_html (random.sample
+на каждое слово + повторный разбор BeautifulSoup каждого текстового узла)
+против quiz_engine.hide_letters_html (один разбор, один розыгрыш позиций,
+одна сериализация). Пропускная способность в словах/с при 20% и 80%
+скрытых букв на документе до 100k слов. Количество скрытых букв и
+воспроизводимость по seed проверяет tests/test_quiz_engine.py.
+
+Запуск из корня проекта:
+    python benchmarks/bench_letter_hiding.py
+"""
+import os
+import re
+import sys
+import time
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup
+
+from quiz_engine import hide_letters_html, FILL_LETTER_HTML
+
+LEGACY_MAX_WORDS = 20_000  # прежний вариант медленный — дальше не меряем
+
+
+# ---------- прежний вариант из "import random.py" ----------
+
+def legacy_hide_letters_in_word(word, prob=0.2, fill_mode=False):
+    arr = list(word)
+    n_hide = max(1, int(len(word)*prob)) if len(word) > 1 else 1
+    for i in random.sample(range(len(word)), min(n_hide, len(word))):
+        arr[i] = FILL_LETTER_HTML.format(arr[i]) if fill_mode else "_"
+    return "".join(arr)
+
+
+def legacy_process_rich_html(html, removal_prob=0.2, fill_mode=False):
+    soup = BeautifulSoup(html, "html.parser")
+    for element in soup.find_all(string=True):
+        out = []
+        for t in re.findall(r'\s+|[^\w\s]+|\w+', str(element)):
+            if t.isspace():
+                out.append(t)
+            else:
+                replaced = legacy_hide_letters_in_word(t, removal_prob, fill_mode) if re.match(r'^\w+$', t) else t
+                out.append(f'<span class="word">{replaced}</span>')
+        element.replace_with(BeautifulSoup("".join(out), "html.parser"))
+    return str(soup)
+
+
+# ---------- данные ----------
+
+def make_html(n_words, seed=0):
+    rnd = random.Random(seed)
+    letters = "abcdefghijklmnopqrstuvwxyzабвгдежзиклмнопрстуфхцчшщыэюя"
+    paras, words = [], 0
+    while words < n_words:
+        k = min(rnd.randint(20, 80), n_words - words)
+        text = " ".join("".join(rnd.choice(letters) for _ in range(rnd.randint(1, 12))) for _ in range(k))
+        paras.append(f"<p>{text.capitalize()}, <b>bold part</b> &amp; end.</p>")
+        words += k + 4
+    return "".join(paras)
+
+
+def words_per_second(fn, html, n_words, prob, fill_mode):
+    t0 = time.perf_counter()
+    fn(html, prob, fill_mode)
+    return n_words / (time.perf_counter() - t0)
+
+
+def main():
+    print(f"{'words':>7} {'hidden':>6} {'mode':>6} {'legacy, w/s':>12} {'engine, w/s':>12}")
+    for n in (10_000, 100_000):
+        html = make_html(n)
+        for prob in (0.2, 0.8):
+            for fill_mode in (False, True):
+                legacy = (f"{words_per_second(legacy_process_rich_html, html, n, prob, fill_mode):>12,.0f}"
+                          if n <= LEGACY_MAX_WORDS else f"{'-':>12}")
+                new = words_per_second(hide_letters_html, html, n, prob, fill_mode)
+                mode = "fill" if fill_mode else "remove"
+                print(f"{n:>7} {int(prob * 100):>5}% {mode:>6} {legacy} {new:>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Квиз из файла библиотеки (/library/quiz): первый запрос конвертирует
+документ (фоновая задача, страница ожидания 202), следующие строят квиз из
+кэша конвертации (library.doc_html_cache / docx_lines_cache). Сравниваем
+время с конвертацией (файл "загружен заново": новый mtime, кэши сброшены) и из
+кэша для quizz / matching / mc на .docx разного размера. Перед отчетом —
+проверка: квиз из библиотеки совпадает с квизом из того же файла через
+загрузку, путь за пределы библиотеки не открывается.
+
+Запуск из корня проекта:
+    python benchmarks/bench_library_quiz.py
+"""
+import os
+import sys
+import time
+import shutil
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import docx
+
+from _app import load_app
+from library import invalidate_conversions
+from mc_quiz_word import process_word_quiz
+
+LIBRARY_ROOT = os.path.join("static", "library", "_guest")
+REL = os.path.join("_bench", "deck.docx")
+KINDS = ("quizz", "matching", "mc")
+
+
+def make_docx(path, n_questions):
+    doc = docx.Document()
+    for i in range(n_questions):
+        doc.add_paragraph(f"Question {i}: which neuron signals the cortex?")
+        doc.add_paragraph(f"✓ - right answer {i}")
+        doc.add_paragraph(f"✗ - wrong answer {i}")
+        doc.add_paragraph(f"term {i} ↔ definition {i}")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    doc.save(path)
+
+
+def get_quiz(client, kind):
+    """Запрос квиза; на страницах ожидания (202) ждём фоновую конвертацию."""
+    url = f"/library/quiz?kind={kind}&path={REL}&seed=1"
+    while True:
+        resp = client.get(url)
+        if resp.status_code != 202:
+            assert resp.status_code == 200, resp.status_code
+            return resp.data
+        time.sleep(0.01)
+
+
+def check(client):
+    make_docx(os.path.join(LIBRARY_ROOT, REL), 30)
+    quiz_json, _ = process_word_quiz(os.path.join(LIBRARY_ROOT, REL))
+    page = get_quiz(client, "mc").decode("utf-8")
+    assert quiz_json.count('"answer"') == page.count('"answer"') == 30
+    assert "definition 29" in get_quiz(client, "matching").decode("utf-8")
+    assert client.get("/library/quiz?kind=mc&path=../../../quizz.py").status_code == 404
+    print("library quiz checks passed")
+
+
+def touch(path):
+    """Новый mtime — как у заново загруженного файла (кэши процессов-воркеров тоже промахнутся)."""
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+
+
+def timed(client, kind, cold):
+    times = []
+    for _ in range(3):
+        if cold:
+            touch(os.path.join(LIBRARY_ROOT, REL))
+            invalidate_conversions(LIBRARY_ROOT, REL)
+        t0 = time.perf_counter()
+        get_quiz(client, kind)
+        times.append(time.perf_counter() - t0)
+    return statistics.median(times)
+
+
+def main():
+    client = load_app().test_client()
+    try:
+        check(client)
+        print(f"{'questions':>9} {'kind':>9} {'convert, ms':>12} {'cached, ms':>11} {'speedup':>8}")
+        for n in (100, 1_000, 5_000):
+            make_docx(os.path.join(LIBRARY_ROOT, REL), n)
+            invalidate_conversions(LIBRARY_ROOT, REL)
+            for kind in KINDS:
+                cold = timed(client, kind, cold=True)
+                warm = timed(client, kind, cold=False)
+                print(f"{n:>9} {kind:>9} {cold * 1000:>12.1f} {warm * 1000:>11.1f} {cold / warm:>7.1f}x")
+    finally:
+        invalidate_conversions(LIBRARY_ROOT, REL)
+        shutil.rmtree(os.path.join(LIBRARY_ROOT, "_bench"), ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
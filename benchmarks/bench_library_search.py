@@ -0,0 +1,73 @@
+"""
+Время ответа полнотекстового поиска по библиотеке в зависимости от объёма
+проиндексированного текста (синтетические .txt, слова по закону Ципфа).
+
+Запуск из корня проекта:
+    python benchmarks/bench_library_search.py [--files 2000] [--kb 50]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from library_search import search_index
+
+VOCAB_SIZE = 50_000
+# номера слов по частоте: 0 — самое частое, VOCAB_SIZE-1 — самое редкое
+QUERIES = [(3,), (17,), (17, 230), (4999,), (31, 77, 1200), (VOCAB_SIZE - 1,)]
+REPEAT = 20
+
+
+def make_vocab(rnd):
+    """Случайные «слова» из 4-10 букв; частоты по закону Ципфа."""
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    words = set()
+    while len(words) < VOCAB_SIZE:
+        words.add("".join(rnd.choices(letters, k=rnd.randint(4, 10))))
+    words = sorted(words)
+    rnd.shuffle(words)
+    weights = [1.0 / (i + 1) for i in range(VOCAB_SIZE)]
+    return words, weights
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=2000)
+    parser.add_argument("--kb", type=int, default=50, help="размер одного файла, КБ")
+    args = parser.parse_args()
+
+    rnd = random.Random(0)
+    words, weights = make_vocab(rnd)
+    with tempfile.TemporaryDirectory() as root:
+        t0 = time.perf_counter()
+        total = 0
+        with search_index(root) as s:
+            for i in range(args.files):
+                rel = f"folder{i % 50}/doc{i}.txt"
+                os.makedirs(os.path.join(root, os.path.dirname(rel)), exist_ok=True)
+                text = " ".join(rnd.choices(words, weights, k=args.kb * 1024 // 6))
+                with open(os.path.join(root, rel), "w", encoding="utf-8") as f:
+                    f.write(text)
+                total += len(text)
+                s.index_file(rel, lambda r, text=text: text)
+            t_index = time.perf_counter() - t0
+            print(f"indexed {args.files} files, {total / 2**20:.0f} MB of text "
+                  f"in {t_index:.1f} s ({total / 2**20 / t_index:.1f} MB/s)")
+
+            print(f"{'query':>24} {'hits':>6} {'ms':>8}")
+            for ranks in QUERIES:
+                query = " ".join(words[r] for r in ranks)
+                s.search(query)  # прогрев
+                t0 = time.perf_counter()
+                for _ in range(REPEAT):
+                    hits = s.search(query)
+                ms = (time.perf_counter() - t0) / REPEAT * 1000
+                print(f"{query:>24} {len(hits):>6} {ms:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Неправильные варианты для matching: старый способ (копия и перемешивание
+всех правых частей на каждую пару) против AnswerSampler. Только замеры:
+проверки (правильный ответ и его повторы с другим регистром/пробелами не
+попадают в неправильные) — в tests/test_matching.py.
+
+Запуск из корня проекта:
+    python benchmarks/bench_matching_distractors.py
+"""
+import os
+import sys
+import time
+import random
+import string
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from matching import build_matching_rows, parse_text_into_blocks, MAX_OPTIONS
+
+LEGACY_MAX_PAIRS = 5_000  # старый способ квадратичный — дальше слишком долго
+
+
+def make_blocks(n_pairs, block_size=25, seed=0):
+    rnd = random.Random(seed)
+    lines = []
+    for i in range(n_pairs):
+        if i % block_size == 0:
+            lines.append(f"Block {i // block_size}")
+        words = ["".join(rnd.choice(string.ascii_lowercase) for _ in range(rnd.randint(3, 10)))
+                 for _ in range(rnd.randint(1, 4))]
+        right = " ".join(words).capitalize() if rnd.random() < 0.8 else str(rnd.randint(1000, 2100))
+        lines.append(f"term {i} ↔ {right}")
+    return parse_text_into_blocks("\n".join(lines))
+
+
+def legacy_rows(blocks):
+    """Исходный вариант из matching.matching — для сравнения."""
+    all_right = [pair.right for blk in blocks for pair in blk.pairs]
+    final_blocks = []
+    for blk in blocks:
+        new_rows = []
+        for left, correct in ((pair.left, pair.right) for pair in blk.pairs):
+            wrong_candidates = [x for x in all_right if x != correct]
+            random.shuffle(wrong_candidates)
+            opts = [correct] + wrong_candidates[:(MAX_OPTIONS - 1)]
+            random.shuffle(opts)
+            new_rows.append({"left": left, "correct": correct, "options": opts})
+        final_blocks.append({"title": blk.title, "rows": new_rows})
+    return final_blocks
+
+
+def timed(fn, *args):
+    t0 = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - t0
+
+
+def main():
+    print(f"{'pairs':>7} {'legacy, s':>10} {'mixed, s':>9} {'any, s':>8}")
+    for n in (1_000, 5_000, 20_000):
+        blocks = make_blocks(n)
+        legacy = f"{timed(legacy_rows, blocks):>10.3f}" if n <= LEGACY_MAX_PAIRS else f"{'-':>10}"
+        mixed = timed(build_matching_rows, blocks, "mixed")
+        any_ = timed(build_matching_rows, blocks, "any")
+        print(f"{n:>7} {legacy} {mixed:>9.3f} {any_:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Multiple choice из текста: прежняя страница (HTML каждого вопроса склеивается
+`html +=`, data-correct на каждой строке варианта) против модели квиза,
+сериализованной один раз в JSON. Меряем время ответа /mc_quiz_word и размер
+страницы (в том числе gzip), плюс /mc_quiz_word/api.
+
+Запуск из корня проекта:
+    python benchmarks/bench_mc_payload.py
+"""
+import os
+import re
+import sys
+import gzip
+import json
+import time
+import random
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from markupsafe import escape
+
+from _app import load_app
+from study_formats import iter_questions, iter_text_lines
+
+
+def legacy_question_html(question, options, correct_answer, question_index):
+    """Исходный вариант из mc_quiz_word (HTML вопросов на сервере) — для сравнения."""
+    html = f'<p>{escape(question)}</p>'
+    html += '<div class="mc-options" data-correct="{escape(correct_answer)}">'
+    random.shuffle(options)
+    for opt in options:
+        html += (
+            f'<div class="mc-option-row" data-correct="{escape(correct_answer)}">'
+            f'  <input type="radio" name="q_{question_index}">'
+            f'  <span class="mc-option-label">{escape(opt)}</span>'
+            f'  <span class="trash-icon">🗑</span>'
+            f'</div>'
+        )
+    html += '</div>'
+    return html
+
+
+def legacy_page(text, page_html):
+    """Старая страница: шаблон + вопросы в разметке вместо quizData."""
+    questions = [legacy_question_html(q.text, [o.text for o in q.options], q.answer, i)
+                 for i, q in enumerate(iter_questions(iter_text_lines(text)))]
+    body = "".join(f'<div class="quiz-question">{h}</div>' for h in questions)
+    return re.sub(r'<script type="application/json" id="quizData">.*?</script>', lambda _: body,
+                  page_html, count=1, flags=re.S)
+
+
+def make_text(n, seed=0):
+    rnd = random.Random(seed)
+    lines = []
+    for i in range(n):
+        lines.append(f"Question {i}: which term matches definition #{rnd.randint(0, 10**5)}?")
+        right = rnd.randint(0, 3)
+        lines += [f"{'✓' if k == right else '✗'} - Answer option {k} for question {i}" for k in range(4)]
+    return "\n".join(lines)
+
+
+def timed(fn, repeat=5):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        times.append(time.perf_counter() - t0)
+    return statistics.median(times), out
+
+
+def main():
+    app = load_app()
+    client = app.test_client()
+    t_empty, _ = timed(lambda: client.post('/mc_quiz_word', data={"input_text": "x"}).data)
+    print(f"{'questions':>9} {'variant':>8} {'time, ms':>9} {'KB':>8} {'gzip KB':>8}")
+    for n in (100, 1_000, 10_000):
+        text = make_text(n)
+        t_new, page = timed(lambda: client.post('/mc_quiz_word', data={"input_text": text}).data)
+        t_api, api = timed(lambda: client.post('/mc_quiz_word/api', data={"input_text": text}).data)
+        assert len(json.loads(api)["questions"]) == n
+        html = page.decode("utf-8")
+        t_old, old = timed(lambda: legacy_page(text, html).encode("utf-8"))
+        # старая страница = разбор + склейка HTML + запрос с пустым квизом (шаблон, Flask)
+        t_old += t_empty
+        for name, t, data in (("legacy", t_old, old), ("json", t_new, page), ("api", t_api, api)):
+            print(f"{n:>9} {name:>8} {t * 1000:>9.1f} {len(data) / 1024:>8.0f} "
+                  f"{len(gzip.compress(data)) / 1024:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Бенчмарк quizz_process: старый вариант (BeautifulSoup на каждый текстовый узел)
+против однопроходного движка. Совпадение вывода со старым вариантом
+проверяет tests/test_quizz.py.
+
+Запуск из корня проекта:
+    python benchmarks/bench_quizz_process.py
+"""
+import os
+import re
+import sys
+import time
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup
+from markupsafe import escape
+
+from quizz import quizz_process
+from quiz_engine import token_cache
+
+WORDS = ("neuron synapse cortex & <axon> dendrite glia \"myelin\" potential "
+         "receptor it's channel sodium").split()
+
+
+def make_html(n_words, seed=0):
+    rnd = random.Random(seed)
+    paras, words = [], 0
+    while words < n_words:
+        k = min(rnd.randint(20, 60), n_words - words)
+        ws = [rnd.choice(WORDS) for _ in range(k)]
+        ws[k // 2] = f"<b>{ws[k // 2]}</b>"
+        paras.append("<p>" + " ".join(ws) + ", end.</p>")
+        words += k
+    return "\n".join(paras)
+
+
+def legacy_quizz_process(html, mode, hide_percent, chosen_words=None):
+    """Исходная реализация (до однопроходного движка) — для сравнения."""
+    soup = BeautifulSoup(html, "html.parser")
+    text_nodes = []
+    for node in soup.find_all(string=True):
+        raw = node
+        if raw.strip():
+            tokens = re.findall(r'\s+|[^\w\s]+|\w+', raw)
+            text_nodes.append((node, tokens))
+    all_words = []
+    for nodeIdx, (nd, toks) in enumerate(text_nodes):
+        for tokIdx, tok in enumerate(toks):
+            if re.match(r'^\w+$', tok):
+                all_words.append((nodeIdx, tokIdx, tok))
+    if hide_percent == "chosen":
+        chosen_set = set(w.strip().lower() for w in chosen_words.split(",") if w.strip()) if chosen_words else set()
+    else:
+        n_hide = int(len(all_words) * (hide_percent / 100.0)) if all_words else 0
+        indices = list(range(len(all_words)))
+        random.shuffle(indices)
+        hideSet = set(indices[:n_hide])
+    unique_words = set(w for (_, _, w) in all_words)
+    global_idx = 0
+    for nodeIdx, (nd, toks) in enumerate(text_nodes):
+        newToks = []
+        for tokIdx, tok in enumerate(toks):
+            if re.match(r'^\w+$', tok):
+                if hide_percent == "chosen":
+                    hide_this = tok.lower() in chosen_set
+                else:
+                    hide_this = global_idx in hideSet
+                if hide_this:
+                    if mode == "multiple_choice":
+                        inc = [w for w in unique_words if w != tok]
+                        wrongs = random.sample(inc, 2) if len(inc) > 2 else inc[:2]
+                        newToks.append(f'<span class="mc-gap" data-correct="{escape(tok)}" '
+                                       f'data-wrongs="{escape("|".join(wrongs))}">???</span>')
+                    elif mode == "missing_words_write":
+                        wlen = len(tok)
+                        newToks.append(f'<input type="text" class="fill-input" data-correct="{escape(tok)}" '
+                                       f'style="width:{max(wlen*1.3,5)}ch" maxlength="{wlen}">')
+                    else:
+                        newToks.append(f'<span class="hidden-word" data-original="{escape(tok)}" '
+                                       f'style="width:{max(len(tok)*1.3,4)}ch;"></span>')
+                else:
+                    newToks.append(escape(tok))
+                global_idx += 1
+            else:
+                newToks.append(escape(tok))
+        nd.replace_with(BeautifulSoup("".join(newToks), "html.parser"))
+    return str(soup)
+
+
+def timed(fn, *args):
+    t0 = time.perf_counter()
+    out = fn(*args)
+    return out, time.perf_counter() - t0
+
+
+def main():
+    print(f"{'words':>8} {'mode':>24} {'legacy, s':>10} {'engine, s':>10} {'speedup':>8}")
+    for n in (1_000, 10_000, 100_000):
+        html = make_html(n)
+        for mode in ("missing_words_write", "missing_words_no_write"):
+            _, t_old = timed(legacy_quizz_process, html, mode, 30)
+            token_cache.clear()  # повторный разбор из кэша меряет bench_token_cache.py
+            _, t_new = timed(quizz_process, html, mode, 30)
+            print(f"{n:>8} {mode:>24} {t_old:>10.3f} {t_new:>10.3f} {t_old / t_new:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
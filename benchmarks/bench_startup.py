@@ -0,0 +1,55 @@
+"""
+Холодный старт приложения: загрузка "import random.py" в свежем процессе
+(медиана из нескольких запусков). Сравниваем ленивую загрузку библиотек
+разбора документов с предзагрузкой всех ленивых модулей (≈ прежний
+eager-импорт) и, если указан --baseline, с другой версией дерева:
+
+    git archive <commit> | tar -x -C /tmp/baseline
+    python benchmarks/bench_startup.py --baseline /tmp/baseline
+
+Запуск из корня проекта:
+    python benchmarks/bench_startup.py
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from startup_profile import APP_FILE, profile_startup
+
+
+def run(app_file, preload, repeat):
+    """Медианы: время загрузки приложения и полное время процесса (с запуском python)."""
+    startup, wall = [], []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = profile_startup(app_file, preload=preload, importtime=False)
+        wall.append(time.perf_counter() - t0)
+        startup.append(result["startup"] + result.get("preload", 0))
+    return statistics.median(startup), statistics.median(wall)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--baseline", help="каталог с другой версией проекта")
+    args = parser.parse_args()
+
+    cases = [("lazy", APP_FILE, False), ("preload all", APP_FILE, True)]
+    if args.baseline:
+        cases.append(("baseline", os.path.join(args.baseline, "import random.py"), False))
+    # Прогрев: .pyc и файловый кэш ОС
+    for _, app_file, preload in cases:
+        profile_startup(app_file, preload=preload, importtime=False)
+
+    print(f"{'variant':>12} {'app load, ms':>13} {'process, ms':>12}")
+    for name, app_file, preload in cases:
+        startup, wall = run(app_file, preload, args.repeat)
+        print(f"{name:>12} {startup * 1000:>13.0f} {wall * 1000:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
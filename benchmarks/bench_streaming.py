@@ -0,0 +1,121 @@
+"""
+Потоковая отдача страниц квизов (streaming.stream_page + compress_response)
+против прежней: результат целиком собирается строкой, render_template
+собирает страницу целиком, и только потом уходит первый байт. Для /, /quizz
+и /mc_quiz_word меряем время до первого байта, полное время и пик памяти
+(tracemalloc, ответ сразу выбрасываем) при Accept-Encoding: gzip. Оба
+варианта идут через тестовый клиент, так что разбор формы (копии входного
+текста) входит в оба замера. Корректность сжатых потоковых ответов
+проверяет tests/test_streaming.py.
+
+Запуск из корня проекта:
+    python benchmarks/bench_streaming.py
+"""
+import os
+import sys
+import time
+import random
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from flask import render_template, request
+
+from _app import load_app
+from quiz_engine import token_cache, hide_letters_html
+from quizz import quizz_process
+from study_formats import iter_text_lines
+from mc_quiz_word import iter_quiz_json
+
+GZIP = {"Accept-Encoding": "gzip"}
+
+
+def make_html(n_words, seed=0):
+    rnd = random.Random(seed)
+    words = ["neuron", "Cortex", "synapse", "axon", "Dendrite", "glia", "receptor", "signal"]
+    paras, count = [], 0
+    while count < n_words:
+        k = min(rnd.randint(20, 80), n_words - count)
+        paras.append("<p>" + " ".join(rnd.choice(words) for _ in range(k)) + ", <b>bold</b>.</p>")
+        count += k + 1
+    return "".join(paras)
+
+
+def make_questions(n_words):
+    lines = []
+    for i in range(n_words // 12):
+        lines += [f"Question {i}: which option?", f"✓ - right answer {i}", f"✗ - wrong answer {i}"]
+    return "\n".join(lines)
+
+
+def add_legacy_routes(app):
+    """
+    Прежние обработчики под /legacy/...: форма читается так же, результат —
+    строка, страница — render_template (сжимает её целиком compress_response).
+    """
+    def legacy_index():
+        text = request.form["input_text"]
+        return render_template("import_random.html", mode="remove", hidden_percentage=20,
+                               editor_initial=text, output_html=[hide_letters_html(text, 0.2, seed=1)],
+                               seed_input="1", seed=1)
+
+    def legacy_quizz():
+        text = request.form["input_text"]
+        return render_template("quizz.html", mode="multiple_choice", hide_percent=30,
+                               editor_initial=text, chosen_words="", distractors="",
+                               quiz_questions=[quizz_process(text, "multiple_choice", 30, seed=1)],
+                               seed_input="1", seed=1)
+
+    def legacy_mc():
+        quiz_json = "".join(iter_quiz_json(iter_text_lines(request.form["input_text"].strip())))
+        return render_template("mc_quiz_word.html", api_url="", error_message="", quiz_chunks=[quiz_json])
+
+    for url, view in (("/", legacy_index), ("/quizz", legacy_quizz), ("/mc_quiz_word", legacy_mc)):
+        app.add_url_rule("/legacy" + url, endpoint="legacy" + url, view_func=view, methods=["POST"])
+
+
+def post(client, url, case, text):
+    return client.post(url, data=case[1](text), headers=GZIP).response
+
+
+CASES = [
+    ("/", lambda t: {"input_text": t, "seed": "1"}, make_html),
+    ("/quizz", lambda t: {"input_text": t, "mode": "multiple_choice", "hide_percent": "30", "seed": "1"},
+     make_html),
+    ("/mc_quiz_word", lambda t: {"input_text": t}, make_questions),
+]
+
+
+def measure(run):
+    """(время до первого куска, полное время, байт отдано, пик памяти МБ); кэш разбора пустой."""
+    token_cache.clear()
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    ttfb, sent = None, 0
+    for chunk in run():
+        if ttfb is None and chunk:
+            ttfb = time.perf_counter() - t0
+        sent += len(chunk)
+    total = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return ttfb, total, sent, peak / 2**20
+
+
+def main():
+    app = load_app()
+    add_legacy_routes(app)
+    client = app.test_client()
+    print(f"{'words':>7} {'page':>13} {'variant':>8} {'TTFB, ms':>9} {'total, ms':>10} {'gzip KB':>8} {'peak MB':>8}")
+    for n in (10_000, 100_000, 300_000):
+        for case in CASES:
+            text = case[2](n)
+            for name, run in (("legacy", lambda: post(client, "/legacy" + case[0], case, text)),
+                              ("stream", lambda: post(client, case[0], case, text))):
+                ttfb, total, sent, peak = measure(run)
+                print(f"{n:>7} {case[0]:>13} {name:>8} {ttfb * 1000:>9.1f} {total * 1000:>10.1f} "
+                      f"{sent / 1024:>8.0f} {peak:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+Разбор учебных форматов ("A ↔ B" и вопросы с "✓/✗"): прежние парсеры
+(python-docx Document + список всех строк) против потоковых генераторов
+study_formats: время и пик памяти (tracemalloc) на банке до 300k строк.
+Совпадение результатов с прежними парсерами проверяет
+tests/test_study_formats.py. tracemalloc не видит память lxml,
+так что для прежнего разбора .docx пик занижен.
+
+Запуск из корня проекта:
+    python benchmarks/bench_study_formats.py
+"""
+import io
+import os
+import sys
+import time
+import random
+import zipfile
+import tracemalloc
+from xml.sax.saxutils import escape
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import docx
+
+from study_formats import iter_blocks, iter_questions, iter_docx_paragraphs, iter_text_lines
+
+
+# ---------- прежние парсеры (matching.py / mc_quiz_word.py до переделки) ----------
+
+def legacy_blocks(lines):
+    blocks = []
+    current_block = {"title": None, "pairs": []}
+    for line in lines:
+        if "↔" in line:
+            left, right = line.split("↔", 1)
+            current_block["pairs"].append((left.strip(), right.strip()))
+        else:
+            if current_block["title"] or current_block["pairs"]:
+                blocks.append(current_block)
+            current_block = {"title": line, "pairs": []}
+    if current_block["title"] or current_block["pairs"]:
+        blocks.append(current_block)
+    return [(b["title"], b["pairs"]) for b in blocks]
+
+
+def legacy_questions(paragraphs):
+    out = []
+    i = 0
+    while i < len(paragraphs):
+        question = paragraphs[i]
+        i += 1
+        options = []
+        correct_answer = None
+        while i < len(paragraphs) and (paragraphs[i].startswith("✓") or paragraphs[i].startswith("✗")):
+            parts = paragraphs[i].split("-", 1)
+            if len(parts) == 2:
+                options.append(parts[1].strip())
+                if parts[0].strip().startswith("✓"):
+                    correct_answer = parts[1].strip()
+            i += 1
+        if question and options and correct_answer:
+            out.append((question, options, correct_answer))
+    return out
+
+
+def legacy_docx_lines(source):
+    return [p.text.strip() for p in docx.Document(source).paragraphs if p.text.strip()]
+
+
+def legacy_text_lines(text):
+    return [l.strip() for l in text.splitlines() if l.strip()]
+
+
+def new_blocks(lines):
+    return [(b.title, [(p.left, p.right) for p in b.pairs]) for b in iter_blocks(lines)]
+
+
+def new_questions(lines):
+    return [(q.text, [o.text for o in q.options], q.answer) for q in iter_questions(lines)]
+
+
+# ---------- данные ----------
+
+def make_lines(n, seed=0):
+    """Смесь форматов: блоки пар и вопросы с вариантами, иногда пустые строки."""
+    rnd = random.Random(seed)
+    lines = []
+    while len(lines) < n:
+        if rnd.random() < 0.5:
+            lines.append(f"Block {len(lines)}")
+            lines += [f"term {len(lines)} {i} ↔ definition {rnd.randint(0, 10**6)}" for i in range(rnd.randint(1, 8))]
+        else:
+            lines.append(f"Question {len(lines)}: pick {rnd.randint(0, 99)}?")
+            right = rnd.randint(0, 3)
+            lines += [f"{'✓' if i == right else '✗'} - answer {i} of {len(lines)}" for i in range(4)]
+        if rnd.random() < 0.1:
+            lines.append("")
+    return lines
+
+
+def make_docx_bytes(lines):
+    """Минимальный .docx (только word/document.xml) — python-docx слишком медленно пишет 300k абзацев."""
+    body = "".join(f'<w:p><w:r><w:t xml:space="preserve">{escape(l)}</w:t></w:r></w:p>' for l in lines)
+    xml = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+           '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+           f'<w:body>{body}<w:sectPr/></w:body></w:document>')
+    tmpl = docx.Document()
+    buf = io.BytesIO()
+    tmpl.save(buf)
+    out = io.BytesIO()
+    with zipfile.ZipFile(buf) as src, zipfile.ZipFile(out, "w", zipfile.ZIP_DEFLATED) as dst:
+        for item in src.infolist():
+            data = xml.encode("utf-8") if item.filename == "word/document.xml" else src.read(item)
+            dst.writestr(item, data)
+    return out.getvalue()
+
+
+def measure(run):
+    """Время — отдельным прогоном: tracemalloc сильно замедляет код."""
+    t0 = time.perf_counter()
+    run()
+    elapsed = time.perf_counter() - t0
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 2**20
+
+
+def count(it):
+    return sum(1 for _ in it)
+
+
+def main():
+    print(f"{'lines':>7} {'source':>6} {'parser':>9} {'legacy, s':>10} {'MB':>6} {'stream, s':>10} {'MB':>6}")
+    for n in (10_000, 100_000, 300_000):
+        lines = make_lines(n)
+        text = "\n".join(lines)
+        data = make_docx_bytes(lines)
+        cases = [
+            ("text", "blocks", lambda: len(legacy_blocks(legacy_text_lines(text))),
+             lambda: count(iter_blocks(iter_text_lines(text)))),
+            ("text", "questions", lambda: len(legacy_questions(legacy_text_lines(text))),
+             lambda: count(iter_questions(iter_text_lines(text)))),
+            ("docx", "blocks", lambda: len(legacy_blocks(legacy_docx_lines(io.BytesIO(data)))),
+             lambda: count(iter_blocks(iter_docx_paragraphs(io.BytesIO(data))))),
+            ("docx", "questions", lambda: len(legacy_questions(legacy_docx_lines(io.BytesIO(data)))),
+             lambda: count(iter_questions(iter_docx_paragraphs(io.BytesIO(data))))),
+        ]
+        for source, parser, legacy, stream in cases:
+            lt, lm = measure(legacy)
+            st, sm = measure(stream)
+            print(f"{n:>7} {source:>6} {parser:>9} {lt:>10.2f} {lm:>6.1f} {st:>10.2f} {sm:>6.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Кэш разобранных документов (quiz_engine.TokenStreamCache): повторная
+генерация квиза из того же текста с другим процентом/режимом/seed — с
+разбором BeautifulSoup каждый раз (кэш очищается) и из кэша. Поведение
+кэша (тот же результат из кэша, LRU по размеру, ключ sha256) проверяет
+tests/test_quiz_engine.py.
+
+Запуск из корня проекта:
+    python benchmarks/bench_token_cache.py
+"""
+import os
+import sys
+import time
+import random
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from quiz_engine import token_cache, hide_letters_html
+from quizz import quizz_process
+
+PERCENTS = (10, 30, 50, 80)
+
+
+def make_html(n_words, seed=0):
+    rnd = random.Random(seed)
+    words = ["neuron", "Cortex", "synapse", "axon", "Dendrite", "glia", "NMDA", "receptor", "signal"]
+    paras, count = [], 0
+    while count < n_words:
+        k = min(rnd.randint(20, 80), n_words - count)
+        text = " ".join(rnd.choice(words) for _ in range(k))
+        paras.append(f"<p>{text}, <b>bold</b> &amp; <i>end</i>.</p>")
+        count += k + 3
+    return "".join(paras)
+
+
+def regenerate(html, fn, clear):
+    """Время одной генерации для каждого процента (медиана)."""
+    times = []
+    for i, pct in enumerate(PERCENTS):
+        if clear:
+            token_cache.clear()
+        t0 = time.perf_counter()
+        fn(html, pct, i)
+        times.append(time.perf_counter() - t0)
+    return statistics.median(times)
+
+
+def main():
+    cases = [
+        ("quizz mc", lambda html, pct, seed: quizz_process(html, "multiple_choice", pct, seed=seed)),
+        ("quizz write", lambda html, pct, seed: quizz_process(html, "missing_words_write", pct, seed=seed)),
+        ("letters", lambda html, pct, seed: hide_letters_html(html, pct / 100, seed=seed)),
+    ]
+    print(f"{'words':>7} {'case':>12} {'reparse, ms':>12} {'cached, ms':>11} {'speedup':>8}")
+    for n in (1_000, 10_000, 100_000):
+        html = make_html(n)
+        for name, fn in cases:
+            cold = regenerate(html, fn, clear=True)
+            token_cache.get(html)
+            warm = regenerate(html, fn, clear=False)
+            print(f"{n:>7} {name:>12} {cold * 1000:>12.1f} {warm * 1000:>11.1f} {cold / warm:>7.1f}x")
+    print(token_cache.info())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Размер multiple choice из quizz_process: слова в каждом пропуске
+(data-correct/data-wrongs) против общей таблицы слов страницы (WordTable,
+пропуски ссылаются номерами data-c/data-w). Отчет по размеру квиза и всей
+страницы /quizz (байты и gzip) на трех образцах: проза (частотный словарь),
+глоссарий (много редких слов) и текст с маленьким словарем. Что по таблице
+восстанавливаются те же ответы, что в обычном выводе, проверяет
+tests/test_quizz.py.
+
+Запуск из корня проекта:
+    python benchmarks/bench_word_table.py
+"""
+import os
+import sys
+import gzip
+import random
+import string
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from _app import load_app
+from quiz_engine import WordTable
+from quizz import quizz_process
+
+
+def random_word(rnd, lo=3, hi=12):
+    return "".join(rnd.choice(string.ascii_lowercase) for _ in range(rnd.randint(lo, hi)))
+
+
+def make_doc(vocab, n_words, rnd):
+    weights = [1 / (i + 1) for i in range(len(vocab))]  # закон Ципфа
+    paras, count = [], 0
+    while count < n_words:
+        k = min(rnd.randint(20, 80), n_words - count)
+        words = rnd.choices(vocab, weights, k=k)
+        words[0] = words[0].capitalize()
+        paras.append("<p>" + " ".join(words) + ".</p>")
+        count += k
+    return "".join(paras)
+
+
+def samples(n_words=20_000, seed=0):
+    rnd = random.Random(seed)
+    prose = [random_word(rnd, 1, 9) for _ in range(3_000)]
+    glossary = [random_word(rnd, 6, 16) for _ in range(15_000)]
+    small = [random_word(rnd) for _ in range(200)]
+    return [("prose", make_doc(prose, n_words, rnd)),
+            ("glossary", make_doc(glossary, n_words, rnd)),
+            ("small vocab", make_doc(small, n_words, rnd))]
+
+
+def sizes(data):
+    raw = data.encode("utf-8") if isinstance(data, str) else data
+    return len(raw), len(gzip.compress(raw, 6))
+
+
+def page(client, doc, pct, mc_output):
+    return client.post("/quizz", data={"input_text": doc, "mode": "multiple_choice", "hide_percent": str(pct),
+                                       "seed": "1", "mc_output": mc_output}).data
+
+
+def main():
+    client = load_app().test_client()
+    print(f"{'sample':>12} {'hide':>5} {'part':>5} {'inline KB':>10} {'gzip':>7} {'table KB':>9} {'gzip':>7} {'saved':>6}")
+    for name, doc in samples():
+        for pct in (30, 100):
+            table = WordTable()
+            inline = sizes(quizz_process(doc, "multiple_choice", pct, seed=1))
+            compact = quizz_process(doc, "multiple_choice", pct, seed=1, word_table=table)
+            compact = sizes(compact + table.dumps())
+            pages = [sizes(page(client, doc, pct, mode)) for mode in ("inline", "table")]
+            for part, (a, b) in (("quiz", (inline, compact)), ("page", pages)):
+                print(f"{name:>12} {pct:>4}% {part:>5} {a[0] / 1024:>10.0f} {a[1] / 1024:>7.0f} "
+                      f"{b[0] / 1024:>9.0f} {b[1] / 1024:>7.0f} {1 - b[0] / a[0]:>6.0%}")
+
+
+if __name__ == "__main__":
+    main()
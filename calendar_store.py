@@ -0,0 +1,550 @@
+import os
+import json
+import sqlite3
+import datetime
+import threading
+
+# Хранилище объектов календаря (категории + дедлайны).
+# Объект — словарь вида {"id": 3, "isCategory": False, "title": ..., ...}.
+# Все бэкенды реализуют одинаковый интерфейс:
+#   all(), get(id), add(obj) -> id, update(id, fn) -> obj|None, delete(id) -> bool,
+#   categories(), deadlines(date_from, date_to, limit, cursor) -> (items, next_cursor),
+#   version(), changes_since(version) -> {"version", "changed", "deleted", "full"},
+#   batch(ops) — несколько изменений атомарно:
+#     ("add", obj) / ("update", id, fn) / ("delete", id); если объекта нет или fn
+#     бросает исключение — не применяется ни одно изменение.
+
+# Дедлайны без даты при сортировке уходят в конец (как раньше)
+NO_DATE = "9999-12-31"
+
+
+def parse_date_with_formats(date_str):
+    """
+    Пытаемся распарсить строку, проверяя несколько форматов:
+      - YYYY-MM-DD
+      - MM/DD/YYYY
+      - DD/MM/YYYY
+    При успехе возвращаем datetime.datetime, иначе None.
+    """
+    fmts = ("%Y-%m-%d", "%m/%d/%Y", "%d/%m/%Y")
+    for fmt in fmts:
+        try:
+            dt = datetime.datetime.strptime(date_str, fmt)
+            return dt
+        except:
+            pass
+    return None
+
+
+def normalize_date(date_str):
+    """Дата дедлайна в ISO (YYYY-MM-DD); нераспознанную строку оставляем как есть."""
+    if not date_str:
+        return NO_DATE
+    dt = parse_date_with_formats(date_str)
+    return dt.strftime("%Y-%m-%d") if dt else date_str
+
+
+def sort_key(obj):
+    """Ключ сортировки дедлайнов (он же курсор страницы): (дата, id)."""
+    return (obj.get('date') or NO_DATE, obj['id'])
+
+
+def encode_cursor(obj):
+    date, item_id = sort_key(obj)
+    return f"{date}|{item_id}"
+
+
+def decode_cursor(cursor):
+    """'2025-04-28|12' -> ('2025-04-28', 12); None, если курсор битый."""
+    try:
+        date, item_id = cursor.rsplit("|", 1)
+        return date, int(item_id)
+    except (AttributeError, ValueError):
+        return None
+
+
+def prepare_object(obj):
+    """Перед записью: у дедлайна дата приводится к ISO, у подзадач есть id."""
+    if not obj.get('isCategory'):
+        if obj.get('date'):
+            obj['date'] = normalize_date(obj['date'])
+        ensure_subtask_ids(obj)
+    return obj
+
+
+def ensure_subtask_ids(deadline):
+    """
+    Стабильные id подзадач (вместо адресации по позиции в списке).
+    Счётчик next_subtask_id хранится в дедлайне, id не переиспользуются.
+    Возвращает True, если что-то поменяли.
+    """
+    subtasks = deadline.setdefault('subtasks', [])
+    next_id = deadline.get('next_subtask_id') or 1 + max(
+        (st['id'] for st in subtasks if isinstance(st.get('id'), int)), default=0)
+    changed = next_id != deadline.get('next_subtask_id')
+    for st in subtasks:
+        if not isinstance(st.get('id'), int):
+            st['id'] = next_id
+            next_id += 1
+            changed = True
+    deadline['next_subtask_id'] = next_id
+    return changed
+
+
+def add_subtask(deadline, text):
+    """Добавляем подзадачу с новым id, возвращаем её."""
+    ensure_subtask_ids(deadline)
+    st = {"id": deadline['next_subtask_id'], "text": text, "done": False}
+    deadline['next_subtask_id'] += 1
+    deadline['subtasks'].append(st)
+    return st
+
+
+def find_subtask(deadline, subtask_id=None, index=None):
+    """Подзадача по id (или, для старых клиентов, по позиции); None, если нет."""
+    subtasks = deadline.get('subtasks', [])
+    if subtask_id is not None:
+        for st in subtasks:
+            if st.get('id') == subtask_id:
+                return st
+        return None
+    if isinstance(index, int) and 0 <= index < len(subtasks):
+        return subtasks[index]
+    return None
+
+
+def normalize_objects(data):
+    """
+    Старые записи из JSON: проставляем недостающие 'id' и 'subtasks'.
+    Возвращает True, если что-то поменяли.
+    """
+    max_id = 0
+    for obj in data:
+        if isinstance(obj.get('id'), int) and obj['id'] > max_id:
+            max_id = obj['id']
+
+    changed = False
+    for obj in data:
+        if 'id' not in obj:
+            max_id += 1
+            obj['id'] = max_id
+            changed = True
+        if not obj.get('isCategory'):
+            if 'subtasks' not in obj:
+                obj['subtasks'] = []
+                changed = True
+            if ensure_subtask_ids(obj):
+                changed = True
+    return changed
+
+
+def select_deadlines(objects, date_from=None, date_to=None, limit=None, cursor=None):
+    """Фильтр/сортировка/страница по уже загруженному списку (для JSON-бэкенда)."""
+    items = sorted((o for o in objects if not o.get('isCategory')), key=sort_key)
+    after = decode_cursor(cursor) if cursor else None
+    items = [o for o in items
+             if (not date_from or sort_key(o)[0] >= date_from)
+             and (not date_to or sort_key(o)[0] <= date_to)
+             and (not after or sort_key(o) > after)]
+    if limit and len(items) > limit:
+        return items[:limit], encode_cursor(items[limit - 1])
+    return items, None
+
+
+class JsonCalendarStore:
+    """
+    Старый формат: весь календарь в одном JSON-файле.
+    Каждое изменение перечитывает и переписывает файл целиком
+    (под локом — безопасно только в пределах одного процесса).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.RLock()
+        self._text = None  # содержимое файла при последнем чтении/записи
+
+    def _load(self):
+        if os.path.exists(self.path):
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self._text = f.read()
+            data = json.loads(self._text)
+        else:
+            self._text, data = None, []
+        if normalize_objects(data):
+            self._save(data)
+        return data
+
+    def _save(self, data):
+        """Пишем файл, только если содержимое изменилось (mtime — версия календаря)."""
+        text = json.dumps(data, indent=2, ensure_ascii=False)
+        if text == self._text:
+            return
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp, self.path)
+        self._text = text
+
+    def all(self):
+        with self._lock:
+            return self._load()
+
+    def get(self, item_id):
+        with self._lock:
+            for obj in self._load():
+                if obj['id'] == item_id:
+                    return obj
+        return None
+
+    def categories(self):
+        return [o for o in self.all() if o.get('isCategory')]
+
+    def version(self):
+        """Версия = mtime файла (журнала изменений у JSON-формата нет)."""
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return 0
+
+    def changes_since(self, since):
+        """Без журнала: если файл менялся — отдаём всё целиком (full=True)."""
+        with self._lock:
+            version = self.version()
+            if since == version:
+                return {"version": version, "changed": [], "deleted": [], "full": False}
+            return {"version": version, "changed": self._load(), "deleted": [], "full": True}
+
+    def deadlines(self, date_from=None, date_to=None, limit=None, cursor=None):
+        return select_deadlines(self.all(), date_from, date_to, limit, cursor)
+
+    @staticmethod
+    def _add(data, obj):
+        obj = prepare_object(dict(obj, id=1 if not data else max(o["id"] for o in data) + 1))
+        data.append(obj)
+        return obj['id']
+
+    @staticmethod
+    def _update(data, item_id, fn):
+        for obj in data:
+            if obj['id'] == item_id:
+                fn(obj)
+                return prepare_object(obj)
+        return None
+
+    @staticmethod
+    def _delete(data, item_id):
+        for i, obj in enumerate(data):
+            if obj['id'] == item_id:
+                data.pop(i)
+                return True
+        return False
+
+    def add(self, obj):
+        with self._lock:
+            data = self._load()
+            item_id = self._add(data, obj)
+            self._save(data)
+            return item_id
+
+    def update(self, item_id, fn):
+        with self._lock:
+            data = self._load()
+            obj = self._update(data, item_id, fn)
+            if obj is not None:
+                self._save(data)
+            return obj
+
+    def delete(self, item_id):
+        with self._lock:
+            data = self._load()
+            deleted = self._delete(data, item_id)
+            self._save(data)
+            return deleted
+
+    def batch(self, ops):
+        with self._lock:
+            data = self._load()
+            results = [_apply_op(self, data, op) for op in ops]
+            self._save(data)
+            return results
+
+
+class _Transaction:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False
+
+
+class SqliteCalendarStore:
+    """
+    SQLite-хранилище: одна строка на объект (данные — JSON),
+    поиск по id через первичный ключ, каждое изменение — отдельная
+    транзакция BEGIN IMMEDIATE (без потерянных обновлений между
+    потоками и процессами), id выдаёт AUTOINCREMENT.
+    """
+
+    # Миграции схемы по порядку; номер применённой хранится в PRAGMA user_version
+    MIGRATIONS = [
+        """
+        CREATE TABLE objects (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            is_category INTEGER NOT NULL DEFAULT 0,
+            data TEXT NOT NULL
+        );
+        CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+        """,
+        # v2: дата дедлайна (ISO) отдельной колонкой с индексом
+        lambda conn: SqliteCalendarStore._add_date_column(conn),
+        # v3: журнал изменений — по строке на объект с версией последнего изменения
+        """
+        CREATE TABLE changes (
+            item_id INTEGER PRIMARY KEY,
+            version INTEGER NOT NULL,
+            deleted INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE INDEX idx_changes_version ON changes(version);
+        INSERT INTO meta(key, value) VALUES ('version', '0');
+        """,
+        # v4: стабильные id подзадач
+        lambda conn: SqliteCalendarStore._add_subtask_ids(conn),
+    ]
+
+    def __init__(self, path, legacy_json=None):
+        self.path = path
+        self._local = threading.local()
+        self._migrate_schema()
+        if legacy_json:
+            self.import_json(legacy_json)
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _write(self):
+        """Контекст транзакции на запись (сразу берём RESERVED-лок)."""
+        return _Transaction(self._conn())
+
+    def _migrate_schema(self):
+        with self._write() as conn:
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            for i, step in enumerate(self.MIGRATIONS[version:], start=version + 1):
+                if callable(step):
+                    step(conn)
+                else:
+                    for stmt in step.split(";"):
+                        if stmt.strip():
+                            conn.execute(stmt)
+                conn.execute(f"PRAGMA user_version={i}")
+
+    @staticmethod
+    def _add_date_column(conn):
+        conn.execute("ALTER TABLE objects ADD COLUMN date TEXT")
+        conn.execute("CREATE INDEX idx_objects_date ON objects(is_category, date, id)")
+        for item_id, data in conn.execute("SELECT id, data FROM objects").fetchall():
+            obj = prepare_object(json.loads(data))
+            conn.execute("UPDATE objects SET date=?, data=? WHERE id=?",
+                         (SqliteCalendarStore._date_of(obj), json.dumps(obj, ensure_ascii=False), item_id))
+
+    @staticmethod
+    def _add_subtask_ids(conn):
+        for item_id, data in conn.execute("SELECT id, data FROM objects WHERE is_category=0").fetchall():
+            obj = json.loads(data)
+            if ensure_subtask_ids(obj):
+                conn.execute("UPDATE objects SET data=? WHERE id=?",
+                             (json.dumps(obj, ensure_ascii=False), item_id))
+
+    @staticmethod
+    def _date_of(obj):
+        return None if obj.get('isCategory') else (obj.get('date') or NO_DATE)
+
+    def import_json(self, json_path):
+        """Одноразовый перенос данных из старого calendar_events.json."""
+        if not os.path.exists(json_path):
+            return 0
+        with self._write() as conn:
+            done = conn.execute("SELECT value FROM meta WHERE key='migrated_from_json'").fetchone()
+            if done:
+                return 0
+            with open(json_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            normalize_objects(data)
+            for obj in data:
+                self._insert(conn, obj)
+            conn.execute("INSERT INTO meta(key, value) VALUES ('migrated_from_json', ?)",
+                         (os.path.abspath(json_path),))
+            return len(data)
+
+    @staticmethod
+    def _row_to_obj(row):
+        obj = json.loads(row[1])
+        obj['id'] = row[0]
+        return obj
+
+    def _insert(self, conn, obj):
+        prepare_object(obj)
+        body = {k: v for k, v in obj.items() if k != 'id'}
+        cur = conn.execute(
+            "INSERT INTO objects(id, is_category, date, data) VALUES (?, ?, ?, ?)",
+            (obj.get('id'), 1 if obj.get('isCategory') else 0, self._date_of(obj),
+             json.dumps(body, ensure_ascii=False)))
+        return cur.lastrowid
+
+    def all(self):
+        rows = self._conn().execute("SELECT id, data FROM objects ORDER BY id").fetchall()
+        return [self._row_to_obj(r) for r in rows]
+
+    def get(self, item_id):
+        row = self._conn().execute("SELECT id, data FROM objects WHERE id=?", (item_id,)).fetchone()
+        return self._row_to_obj(row) if row else None
+
+    def categories(self):
+        rows = self._conn().execute(
+            "SELECT id, data FROM objects WHERE is_category=1 ORDER BY id").fetchall()
+        return [self._row_to_obj(r) for r in rows]
+
+    @staticmethod
+    def _log_change(conn, item_id, deleted=False):
+        """Новая версия календаря + отметка в журнале (в той же транзакции)."""
+        conn.execute("UPDATE meta SET value = CAST(value AS INTEGER) + 1 WHERE key='version'")
+        version = int(conn.execute("SELECT value FROM meta WHERE key='version'").fetchone()[0])
+        conn.execute("INSERT OR REPLACE INTO changes(item_id, version, deleted) VALUES (?, ?, ?)",
+                     (item_id, version, 1 if deleted else 0))
+
+    def version(self):
+        row = self._conn().execute("SELECT value FROM meta WHERE key='version'").fetchone()
+        return int(row[0])
+
+    def changes_since(self, since):
+        """
+        Объекты, изменённые/добавленные после версии since, и id удалённых.
+        Если since из "будущего" (например, база пересоздана) — full=True и всё целиком.
+        """
+        conn = self._conn()
+        conn.execute("BEGIN")
+        try:
+            version = int(conn.execute("SELECT value FROM meta WHERE key='version'").fetchone()[0])
+            if since > version:
+                changed = [self._row_to_obj(r) for r in
+                           conn.execute("SELECT id, data FROM objects ORDER BY id").fetchall()]
+                return {"version": version, "changed": changed, "deleted": [], "full": True}
+            rows = conn.execute(
+                "SELECT c.item_id, c.deleted, o.data FROM changes c "
+                "LEFT JOIN objects o ON o.id = c.item_id "
+                "WHERE c.version > ? ORDER BY c.version", (since,)).fetchall()
+        finally:
+            conn.execute("COMMIT")
+        changed = [self._row_to_obj((item_id, data)) for item_id, deleted, data in rows
+                   if not deleted and data is not None]
+        deleted = [item_id for item_id, deleted, data in rows if deleted or data is None]
+        return {"version": version, "changed": changed, "deleted": deleted, "full": False}
+
+    def deadlines(self, date_from=None, date_to=None, limit=None, cursor=None):
+        """
+        Дедлайны, отсортированные по (дата, id), с фильтром по датам
+        и keyset-пагинацией: cursor — последний элемент предыдущей страницы.
+        """
+        sql = "SELECT id, data FROM objects WHERE is_category=0"
+        args = []
+        if date_from:
+            sql += " AND date >= ?"
+            args.append(date_from)
+        if date_to:
+            sql += " AND date <= ?"
+            args.append(date_to)
+        after = decode_cursor(cursor) if cursor else None
+        if after:
+            sql += " AND (date, id) > (?, ?)"
+            args.extend(after)
+        sql += " ORDER BY date, id"
+        if limit:
+            sql += " LIMIT ?"
+            args.append(limit + 1)
+        items = [self._row_to_obj(r) for r in self._conn().execute(sql, args).fetchall()]
+        if limit and len(items) > limit:
+            return items[:limit], encode_cursor(items[limit - 1])
+        return items, None
+
+    def _add(self, conn, obj):
+        item_id = self._insert(conn, dict(obj, id=None))
+        self._log_change(conn, item_id)
+        return item_id
+
+    def _update(self, conn, item_id, fn):
+        """
+        fn(obj) меняет объект на месте. Если fn ничего не изменила (например,
+        подзадачи с таким id уже нет), строка не пишется и версия не растёт.
+        """
+        row = conn.execute("SELECT id, data FROM objects WHERE id=?", (item_id,)).fetchone()
+        if not row:
+            return None
+        obj = self._row_to_obj(row)
+        fn(obj)
+        prepare_object(obj)
+        data = json.dumps({k: v for k, v in obj.items() if k != 'id'}, ensure_ascii=False)
+        if data == row[1]:
+            return obj
+        conn.execute("UPDATE objects SET is_category=?, date=?, data=? WHERE id=?",
+                     (1 if obj.get('isCategory') else 0, self._date_of(obj), data, item_id))
+        self._log_change(conn, item_id)
+        return obj
+
+    def _delete(self, conn, item_id):
+        if conn.execute("DELETE FROM objects WHERE id=?", (item_id,)).rowcount == 0:
+            return False
+        self._log_change(conn, item_id, deleted=True)
+        return True
+
+    def add(self, obj):
+        with self._write() as conn:
+            return self._add(conn, obj)
+
+    def update(self, item_id, fn):
+        with self._write() as conn:
+            return self._update(conn, item_id, fn)
+
+    def delete(self, item_id):
+        with self._write() as conn:
+            return self._delete(conn, item_id)
+
+    def batch(self, ops):
+        with self._write() as conn:
+            return [_apply_op(self, conn, op) for op in ops]
+
+
+def _apply_op(store, target, op):
+    """Одна операция batch(); target — соединение SQLite или список объектов JSON."""
+    kind = op[0]
+    if kind == "add":
+        return store._add(target, op[1])
+    if kind == "update":
+        result = store._update(target, op[1], op[2])
+    elif kind == "delete":
+        result = store._delete(target, op[1])
+    else:
+        raise ValueError(f"Unknown operation: {kind}")
+    if not result:
+        raise KeyError(op[1])
+    return result
+
+
+def open_store(backend, db_path, json_path):
+    """
+    Создаём хранилище по имени бэкенда:
+      - "sqlite" (по умолчанию) — db_path, при первом запуске переносим json_path;
+      - "json" — старый формат, всё в json_path.
+    """
+    if backend == "json":
+        return JsonCalendarStore(json_path)
+    return SqliteCalendarStore(db_path, legacy_json=json_path)
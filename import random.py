@@ -1,124 +1,105 @@
-import random
-import re
-from flask import Flask, request, session, render_template
+import click
+from flask import Flask, request, session
 from flask_login import LoginManager
-from bs4 import BeautifulSoup
-
-# Подключаем Blueprint’ы
-from quizz import quizz_bp
-from pichide import pichide_bp
-from coding import coding_bp
-from library import library_bp
-from mycalendar import mycalendar_bp
-from auth import auth_bp
-from account import account_bp
-from mc_quiz_word import mc_quiz_word_bp
-from matching import matching_bp
-
-app = Flask(__name__)
-app.secret_key = "MY_SUPER_SECRET_KEY"
+from quiz_engine import hide_letters_html, iter_hide_letters_html, resolve_seed
+from streaming import stream_page, compress_response
 
 login_manager = LoginManager()
-login_manager.init_app(app)
 login_manager.login_view = 'auth_bp.login'
 
-# Регистрируем Blueprint’ы
-app.register_blueprint(pichide_bp)
-app.register_blueprint(quizz_bp)
-app.register_blueprint(coding_bp)
-app.register_blueprint(library_bp)
-app.register_blueprint(auth_bp)
-app.register_blueprint(mycalendar_bp)
-app.register_blueprint(account_bp)
-app.register_blueprint(mc_quiz_word_bp)
-app.register_blueprint(matching_bp)
-
-def split_into_tokens_preserve_spaces(text):
-    return re.findall(r'\s+|[^\w\s]+|\w+', text)
-
-def hide_letters_in_word(word, prob=0.2, fill_mode=False):
-    if not word:
-        return word
-    arr = list(word)
-    n_hide = max(1, int(len(word)*prob)) if len(word) > 1 else 1
-    indices = random.sample(range(len(word)), min(n_hide, len(word)))
-
-    for i in indices:
-        if fill_mode:
-            correct_letter = arr[i]
-            # === Дополняем: оборачиваем input + вопросик ===
-            arr[i] = (
-                f'<span class="hint-wrapper" style="position:relative; display:inline-block;">'
-                f'  <input type="text" class="fill-input" maxlength="1" '
-                f'         data-correct="{correct_letter}">'
-                # Небольшой вопросик, при наведении (или нажатии) показывает букву
-                f'  <span class="hint-icon" '
-                f'        style="position:absolute; top:-1.3em; left:0; '
-                f'               cursor:pointer; font-size:12px; color:#999;" '
-                f'        onmouseover="this.textContent=\'{correct_letter}\'" '
-                f'        onmouseout="this.textContent=\'?\'" '
-                f'        onclick="this.textContent=\'{correct_letter}\'" '
-                f'>?</span>'
-                f'</span>'
-            )
-        else:
-            arr[i] = "_"
-    return "".join(arr)
-
-def transform_text_for_mode(text, removal_prob=0.2, fill_mode=False):
-    tokens = split_into_tokens_preserve_spaces(text)
-    out = []
-    for t in tokens:
-        if t.isspace():
-            out.append(t)
-        else:
-            if re.match(r'^\w+$', t):
-                replaced = hide_letters_in_word(t, removal_prob, fill_mode)
-            else:
-                replaced = t
-            out.append(f'<span class="word">{replaced}</span>')
-    return "".join(out)
-
-def process_rich_html(html, removal_prob=0.2, fill_mode=False):
-    soup = BeautifulSoup(html, "html.parser")
-
-    for element in soup.find_all(string=True):
-        orig_text = str(element)
-        new_html = transform_text_for_mode(orig_text, removal_prob, fill_mode)
-        new_frag = BeautifulSoup(new_html, "html.parser")
-        element.replace_with(new_frag)
-    return str(soup)
+def register_blueprints(app):
+    """
+    Подключаем Blueprint’ы. Модули импортируются здесь, а тяжёлые библиотеки
+    разбора документов внутри них — при первом использовании (lazy_imports).
+    """
+    from quizz import quizz_bp
+    from pichide import pichide_bp
+    from coding import coding_bp
+    from library import library_bp
+    from mycalendar import mycalendar_bp
+    from auth import auth_bp
+    from account import account_bp
+    from mc_quiz_word import mc_quiz_word_bp
+    from matching import matching_bp
+    from jobs import jobs_bp
+    from library_quiz import library_quiz_bp
+
+    app.register_blueprint(pichide_bp)
+    app.register_blueprint(quizz_bp)
+    app.register_blueprint(coding_bp)
+    app.register_blueprint(library_bp)
+    app.register_blueprint(auth_bp)
+    app.register_blueprint(mycalendar_bp)
+    app.register_blueprint(account_bp)
+    app.register_blueprint(mc_quiz_word_bp)
+    app.register_blueprint(matching_bp)
+    app.register_blueprint(jobs_bp)
+    app.register_blueprint(library_quiz_bp)
+
+def create_app():
+    """Фабрика приложения."""
+    app = Flask(__name__)
+    app.secret_key = "MY_SUPER_SECRET_KEY"
+
+    login_manager.init_app(app)
+    register_blueprints(app)
+    app.add_url_rule('/', view_func=index, methods=['GET', 'POST'])
+    app.after_request(compress_response)
+    app.cli.add_command(startup_profile_command)
+    return app
+
+@click.command("startup-profile")
+@click.option("--top", default=25, show_default=True, help="Сколько модулей показать.")
+@click.option("--preload", is_flag=True, help="Импортировать и ленивые модули (как без ленивой загрузки).")
+def startup_profile_command(top, preload):
+    """Время импорта каждого модуля при холодном старте приложения."""
+    from startup_profile import profile_startup, format_profile
+    click.echo(format_profile(profile_startup(preload=preload), top=top))
+
+def process_rich_html(html, removal_prob=0.2, fill_mode=False, seed=None):
+    """Скрываем буквы в словах HTML (см. quiz_engine.hide_letters_html); seed — для воспроизводимости."""
+    return hide_letters_html(html, removal_prob, fill_mode, seed)
 
 @login_manager.user_loader
 def load_user(user_id):
     return None
 
-@app.route('/', methods=['GET','POST'])
 def index():
     mode = "remove"
     hidden_percentage = 20
     editor_initial = ""
     output_html = ""
+    seed_input = ""
+    seed = None
 
     if request.method == 'POST':
         mode = request.form.get("mode", "remove")
         hidden_percentage = int(request.form.get("hidden_percentage", "20"))
         input_text = request.form.get("input_text", "")
+        # Необязательный seed: тот же текст и seed -> те же скрытые буквы;
+        # без него берём новый и показываем, чтобы результат можно было повторить
+        seed_input = request.form.get("seed", "").strip()
+        seed = resolve_seed(seed_input)
 
         fill_mode = (mode == "fill")
         prob = hidden_percentage / 100.0 if fill_mode else 0.2
 
-        output_html = process_rich_html(input_text, removal_prob=prob, fill_mode=fill_mode)
+        # Результат собирается по ходу отдачи страницы (streaming.stream_page)
+        output_html = iter_hide_letters_html(input_text, prob, fill_mode, seed)
         editor_initial = input_text
 
-    return render_template(
+    return stream_page(
         "import_random.html",
         mode=mode,
         hidden_percentage=hidden_percentage,
         editor_initial=editor_initial,
-        output_html=output_html
+        output_html=output_html,
+        seed_input=seed_input,
+        seed=seed
     )
 
+app = create_app()
+
 if __name__ == '__main__':
     app.run(host="0.0.0.0", debug=True, port=5000)
 
@@ -0,0 +1,548 @@
+import os
+import time
+import uuid
+import pickle
+import sqlite3
+import threading
+import collections
+import multiprocessing
+from multiprocessing.connection import wait
+from flask import Blueprint, jsonify, render_template, session
+from uploads import Upload
+
+jobs_bp = Blueprint('jobs_bp', __name__, url_prefix='/jobs')
+
+# Фоновые задачи (конвертация docx/PDF, разбор загрузок) в отдельных процессах.
+# Только стандартная библиотека: очередь и пул живут в процессе приложения, а
+# состояние и результаты задач — в SQLite (JOBS_DB), общей для всех процессов
+# приложения: при нескольких воркерах WSGI опрос /jobs/<id> и переход на
+# страницу с результатом могут попасть не в тот процесс, где задачу поставили.
+JOBS_DB = os.environ.get("JOBS_DB", "jobs.db")
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", "2"))
+# Сколько задач может ждать в очереди; дальше submit -> JobQueueFull (503)
+JOB_QUEUE_MAX = int(os.environ.get("JOB_QUEUE_MAX", "64"))
+# Время выполнения одной задачи, секунд; дольше — процесс убиваем
+JOB_TIMEOUT = float(os.environ.get("JOB_TIMEOUT", "120"))
+# Сколько хранить результат завершённой задачи, секунд
+JOB_RESULT_TTL = 600
+# Процесс-владелец раз в JOB_HEARTBEAT секунд отмечает свои незавершённые
+# задачи (и забирает запросы отмены из других процессов); задача без отметки
+# дольше JOB_LOST_AFTER секунд считается потерянной (процесс перезапущен/упал)
+JOB_HEARTBEAT = 1.0
+JOB_LOST_AFTER = 30.0
+# Сколько ждать выхода процесса после terminate, секунд; дальше — kill
+JOB_KILL_WAIT = 5.0
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED, TIMEOUT = (
+    "queued", "running", "done", "failed", "cancelled", "timeout")
+PENDING_STATES = (QUEUED, RUNNING)
+
+
+class JobQueueFull(Exception):
+    """Очередь задач заполнена — клиенту стоит повторить позже."""
+
+
+# Счётчики, которые задачи копят в памяти процесса-воркера (например, статистика
+# кэшей конвертации): name -> take(), прирост {counter: n} с прошлого вызова.
+# Воркер отправляет их вместе с ответом, процесс-владелец суммирует в JobTable.
+_worker_counters = {}
+
+
+def register_worker_counters(name, take):
+    """Регистрируем счётчики модуля (регистрация при импорте — и в воркере тоже)."""
+    _worker_counters[name] = take
+
+
+def _take_worker_counters():
+    counters = {name: take() for name, take in _worker_counters.items()}
+    return {name: c for name, c in counters.items() if c}
+
+
+def _worker_main(conn):
+    """Цикл рабочего процесса: получаем (fn, args), отвечаем (status, payload, счётчики)."""
+    while True:
+        try:
+            msg = conn.recv()
+        except (EOFError, OSError):
+            return
+        if msg is None:
+            return
+        fn, args = msg
+        try:
+            reply = ("ok", fn(*args))
+        except Exception as e:
+            reply = ("error", f"{type(e).__name__}: {e}")
+        counters = _take_worker_counters()
+        try:
+            conn.send(reply + (counters,))
+        except Exception as e:
+            # результат не сериализуется
+            conn.send(("error", f"{type(e).__name__}: {e}", counters))
+
+
+class Job:
+    def __init__(self, fn, args, owner, timeout, key=None):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.name = getattr(fn, "__qualname__", str(fn))
+        self.fn, self.args = fn, args
+        # временные файлы загрузок: удаляются при любом завершении задачи —
+        # при отмене/таймауте finally в функции задачи не выполнится
+        self.uploads = [a for a in args if isinstance(a, Upload) and a.path is not None]
+        self.owner = owner
+        self.timeout = timeout
+        self.state = QUEUED
+        self.result = None
+        self.error = None
+        self.cancel_requested = False
+        self.created = time.time()
+        self.started = self.finished = None
+
+    @classmethod
+    def from_row(cls, row):
+        """Снимок задачи из JobTable (fn/args там не хранятся)."""
+        job = cls.__new__(cls)
+        (job.id, job.key, job.owner, job.name, job.state, job.error, result,
+         job.created, job.started, job.finished, job.timeout) = row
+        job.result = pickle.loads(result) if result is not None else None
+        job.fn = job.args = None
+        job.uploads = []
+        job.cancel_requested = False
+        return job
+
+    def to_dict(self, with_result=False):
+        data = {"id": self.id, "name": self.name, "state": self.state, "error": self.error,
+                "created": self.created, "started": self.started, "finished": self.finished}
+        if with_result and self.state == DONE:
+            data["result"] = self.result
+        return data
+
+
+class JobTable:
+    """
+    Состояние задач в SQLite (одна строка на задачу, результат — pickle).
+    Пишет только процесс, где задача выполняется; остальные читают её
+    и могут запросить отмену (cancel_requested). key хранится как repr.
+    """
+
+    COLUMNS = "id, key, owner, name, state, error, result, created, started, finished, timeout"
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS jobs ("
+                         " id TEXT PRIMARY KEY, key TEXT, owner TEXT, name TEXT,"
+                         " state TEXT NOT NULL, error TEXT, result BLOB,"
+                         " created REAL, started REAL, finished REAL, timeout REAL,"
+                         " heartbeat REAL, cancel_requested INTEGER NOT NULL DEFAULT 0)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_finished ON jobs(finished)")
+            conn.execute("CREATE TABLE IF NOT EXISTS counters ("
+                         " name TEXT, counter TEXT, value INTEGER NOT NULL,"
+                         " PRIMARY KEY (name, counter))")
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def insert(self, job):
+        with self._conn() as conn:
+            conn.execute(f"INSERT INTO jobs({self.COLUMNS}, heartbeat) VALUES (?,?,?,?,?,?,?,?,?,?,?,?)",
+                         (job.id, repr(job.key), job.owner, job.name, job.state, None, None,
+                          job.created, None, None, job.timeout, time.time()))
+
+    def save(self, job):
+        """Состояние задачи после запуска/завершения."""
+        result = None
+        if job.state == DONE:
+            try:
+                result = pickle.dumps(job.result, pickle.HIGHEST_PROTOCOL)
+            except Exception as e:
+                job.state, job.error = FAILED, f"{type(e).__name__}: {e}"
+        with self._conn() as conn:
+            conn.execute("UPDATE jobs SET state=?, error=?, result=?, started=?, finished=?, heartbeat=?"
+                         " WHERE id=?", (job.state, job.error, result, job.started, job.finished,
+                                         time.time(), job.id))
+
+    def get(self, job_id):
+        row = self._conn().execute(
+            f"SELECT {self.COLUMNS}, heartbeat FROM jobs WHERE id=?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = Job.from_row(row[:-1])
+        if job.state in PENDING_STATES and row[-1] < time.time() - JOB_LOST_AFTER:
+            job.state, job.error = FAILED, "Job was lost: the server process running it stopped"
+        return job
+
+    def heartbeat(self, job_ids):
+        """
+        Отмечаем живые задачи процесса; возвращаем id тех из них, которые
+        попросили отменить из другого процесса.
+        """
+        if not job_ids:
+            return set()
+        marks = ",".join("?" * len(job_ids))
+        with self._conn() as conn:
+            conn.execute(f"UPDATE jobs SET heartbeat=? WHERE id IN ({marks})", (time.time(), *job_ids))
+            rows = conn.execute(f"SELECT id FROM jobs WHERE cancel_requested=1 AND id IN ({marks})",
+                                job_ids).fetchall()
+        return {r[0] for r in rows}
+
+    def request_cancel(self, job_id):
+        """Отмена задачи, которая выполняется в другом процессе; False — уже завершилась."""
+        with self._conn() as conn:
+            return conn.execute("UPDATE jobs SET cancel_requested=1 WHERE id=? AND state IN (?, ?)",
+                                (job_id, *PENDING_STATES)).rowcount > 0
+
+    def add_counters(self, counters):
+        """Прибавляем счётчики воркеров: {name: {counter: n}}."""
+        with self._conn() as conn:
+            conn.executemany("INSERT INTO counters(name, counter, value) VALUES (?, ?, ?)"
+                             " ON CONFLICT(name, counter) DO UPDATE SET value = value + excluded.value",
+                             [(name, counter, n) for name, values in counters.items()
+                              for counter, n in values.items()])
+
+    def counters(self):
+        """Суммы счётчиков воркеров всех процессов: {name: {counter: n}}."""
+        result = {}
+        for name, counter, n in self._conn().execute("SELECT name, counter, value FROM counters"):
+            result.setdefault(name, {})[counter] = n
+        return result
+
+    def states(self):
+        return dict(self._conn().execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall())
+
+    def prune(self, before):
+        with self._conn() as conn:
+            conn.execute("DELETE FROM jobs WHERE finished < ?", (before,))
+            # задачи процессов, которые так и не вернулись
+            conn.execute("DELETE FROM jobs WHERE finished IS NULL AND heartbeat < ?",
+                         (before - JOB_LOST_AFTER,))
+
+
+class _Worker:
+    def __init__(self, ctx):
+        self.conn, child = ctx.Pipe()
+        self.proc = ctx.Process(target=_worker_main, args=(child,), daemon=True)
+        self.proc.start()
+        child.close()
+        self.job = None
+        self.deadline = None
+
+    def kill(self):
+        self.proc.terminate()
+        self.proc.join(JOB_KILL_WAIT)
+        if self.proc.is_alive():
+            self.proc.kill()
+            self.proc.join()
+        self.conn.close()
+
+
+class JobManager:
+    """
+    Пул рабочих процессов с ограниченной очередью.
+
+    submit(fn, *args) ставит задачу (fn — функция верхнего уровня модуля,
+    аргументы и результат должны сериализоваться pickle) и сразу возвращает Job.
+    Поток-диспетчер раздаёт задачи свободным процессам, собирает ответы и
+    следит за таймаутами. Отмена/таймаут выполняющейся задачи убивает её
+    процесс и запускает новый — иначе зависший парсер держал бы воркер вечно.
+    Процессы стартуют лениво, при первой задаче.
+
+    Состояние задач пишется в JobTable (db_path), поэтому get/cancel работают
+    из любого процесса приложения. Очередь, воркеры и key — свои у процесса.
+    """
+
+    def __init__(self, workers=None, max_queue=None, timeout=None,
+                 result_ttl=JOB_RESULT_TTL, mp_context="spawn", db_path=None):
+        self.n_workers = workers or JOB_WORKERS
+        self.max_queue = max_queue or JOB_QUEUE_MAX
+        self.timeout = timeout or JOB_TIMEOUT
+        self.result_ttl = result_ttl
+        self.table = JobTable(db_path or JOBS_DB)
+        self._ctx = multiprocessing.get_context(mp_context)
+        self._lock = threading.Lock()
+        self._queue = collections.deque()
+        self._jobs = {}     # незавершённые задачи этого процесса
+        self._by_key = {}
+        self._workers = []  # None — слот ждёт нового процесса (см. _respawn)
+        self._retired = []  # снятые воркеры: убиваются вне self._lock
+        self._thread = None
+        self._closed = False
+        self._wakeup_r = self._wakeup_w = None
+        self._next_heartbeat = self._next_prune = 0
+
+    def _start(self):
+        if self._thread is None:
+            self._wakeup_r, self._wakeup_w = self._ctx.Pipe(duplex=False)
+            self._workers = [None] * self.n_workers
+            self._thread = threading.Thread(target=self._loop, name="job-dispatcher", daemon=True)
+            self._thread.start()
+
+    def _wakeup(self):
+        self._wakeup_w.send(None)
+
+    def submit(self, fn, *args, owner=None, timeout=None, key=None):
+        """
+        key — для повторных запросов той же работы (например, конвертация
+        одного и того же файла): пока задача с этим key не завершилась,
+        возвращается она же, а не новая.
+        """
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("JobManager is shut down")
+            if key is not None:
+                job = self._by_key.get(key)
+                if job is not None and job.state in PENDING_STATES:
+                    return job
+            if len(self._queue) >= self.max_queue:
+                raise JobQueueFull(f"{len(self._queue)} jobs already waiting")
+            self._start()
+            job = Job(fn, args, owner, timeout or self.timeout, key)
+            self.table.insert(job)
+            self._jobs[job.id] = job
+            if key is not None:
+                self._by_key[key] = job
+            self._queue.append(job)
+            self._wakeup()
+        return job
+
+    def get(self, job_id):
+        """Снимок задачи из общей таблицы (задача могла быть поставлена другим процессом)."""
+        return self.table.get(job_id)
+
+    def cancel(self, job_id):
+        """Отменяем задачу; False, если она уже завершилась."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return self.table.request_cancel(job_id)
+            if job.state == QUEUED:
+                self._queue.remove(job)
+                self._finish(job, CANCELLED, "Cancelled")
+            else:
+                job.cancel_requested = True
+                self._wakeup()
+            return True
+
+    def stats(self):
+        with self._lock:
+            return {"workers": sum(w is not None for w in self._workers), "queued": len(self._queue),
+                    "max_queue": self.max_queue, "jobs": self.table.states()}
+
+    def counters(self):
+        """Счётчики, накопленные в воркерах (см. register_worker_counters)."""
+        return self.table.counters()
+
+    def shutdown(self):
+        with self._lock:
+            self._closed = True
+            if self._thread is None:
+                return
+            self._wakeup()
+        self._thread.join()
+        for w in self._retired + self._workers:
+            if w is not None:
+                w.kill()
+
+    # ---------- диспетчер (всё ниже — под self._lock или в его потоке) ----------
+
+    def _finish(self, job, state, error=None, result=None):
+        job.state, job.error, job.result = state, error, result
+        job.finished = time.time()
+        job.fn = job.args = None
+        for upload in job.uploads:
+            upload.discard()
+        job.uploads = []
+        self.table.save(job)
+        job.result = None  # результат хранится в таблице
+        self._jobs.pop(job.id, None)
+        if job.key is not None and self._by_key.get(job.key) is job:
+            del self._by_key[job.key]
+
+    def _retire(self, i):
+        """Снимаем воркер со слота; убьёт его и запустит замену _respawn."""
+        self._retired.append(self._workers[i])
+        self._workers[i] = None
+
+    def _respawn(self):
+        """
+        Убиваем снятые воркеры и запускаем недостающие. Вызывается из потока-
+        диспетчера без self._lock: join и запуск процесса занимают до секунд,
+        и submit из потоков запросов не должен их ждать.
+        """
+        with self._lock:
+            retired, self._retired = self._retired, []
+            missing = [] if self._closed else [i for i, w in enumerate(self._workers) if w is None]
+        for w in retired:
+            w.kill()
+        fresh = [_Worker(self._ctx) for _ in missing]
+        with self._lock:
+            for i, w in zip(missing, fresh):
+                self._workers[i] = w
+
+    def _dispatch(self, w, job):
+        try:
+            w.conn.send((job.fn, job.args))
+        except Exception as e:
+            self._finish(job, FAILED, f"{type(e).__name__}: {e}")
+            return
+        job.state, job.started = RUNNING, time.time()
+        job.args = None
+        self.table.save(job)
+        w.job, w.deadline = job, time.monotonic() + job.timeout
+
+    def _heartbeat(self, now):
+        """Отметка живых задач в таблице и отмены, запрошенные другими процессами."""
+        if now < self._next_heartbeat:
+            return
+        self._next_heartbeat = now + JOB_HEARTBEAT
+        for job_id in self.table.heartbeat(list(self._jobs)):
+            job = self._jobs[job_id]
+            if job.state == QUEUED:
+                self._queue.remove(job)
+                self._finish(job, CANCELLED, "Cancelled")
+            else:
+                job.cancel_requested = True
+
+    def _prune(self, now):
+        if now >= self._next_prune:
+            self._next_prune = now + 60
+            self.table.prune(time.time() - self.result_ttl)
+
+    def _loop(self):
+        while True:
+            self._respawn()
+            with self._lock:
+                if self._closed:
+                    return
+                now = time.monotonic()
+                self._heartbeat(now)
+                for i, w in enumerate(self._workers):
+                    if w and w.job and (w.job.cancel_requested or now >= w.deadline):
+                        if w.job.cancel_requested:
+                            self._finish(w.job, CANCELLED, "Cancelled")
+                        else:
+                            self._finish(w.job, TIMEOUT, f"Timed out after {w.job.timeout:g} s")
+                        self._retire(i)
+                for i, w in enumerate(self._workers):
+                    if w and w.job is None and self._queue:
+                        if not w.proc.is_alive():
+                            self._retire(i)
+                            continue
+                        self._dispatch(w, self._queue.popleft())
+                self._prune(now)
+                busy = [w for w in self._workers if w and w.job]
+                conns = [w.conn for w in busy] + [self._wakeup_r]
+                timeout = None
+                if busy:
+                    timeout = max(min(w.deadline for w in busy) - now, 0)
+                if self._jobs:
+                    wait_heartbeat = max(self._next_heartbeat - now, 0)
+                    timeout = wait_heartbeat if timeout is None else min(timeout, wait_heartbeat)
+                if self._retired or None in self._workers:
+                    timeout = 0  # сначала _respawn
+
+            ready = wait(conns, timeout)
+
+            with self._lock:
+                for conn in ready:
+                    if conn is self._wakeup_r:
+                        while conn.poll():
+                            conn.recv()
+                        continue
+                    i = next((i for i, w in enumerate(self._workers) if w and w.conn is conn), None)
+                    if i is None or self._workers[i].job is None:
+                        continue
+                    w = self._workers[i]
+                    try:
+                        status, payload, counters = conn.recv()
+                    except (EOFError, OSError):
+                        self._finish(w.job, FAILED, "Worker process died")
+                        self._retire(i)
+                        continue
+                    if counters:
+                        self.table.add_counters(counters)
+                    if status == "ok":
+                        self._finish(w.job, DONE, result=payload)
+                    else:
+                        self._finish(w.job, FAILED, payload)
+                    w.job = w.deadline = None
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_jobs():
+    """Общий JobManager процесса (создаётся при первом обращении)."""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = JobManager()
+        return _manager
+
+
+def current_owner():
+    return session.get('user_id', '_guest')
+
+
+def submit_job(fn, *args, timeout=None, key=None):
+    """Ставим задачу от имени текущего пользователя (key — см. JobManager.submit)."""
+    owner = current_owner()
+    if key is not None:
+        key = (owner, key)
+    return get_jobs().submit(fn, *args, owner=owner, timeout=timeout, key=key)
+
+
+def get_user_job(job_id, key=None):
+    """
+    Задача текущего пользователя (чужие и просроченные -> None).
+    key — только задача с тем же key, что был передан в submit_job.
+    """
+    job = get_jobs().get(job_id) if job_id else None
+    if job is None or job.owner != current_owner():
+        return None
+    if key is not None and job.key != repr((job.owner, key)):
+        return None
+    return job
+
+
+def render_job_wait(job, title="Processing..."):
+    """Страница ожидания: опрашивает /jobs/<id> и перезагружается, когда задача готова."""
+    return render_template("job_wait.html", job=job, title=title), 202
+
+
+@jobs_bp.route('/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """Статус задачи; результат — когда state == "done"."""
+    job = get_user_job(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    data = job.to_dict(with_result=True)
+    try:
+        return jsonify(data)
+    except TypeError:
+        # результат не JSON (например, блоки matching) — его берёт сама страница
+        # по ?job=<id>, странице ожидания хватит состояния
+        del data["result"]
+        return jsonify(data)
+
+
+@jobs_bp.route('/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    job = get_user_job(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    get_jobs().cancel(job_id)
+    return jsonify(job.to_dict())
+
+
+@jobs_bp.route('/stats', methods=['GET'])
+def job_stats():
+    return jsonify(get_jobs().stats())
@@ -0,0 +1,96 @@
+import sys
+import time
+import threading
+import importlib
+import importlib.util
+
+# Тяжёлые библиотеки разбора документов (bs4, python-docx, mammoth, PyPDF2,
+# openpyxl) импортируются не при старте приложения, а при первом обращении
+# к атрибуту модуля. Время каждого такого импорта записывается в IMPORT_COSTS.
+IMPORT_COSTS = {}  # имя модуля -> секунды (первый импорт в этом процессе)
+
+_registry = {}
+_lock = threading.RLock()
+
+
+class LazyModule:
+    """
+    Заместитель модуля: `docx = lazy_import("docx")`, затем `docx.Document(...)`
+    как обычно — настоящий import выполняется при первом обращении к атрибуту.
+
+    bool(module) говорит, установлен ли модуль, и при этом его не импортирует
+    (importlib.util.find_spec), поэтому проверки вида `if not mammoth:` остаются
+    дешёвыми.
+    """
+
+    def __init__(self, name):
+        self.__dict__["_name"] = name
+        self.__dict__["_module"] = None
+
+    def _load(self):
+        module = self.__dict__["_module"]
+        if module is None:
+            with _lock:
+                module = self.__dict__["_module"]
+                if module is None:
+                    name = self.__dict__["_name"]
+                    already = name in sys.modules
+                    t0 = time.perf_counter()
+                    module = importlib.import_module(name)
+                    if not already:
+                        IMPORT_COSTS[name] = time.perf_counter() - t0
+                    self.__dict__["_module"] = module
+        return module
+
+    @property
+    def loaded(self):
+        return self.__dict__["_module"] is not None
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._load(), attr, value)
+
+    def __bool__(self):
+        if self.__dict__["_module"] is not None:
+            return True
+        try:
+            return importlib.util.find_spec(self.__dict__["_name"]) is not None
+        except (ImportError, ValueError):
+            return False
+
+    def __repr__(self):
+        state = "loaded" if self.loaded else "not loaded"
+        return f"<lazy module {self.__dict__['_name']!r} ({state})>"
+
+
+def lazy_import(name):
+    """Ленивый модуль; повторный вызов с тем же именем возвращает тот же объект."""
+    with _lock:
+        module = _registry.get(name)
+        if module is None:
+            module = _registry[name] = LazyModule(name)
+        return module
+
+
+def preload(names=None):
+    """
+    Импортируем ленивые модули заранее (все зарегистрированные или names) —
+    например, перед fork в prefork-сервере. Неустановленные пропускаем.
+    """
+    for name in names or list(_registry):
+        module = lazy_import(name)
+        if module:
+            module._load()
+
+
+def import_costs():
+    """{модуль: секунды} для уже выполненных ленивых импортов, самые дорогие первыми."""
+    return dict(sorted(IMPORT_COSTS.items(), key=lambda kv: kv[1], reverse=True))
+
+
+def registered_modules():
+    """Имена всех ленивых модулей и загружены ли они: {имя: bool}."""
+    with _lock:
+        return {name: module.loaded for name, module in _registry.items()}
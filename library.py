@@ -1,23 +1,67 @@
 import os
+import re
+import html
 import shutil
 import json
-from flask import Blueprint, render_template, request, redirect, url_for, session, jsonify
+import hashlib
+import mimetypes
+from flask import Blueprint, render_template, request, redirect, url_for, session, jsonify, send_from_directory, make_response
 from markupsafe import escape
 from werkzeug.utils import secure_filename
 from urllib.parse import quote
-
-try:
-    import mammoth
-except ImportError:
-    mammoth = None
-
-try:
-    import PyPDF2
-except ImportError:
-    PyPDF2 = None
+from library_cache import ConversionCache, is_hidden_entry
+from library_index import library_index
+from library_search import search_index
+from jobs import (submit_job, get_user_job, get_jobs, render_job_wait, register_worker_counters,
+                  JobQueueFull, DONE)
+from lazy_imports import lazy_import
+from study_formats import iter_docx_paragraphs
+
+# Импортируются при первом использовании; `if not mammoth` — «не установлен»
+mammoth = lazy_import("mammoth")
+PyPDF2 = lazy_import("PyPDF2")
 
 library_bp = Blueprint('library_bp', __name__, url_prefix='/library')
 
+# Кэш doc/docx -> html (память + диск в .cache библиотеки).
+# Версия 2: картинки — ссылки на DOCX_IMAGE_DIR, а не base64 внутри HTML.
+DOC_CACHE_MAX_BYTES = 64 * 1024 * 1024
+doc_html_cache = ConversionCache("docx_html", max_bytes=DOC_CACHE_MAX_BYTES, version=2)
+
+# Картинки из docx: общее хранилище, имя файла = sha256 содержимого,
+# поэтому одинаковые картинки в разных документах/у разных пользователей
+# хранятся один раз и могут кэшироваться браузером "навсегда".
+DOCX_IMAGE_DIR = os.path.join('static', 'docx_images')
+DOCX_IMAGE_URL = '/library/img/'
+DOCX_IMAGE_MAX_AGE = 365 * 24 * 3600
+
+# Текст PDF по страницам: извлекаем один раз на (путь, размер, mtime)
+PDF_CACHE_MAX_BYTES = 64 * 1024 * 1024
+PDF_FIRST_PAGES = 10   # сколько страниц показываем сразу в open_file
+PDF_MAX_PAGES_PER_REQUEST = 50
+pdf_pages_cache = ConversionCache(
+    "pdf_pages", max_bytes=PDF_CACHE_MAX_BYTES,
+    sizeof=lambda pages: sum(len(p.encode("utf-8")) for p in pages))
+
+# Абзацы docx для квизов (matching, multiple choice): [[номер, текст], ...]
+DOCX_LINES_CACHE_MAX_BYTES = 32 * 1024 * 1024
+docx_lines_cache = ConversionCache(
+    "docx_lines", max_bytes=DOCX_LINES_CACHE_MAX_BYTES,
+    sizeof=lambda lines: sum(len(text.encode("utf-8")) + 16 for _, text in lines))
+
+# Список файлов: по сколько записей на страницу
+LIBRARY_PAGE_SIZE = 200
+
+# Полнотекстовый поиск: какие файлы индексируем как обычный текст
+SEARCH_TEXT_EXTS = ['.txt','.md','.py','.cs','.cpp','.json','.yaml']
+SEARCH_PAGE_SIZE = 20
+
+# Все кэши конвертации библиотеки — сбрасываются вместе при изменении файлов
+CONVERSION_CACHES = [doc_html_cache, pdf_pages_cache, docx_lines_cache]
+# Конвертируют процессы-воркеры jobs: их счётчики кэшей суммируются в таблице задач
+for _cache in CONVERSION_CACHES:
+    register_worker_counters(_cache.name, _cache.take_stats)
+
 def get_user_library_root():
     """Возвращает путь к папке пользователя (или _guest)."""
     if 'user_id' not in session:
@@ -28,52 +72,110 @@ def get_user_library_root():
     os.makedirs(root, exist_ok=True)
     return root
 
-def gather_all_folders(base_dir, rel=""):
-    """Сканируем папки рекурсивно (для Move-модалки)."""
-    results = []
-    folder_path = os.path.join(base_dir, rel)
-    if os.path.isdir(folder_path):
-        for entry in os.listdir(folder_path):
-            full = os.path.join(folder_path, entry)
-            if os.path.isdir(full):
-                sub_rel = os.path.join(rel, entry).replace("\\","/")
-                results.append(sub_rel if sub_rel else ".")
-                results.extend(gather_all_folders(base_dir, sub_rel))
-    return results
+def store_docx_image(bin_data, content_type):
+    """Сохраняем картинку под именем sha256.ext (если такой ещё нет), возвращаем имя."""
+    ext = mimetypes.guess_extension(content_type or "") or ".bin"
+    name = hashlib.sha256(bin_data).hexdigest() + ext
+    path = os.path.join(DOCX_IMAGE_DIR, name)
+    if not os.path.exists(path):
+        os.makedirs(DOCX_IMAGE_DIR, exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(bin_data)
+        os.replace(tmp, path)
+    return name
 
 def convert_docx_to_html(filepath):
-    """Используем mammoth для doc/docx -> html."""
+    """Используем mammoth для doc/docx -> html (картинки — ссылками на /library/img/)."""
     if not mammoth:
         return "<p><b>[mammoth not installed!]</b></p>"
-    def inline_img_handler(img):
-        import base64
+    def stored_img_handler(img):
         with img.open() as f:
             bin_data = f.read()
-        encoded = base64.b64encode(bin_data).decode('ascii')
+        name = store_docx_image(bin_data, img.content_type)
         return {
-            "src": f"data:{img.content_type};base64,{encoded}",
+            "src": DOCX_IMAGE_URL + name,
             "alt": img.alt_text if img.alt_text else ""
         }
-    options = {"convert_image": mammoth.images.inline(inline_img_handler)}
+    options = {"convert_image": mammoth.images.img_element(stored_img_handler)}
     with open(filepath,"rb") as f:
         result = mammoth.convert_to_html(f, convert_image=options["convert_image"])
         return result.value
 
+def cached_docx_html(root, rel_path):
+    """convert_docx_to_html через кэш (rel_path — путь внутри библиотеки)."""
+    if not mammoth:
+        return convert_docx_to_html(os.path.join(root, rel_path))
+    return doc_html_cache.get(root, rel_path, convert_docx_to_html)
+
+def conversion_key(convert, root, rel_path):
+    return (convert.__name__, root, rel_path)
+
+def conversion_job(convert, root, rel_path):
+    """
+    Ставим конвертацию файла в фон (cached_docx_html / cached_pdf_pages):
+    результат ляжет в кэш, повторный запрос страницы возьмёт его оттуда
+    (см. converted). Пока задача не завершилась, для того же файла
+    возвращается она же. None — очередь задач переполнена.
+    """
+    try:
+        return submit_job(convert, root, rel_path, key=conversion_key(convert, root, rel_path))
+    except JobQueueFull:
+        return None
+
+def converted(cache, convert, root, rel_path, job_id=None):
+    """
+    Результат конвертации для страницы или None (ещё не готов).
+    Берётся из кэша, а если там нет — из завершённой задачи job_id (страница
+    ожидания перезагружается с ?job=<id>): кэш мог не записаться на диск,
+    и без этого страница ставила бы конвертацию снова и снова. Задача должна
+    быть той же конвертацией того же файла и начаться после его изменения.
+    """
+    value = cache.peek(root, rel_path)
+    if value is None and job_id:
+        job = get_user_job(job_id, key=conversion_key(convert, root, rel_path))
+        if (job is not None and job.state == DONE
+                and job.started >= os.path.getmtime(os.path.join(root, rel_path))):
+            value = job.result
+    return value
+
+def invalidate_conversions(root, *rel_paths):
+    """Сбрасываем кэши конвертации для изменённых файлов/папок."""
+    for rel in rel_paths:
+        for cache in CONVERSION_CACHES:
+            cache.invalidate(root, rel)
+
+def read_pdf_pages(filepath):
+    """Извлекаем текст PDF постранично (PyPDF2) -> список строк."""
+    with open(filepath, 'rb') as f:
+        reader = PyPDF2.PdfReader(f)
+        return [page.extract_text() or "" for page in reader.pages]
+
+def cached_pdf_pages(root, rel_path):
+    """read_pdf_pages через кэш. Ошибки не кэшируются, а пробрасываются."""
+    return pdf_pages_cache.get(root, rel_path, read_pdf_pages)
+
+def pdf_pages_text(pages):
+    """Страницы PDF -> один текст (каждая страница с новой строки)."""
+    return "".join(p + "\n" for p in pages)
+
 def read_pdf_text(filepath):
     """Извлекаем текст из PDF (PyPDF2)."""
     if not PyPDF2:
         return "(PyPDF2 not installed.)"
     try:
-        with open(filepath, 'rb') as f:
-            reader = PyPDF2.PdfReader(f)
-            out = ""
-            for page in reader.pages:
-                out += (page.extract_text() or "")
-                out += "\n"
-        return out
+        return pdf_pages_text(read_pdf_pages(filepath))
     except Exception as e:
         return f"Error reading PDF: {e}"
 
+def read_docx_lines(filepath):
+    """Непустые абзацы docx потоком (study_formats) -> [[номер, текст], ...] (сериализуется в JSON)."""
+    return [[n, text] for n, text in iter_docx_paragraphs(filepath)]
+
+def cached_docx_lines(root, rel_path):
+    """read_docx_lines через кэш. StudyFormatError (не docx) не кэшируется, а пробрасывается."""
+    return docx_lines_cache.get(root, rel_path, read_docx_lines)
+
 def read_text_file(filepath):
     """Просто читаем текст (если двоичный — заменяем ошибки)."""
     try:
@@ -82,14 +184,87 @@ def read_text_file(filepath):
     except:
         return "Unable to read file as text."
 
+def html_to_text(markup):
+    """Грубо, но быстро: убираем теги, раскрываем сущности."""
+    markup = re.sub(r'<(script|style)\b.*?</\1>', ' ', markup, flags=re.S | re.I)
+    return html.unescape(re.sub(r'<[^>]+>', ' ', markup))
+
+def extract_search_text(root, rel_path):
+    """
+    Текст файла для полнотекстового индекса; None — такой тип не индексируем.
+    docx и PDF идут через те же кэши, что и просмотр файла.
+    """
+    ext = os.path.splitext(rel_path)[1].lower()
+    try:
+        if ext == '.docx':
+            return html_to_text(cached_docx_html(root, rel_path)) if mammoth else ""
+        if ext == '.pdf':
+            return "\n".join(cached_pdf_pages(root, rel_path)) if PyPDF2 else ""
+        if ext in ['.html','.htm']:
+            return html_to_text(read_text_file(os.path.join(root, rel_path)))
+        if ext in SEARCH_TEXT_EXTS:
+            return read_text_file(os.path.join(root, rel_path))
+    except Exception:
+        # битый файл: ищется хотя бы по имени
+        return ""
+    return None
+
+def index_documents(root, *rel_paths):
+    """(Пере)индексируем загруженные/сохранённые файлы для поиска."""
+    with search_index(root) as s:
+        for rel in rel_paths:
+            s.index_file(rel, lambda r: extract_search_text(root, r))
+
+def reindex_library(root):
+    """Полная сверка индекса поиска с диском (файлы, добавленные в обход приложения)."""
+    found = set()
+    with search_index(root) as s:
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames[:] = [d for d in dirnames if not is_hidden_entry(d)]
+            for name in filenames:
+                if is_hidden_entry(name):
+                    continue
+                rel = os.path.relpath(os.path.join(dirpath, name), root).replace("\\", "/")
+                found.add(rel)
+                s.index_file(rel, lambda r: extract_search_text(root, r))
+        for rel in s.paths() - found:
+            s.remove(rel)
+    return len(found)
+
 @library_bp.route('/all_folders_json')
 def all_folders_json():
-    """Для Move-модалки."""
+    """
+    Для Move-модалки: все папки библиотеки из индекса (без обхода диска).
+    ETag меняется при любом изменении дерева, так что повторное открытие -> 304.
+    """
     root = get_user_library_root()
-    folds = gather_all_folders(root, "")
-    if "." not in folds:
-        folds.insert(0, ".")
-    return jsonify(folds)
+    with library_index(root) as idx:
+        etag = idx.tree_etag()
+        if request.if_none_match.contains(etag):
+            resp = make_response("", 304)
+        else:
+            resp = jsonify(["."] + idx.folder_tree())
+    resp.set_etag(etag)
+    resp.headers['Cache-Control'] = 'no-cache'
+    return resp
+
+@library_bp.route('/img/<name>')
+def docx_image(name):
+    """Картинки из docx. Имя = хэш содержимого, так что файл никогда не меняется."""
+    resp = send_from_directory(DOCX_IMAGE_DIR, name, max_age=DOCX_IMAGE_MAX_AGE)
+    resp.headers['Cache-Control'] = f'public, max-age={DOCX_IMAGE_MAX_AGE}, immutable'
+    return resp
+
+@library_bp.route('/cache_stats')
+def cache_stats():
+    """
+    Счётчики hit/miss кэшей конвертации: этого процесса (misses — запросы,
+    которым пришлось ставить конвертацию) и, в "workers", суммы по
+    процессам-воркерам, где конвертация и вытеснения из памяти происходят.
+    """
+    workers = get_jobs().counters()
+    return jsonify({cache.name: dict(cache.info(), workers=workers.get(cache.name, {}))
+                    for cache in CONVERSION_CACHES})
 
 @library_bp.route('/move_item', methods=['POST'])
 def move_item():
@@ -105,8 +280,12 @@ def move_item():
         return "No new path", 400
 
     new_full = os.path.join(root, new_path)
-    os.makedirs(os.path.dirname(new_full), exist_ok=True)
-    os.rename(old_full, new_full)
+    with library_index(root) as idx, idx.change(old_path, new_path):
+        os.makedirs(os.path.dirname(new_full), exist_ok=True)
+        os.rename(old_full, new_full)
+    invalidate_conversions(root, old_path, new_path)
+    with search_index(root) as s:
+        s.move(old_path, new_path)
 
     # Родитель
     parts = old_path.strip("/").split("/")
@@ -135,7 +314,11 @@ def rename_item():
     else:
         parent = ""
     new_full = os.path.join(root, parent, new_name)
-    os.rename(old_full, new_full)
+    with library_index(root) as idx, idx.change(old_path, os.path.join(parent, new_name)):
+        os.rename(old_full, new_full)
+    invalidate_conversions(root, old_path, os.path.join(parent, new_name))
+    with search_index(root) as s:
+        s.move(old_path, os.path.join(parent, new_name))
     return redirect(url_for("library_bp.browse_library", subpath=parent))
 
 @library_bp.route('/', defaults={'subpath':''})
@@ -151,13 +334,14 @@ def browse_library(subpath):
     if not os.path.exists(target_dir):
         return f"Folder {escape(subpath)} does not exist",404
 
-    folders, files = [], []
-    for entry in os.listdir(target_dir):
-        full = os.path.join(target_dir, entry)
-        if os.path.isdir(full):
-            folders.append(entry)
-        else:
-            files.append(entry)
+    sort = request.args.get("sort", "name")
+    order = request.args.get("order", "asc")
+    cursor = request.args.get("cursor") or None
+    with library_index(root) as idx:
+        rows, next_cursor = idx.listing(subpath, sort=sort, order=order,
+                                        limit=LIBRARY_PAGE_SIZE, cursor=cursor)
+    folders = [r["name"] for r in rows if r["is_dir"]]
+    files = [r["name"] for r in rows if not r["is_dir"]]
 
     # parent
     parent_folder=None
@@ -173,8 +357,11 @@ def browse_library(subpath):
         subpath=subpath,
         current_folder=subpath if subpath else '.',
         parent_folder=parent_folder,
-        folders=sorted(folders),
-        files=sorted(files)
+        folders=folders,
+        files=files,
+        sort=sort,
+        order=order,
+        next_cursor=next_cursor
     )
 
 @library_bp.route('/create_folder', defaults={'subpath':''}, methods=['POST'])
@@ -186,7 +373,8 @@ def create_folder(subpath):
     folder_name = request.form.get("folder_name","").strip()
     if folder_name:
         new_folder = os.path.join(target_dir, folder_name)
-        os.makedirs(new_folder, exist_ok=True)
+        with library_index(root) as idx, idx.change(os.path.join(subpath, folder_name)):
+            os.makedirs(new_folder, exist_ok=True)
     return redirect(url_for('library_bp.browse_library', subpath=subpath))
 
 @library_bp.route('/upload_file', defaults={'subpath':''}, methods=['POST'])
@@ -200,7 +388,15 @@ def upload_file(subpath):
         filename = secure_filename(file.filename)
         if filename:
             path = os.path.join(target_dir, filename)
-            file.save(path)
+            with library_index(root) as idx, idx.change(os.path.join(subpath, filename)):
+                file.save(path)
+            invalidate_conversions(root, os.path.join(subpath, filename))
+            # извлечение текста для поиска (docx/PDF) — в фоне; при переполненной
+            # очереди файл проиндексируется при следующем /search/reindex
+            try:
+                submit_job(index_documents, root, os.path.join(subpath, filename))
+            except JobQueueFull:
+                pass
     return redirect(url_for('library_bp.browse_library', subpath=subpath))
 
 @library_bp.route('/<path:subpath>', methods=['POST'])
@@ -209,10 +405,14 @@ def delete_item(subpath):
     root = get_user_library_root()
     target_path = os.path.join(root, subpath)
     if os.path.exists(target_path):
-        if os.path.isfile(target_path):
-            os.remove(target_path)
-        else:
-            shutil.rmtree(target_path)
+        with library_index(root) as idx, idx.change(subpath):
+            if os.path.isfile(target_path):
+                os.remove(target_path)
+            else:
+                shutil.rmtree(target_path)
+        invalidate_conversions(root, subpath)
+        with search_index(root) as s:
+            s.remove(subpath)
     parts = subpath.strip('/').split('/')
     if len(parts)>1:
         parent='/'.join(parts[:-1])
@@ -248,7 +448,16 @@ def open_file(subpath, filename):
 
     # 2) doc/docx => mammoth => HTML
     elif ext in ['.doc','.docx']:
-        html_code = convert_docx_to_html(fullpath)
+        rel = os.path.join(subpath, filename)
+        if mammoth:
+            html_code = converted(doc_html_cache, cached_docx_html, root, rel, request.args.get("job"))
+        else:
+            html_code = convert_docx_to_html(fullpath)
+        if html_code is None:
+            job = conversion_job(cached_docx_html, root, rel)
+            if job is None:
+                return "Server is busy, please try again in a minute.", 503
+            return render_job_wait(job, f"Converting {filename}...")
         return f"""
         <h3>{escape(filename)}</h3>
         <div style="white-space:pre-wrap;">{html_code}</div>
@@ -258,13 +467,41 @@ def open_file(subpath, filename):
     # 3) PDF => iframe + extracted text
     elif ext=='.pdf':
         file_url=url_for('static', filename=f'library/{session.get("user_id","_guest")}/{subpath}/{filename}')
-        text_extract=read_pdf_text(fullpath)
+        if not PyPDF2:
+            pages, text_extract = [], "(PyPDF2 not installed.)"
+        else:
+            rel = os.path.join(subpath, filename)
+            pages = converted(pdf_pages_cache, cached_pdf_pages, root, rel, request.args.get("job"))
+            if pages is None:
+                job = conversion_job(cached_pdf_pages, root, rel)
+                if job is None:
+                    return "Server is busy, please try again in a minute.", 503
+                return render_job_wait(job, f"Extracting text from {filename}...")
+            text_extract = pdf_pages_text(pages[:PDF_FIRST_PAGES])
+        more_url = url_for('library_bp.pdf_pages', subpath=subpath, filename=filename)
+        load_more = ""
+        if len(pages) > PDF_FIRST_PAGES:
+            load_more = f"""
+        <button id="pdfMore" data-next="{PDF_FIRST_PAGES}" data-total="{len(pages)}">Load more pages</button>
+        <script>
+          document.getElementById("pdfMore").onclick = function(){{
+            let btn=this, start=+btn.dataset.next;
+            fetch("{more_url}&start="+start+"&count={PDF_FIRST_PAGES}&job="+(btn.dataset.job||""))
+              .then(r=>r.json())
+              .then(data=>{{
+                if(data.job){{ btn.dataset.job=data.job; setTimeout(()=>btn.click(), 1000); return; }}
+                document.getElementById("pdfText").append(data.pages.map(p=>p+"\\n").join(""));
+                btn.dataset.next=data.start+data.pages.length;
+                if(+btn.dataset.next>=data.total) btn.remove();
+              }});
+          }};
+        </script>"""
         return f"""
         <h3>PDF File: {escape(filename)}</h3>
         <iframe src="{file_url}" style="width:80%;height:600px;"></iframe>
         <hr>
-        <h4>Extracted text:</h4>
-        <div style="white-space:pre-wrap;">{escape(text_extract)}</div>
+        <h4>Extracted text ({len(pages)} pages):</h4>
+        <div id="pdfText" style="white-space:pre-wrap;">{escape(text_extract)}</div>{load_more}
         <p><a href="{url_for('library_bp.browse_library', subpath=subpath)}">← Back</a></p>
         """
 
@@ -295,6 +532,60 @@ def open_file(subpath, filename):
         <p><a href="{url_for('library_bp.browse_library', subpath=subpath)}">← Back</a></p>
         """
 
+@library_bp.route('/search')
+def search_library():
+    """
+    Полнотекстовый поиск по библиотеке: ?q=слова&offset=0.
+    {"query", "results": [{"path", "folder", "name", "snippet", "score"}], "next_offset"}
+    snippet — уже экранированный HTML с <mark> вокруг совпадений.
+    """
+    root = get_user_library_root()
+    query = request.args.get("q", "").strip()
+    offset = max(request.args.get("offset", 0, type=int), 0)
+    with search_index(root) as s:
+        results = s.search(query, limit=SEARCH_PAGE_SIZE + 1, offset=offset)
+    next_offset = None
+    if len(results) > SEARCH_PAGE_SIZE:
+        results = results[:SEARCH_PAGE_SIZE]
+        next_offset = offset + SEARCH_PAGE_SIZE
+    for r in results:
+        folder, _, name = r["path"].rpartition("/")
+        r["folder"], r["name"] = folder or ".", name
+    return jsonify({"query": query, "results": results, "next_offset": next_offset})
+
+@library_bp.route('/search/reindex', methods=['POST'])
+def search_reindex():
+    """Переиндексировать всю библиотеку (неизменённые файлы пропускаются)."""
+    root = get_user_library_root()
+    return jsonify({"files": reindex_library(root)})
+
+@library_bp.route('/pdf_pages')
+def pdf_pages():
+    """
+    JSON со страницами PDF: ?subpath=&filename=&start=0&count=10.
+    Пока текст извлекается — 202 {"job", "status_url"}; повторный запрос
+    с &job=<id> возьмёт результат задачи, если его нет в кэше.
+    """
+    subpath = request.args.get("subpath","").strip()
+    filename = request.args.get("filename","").strip()
+    start = max(request.args.get("start", 0, type=int), 0)
+    count = min(max(request.args.get("count", PDF_FIRST_PAGES, type=int), 1), PDF_MAX_PAGES_PER_REQUEST)
+    if subpath == ".":
+        subpath = ""
+    root = get_user_library_root()
+    rel = os.path.join(subpath, filename)
+    if not filename.lower().endswith(".pdf") or not os.path.isfile(os.path.join(root, rel)):
+        return jsonify({"error": "File not found"}), 404
+    if not PyPDF2:
+        return jsonify({"error": "PyPDF2 not installed."}), 500
+    pages = converted(pdf_pages_cache, cached_pdf_pages, root, rel, request.args.get("job"))
+    if pages is None:
+        job = conversion_job(cached_pdf_pages, root, rel)
+        if job is None:
+            return jsonify({"error": "Server is busy"}), 503
+        return jsonify({"job": job.id, "status_url": url_for('jobs_bp.job_status', job_id=job.id)}), 202
+    return jsonify({"total": len(pages), "start": start, "pages": pages[start:start + count]})
+
 @library_bp.route('/preview_doc')
 def preview_doc():
     """Для doc/docx AJAX-просмотра."""
@@ -308,5 +599,12 @@ def preview_doc():
     ext = os.path.splitext(filename)[1].lower()
     if ext not in [".doc",".docx"]:
         return "Not a doc/docx file!"
-    html_code= convert_docx_to_html(full)
+    rel = os.path.join(subpath, filename)
+    html_code = doc_html_cache.peek(root, rel) if mammoth else convert_docx_to_html(full)
+    if html_code is None:
+        # долгая конвертация: отвечаем сразу, страница опрашивает задачу
+        job = conversion_job(cached_docx_html, root, rel)
+        if job is None:
+            return "Server is busy, please try again in a minute.", 503
+        return jsonify({"job": job.id, "status_url": url_for('jobs_bp.job_status', job_id=job.id)}), 202
     return html_code
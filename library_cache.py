@@ -0,0 +1,153 @@
+import os
+import json
+import shutil
+import logging
+import threading
+from collections import OrderedDict
+
+# Папка кэша внутри библиотеки пользователя (скрыта из списка файлов)
+CACHE_DIRNAME = ".cache"
+
+log = logging.getLogger(__name__)
+
+
+def is_hidden_entry(name):
+    """Служебные файлы/папки библиотеки (.cache и т.п.) не показываем."""
+    return name.startswith(".")
+
+
+class ConversionCache:
+    """
+    Двухуровневый кэш результатов конвертации файлов библиотеки.
+
+    Ключ — путь к файлу + его размер и mtime, поэтому изменённый файл
+    автоматически пересчитывается.
+      - Память: LRU с ограничением по суммарному размеру (max_bytes).
+      - Диск: <library_root>/.cache/<name>/<относительный путь>.json
+    Значение должно сериализоваться в JSON (строка HTML, список страниц...).
+    version — версия формата значения: входит в сигнатуру записи, так что
+    после смены конвертера старые записи на диске не отдаются.
+    """
+
+    def __init__(self, name, max_bytes=64 * 1024 * 1024, sizeof=None, version=1):
+        self.name = name
+        self.version = version
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof or (lambda value: len(value.encode("utf-8")))
+        self._mem = OrderedDict()  # full_path -> (signature, value, size)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+        self._taken = {}
+
+    def _disk_path(self, root, rel):
+        return os.path.join(root, CACHE_DIRNAME, self.name, os.path.normpath(rel) + ".json")
+
+    def _remember(self, key, sig, value):
+        size = self.sizeof(value)
+        with self._lock:
+            old = self._mem.pop(key, None)
+            if old:
+                self._bytes -= old[2]
+            if size > self.max_bytes:
+                return
+            self._mem[key] = (sig, value, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, _, sz) = self._mem.popitem(last=False)
+                self._bytes -= sz
+                self.stats["evictions"] += 1
+
+    def _lookup(self, root, rel):
+        """(full, sig, value) — value is None, если ни в одном уровне кэша нет."""
+        full = os.path.normpath(os.path.join(root, rel))
+        st = os.stat(full)
+        sig = [st.st_size, st.st_mtime_ns, self.version]
+
+        with self._lock:
+            ent = self._mem.get(full)
+            if ent and ent[0] == sig:
+                self._mem.move_to_end(full)
+                self.stats["hits"] += 1
+                return full, sig, ent[1]
+
+        try:
+            with open(self._disk_path(root, rel), "r", encoding="utf-8") as f:
+                stored = json.load(f)
+            if stored.get("sig") == sig:
+                with self._lock:
+                    self.stats["disk_hits"] += 1
+                self._remember(full, sig, stored["value"])
+                return full, sig, stored["value"]
+        except (OSError, ValueError, KeyError):
+            pass
+        return full, sig, None
+
+    def peek(self, root, rel):
+        """Значение из кэша без конвертации (None — промах, придётся конвертировать)."""
+        value = self._lookup(root, rel)[2]
+        if value is None:
+            with self._lock:
+                self.stats["misses"] += 1
+        return value
+
+    def get(self, root, rel, convert):
+        """
+        Возвращает convert(full_path) для файла root/rel, используя кэш.
+        convert вызывается только при промахе в обоих уровнях.
+        Копия на диске восстанавливается и при попадании в память: в фоновой
+        задаче (jobs) это память процесса-воркера, а invalidate в веб-процессе
+        удаляет только диск — без копии peek там не увидит результат.
+        """
+        full, sig, value = self._lookup(root, rel)
+        disk = self._disk_path(root, rel)
+        if value is None:
+            with self._lock:
+                self.stats["misses"] += 1
+            value = convert(full)
+            self._remember(full, sig, value)
+        elif os.path.isfile(disk):
+            return value
+        try:
+            os.makedirs(os.path.dirname(disk), exist_ok=True)
+            tmp = f"{disk}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"sig": sig, "value": value}, f, ensure_ascii=False)
+            os.replace(tmp, disk)
+        except OSError as e:
+            # значение всё равно возвращаем: страница возьмёт его из результата задачи
+            log.warning("%s cache: cannot write %s: %s", self.name, disk, e)
+        return value
+
+    def invalidate(self, root, rel):
+        """Сбрасываем кэш для файла или целой папки root/rel."""
+        full = os.path.normpath(os.path.join(root, rel))
+        prefix = full + os.sep
+        with self._lock:
+            for key in [k for k in self._mem if k == full or k.startswith(prefix)]:
+                self._bytes -= self._mem.pop(key)[2]
+                self.stats["invalidations"] += 1
+
+        disk = self._disk_path(root, rel)
+        if os.path.isfile(disk):
+            os.remove(disk)
+        disk_dir = os.path.join(root, CACHE_DIRNAME, self.name, os.path.normpath(rel))
+        if os.path.isdir(disk_dir):
+            shutil.rmtree(disk_dir, ignore_errors=True)
+
+    def take_stats(self):
+        """
+        Прирост счётчиков с прошлого вызова. Конвертация идёт в процессах-
+        воркерах (jobs): их счётчики уходят с результатом задачи
+        (jobs.register_worker_counters), иначе промахи и вытеснения там не видны.
+        """
+        with self._lock:
+            delta = {k: v - self._taken.get(k, 0) for k, v in self.stats.items()}
+            self._taken = dict(self.stats)
+        return {k: v for k, v in delta.items() if v}
+
+    def info(self):
+        """Счётчики для подбора размера кэша."""
+        with self._lock:
+            return dict(self.stats, entries=len(self._mem),
+                        bytes=self._bytes, max_bytes=self.max_bytes)
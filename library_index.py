@@ -0,0 +1,338 @@
+import os
+import uuid
+import sqlite3
+import posixpath
+from contextlib import contextmanager
+
+from library_cache import CACHE_DIRNAME, is_hidden_entry
+
+# Метаданные файлов библиотеки пользователя: <library_root>/.cache/library.db
+INDEX_DB_NAME = "library.db"
+
+SORT_COLUMNS = {"name": "name", "size": "size", "date": "mtime_ns"}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    parent TEXT NOT NULL,
+    name TEXT NOT NULL,
+    is_dir INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    ext TEXT NOT NULL,
+    PRIMARY KEY (parent, name)
+);
+CREATE INDEX IF NOT EXISTS idx_entries_size ON entries(parent, is_dir, size, name);
+CREATE INDEX IF NOT EXISTS idx_entries_mtime ON entries(parent, is_dir, mtime_ns, name);
+CREATE TABLE IF NOT EXISTS dirs (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS folders (
+    path TEXT PRIMARY KEY,
+    parent TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_folders_parent ON folders(parent);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def norm_rel(rel):
+    """'./a//b/' -> 'a/b', '.' -> ''."""
+    rel = posixpath.normpath((rel or "").replace("\\", "/")).strip("/")
+    return "" if rel == "." else rel
+
+
+def encode_cursor(row, sort):
+    """Курсор = (папка?, ключ сортировки, имя) последней строки страницы."""
+    if sort == "name":
+        return f"{row['is_dir']}|{row['name']}"
+    return f"{row['is_dir']}|{row[SORT_COLUMNS[sort]]}|{row['name']}"
+
+
+def decode_cursor(cursor, sort):
+    try:
+        if sort == "name":
+            is_dir, name = cursor.split("|", 1)
+            return int(is_dir), name, name
+        is_dir, key, name = cursor.split("|", 2)
+        return int(is_dir), int(key), name
+    except (AttributeError, ValueError):
+        return None
+
+
+class LibraryIndex:
+    """
+    Индекс метаданных (name, is_dir, size, mtime, ext) одной библиотеки.
+
+    Папка сканируется через os.scandir при первом просмотре и заново,
+    только если изменился её mtime (кто-то поменял файлы в обход приложения).
+    Эндпоинты библиотеки обновляют индекс точечно через change(...).
+
+    Отдельно хранится дерево всех папок (для Move-модалки): строится одним
+    обходом при первом запросе, дальше обновляется только в change() и при
+    пересканировании папки. Каждое изменение дерева увеличивает tree_version.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        cache_dir = os.path.join(root, CACHE_DIRNAME)
+        os.makedirs(cache_dir, exist_ok=True)
+        self.conn = sqlite3.connect(os.path.join(cache_dir, INDEX_DB_NAME), timeout=30,
+                                    isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def _full(self, rel):
+        return os.path.join(self.root, *rel.split("/")) if rel else self.root
+
+    def _dir_mtime(self, rel):
+        try:
+            return os.stat(self._full(rel)).st_mtime_ns
+        except OSError:
+            return None
+
+    def _is_synced(self, rel):
+        row = self.conn.execute("SELECT mtime_ns FROM dirs WHERE path=?", (rel,)).fetchone()
+        return row is not None and row[0] == self._dir_mtime(rel)
+
+    @staticmethod
+    def _row(parent, entry_name, st, is_dir):
+        ext = "" if is_dir else os.path.splitext(entry_name)[1].lower()
+        return (parent, entry_name, 1 if is_dir else 0,
+                0 if is_dir else st.st_size, st.st_mtime_ns, ext)
+
+    def scan(self, rel):
+        """Пересканировать одну папку (os.scandir, без isdir на каждый файл)."""
+        rel = norm_rel(rel)
+        mtime = self._dir_mtime(rel)
+        rows = []
+        with os.scandir(self._full(rel)) as it:
+            for entry in it:
+                if is_hidden_entry(entry.name):
+                    continue
+                try:
+                    is_dir = entry.is_dir()
+                    rows.append(self._row(rel, entry.name, entry.stat(), is_dir))
+                except OSError:
+                    continue
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            self.conn.execute("DELETE FROM entries WHERE parent=?", (rel,))
+            self.conn.executemany("INSERT INTO entries VALUES (?, ?, ?, ?, ?, ?)", rows)
+            self.conn.execute("INSERT OR REPLACE INTO dirs(path, mtime_ns) VALUES (?, ?)", (rel, mtime))
+            if self._tree_built():
+                self._reconcile_children(rel, {posixpath.join(rel, r[1]) for r in rows if r[2]})
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+
+    def ensure_synced(self, rel):
+        rel = norm_rel(rel)
+        if not self._is_synced(rel):
+            self.scan(rel)
+
+    def listing(self, rel, sort="name", order="asc", limit=None, cursor=None):
+        """
+        Содержимое папки: сначала папки, потом файлы, внутри — по sort
+        (name / size / date), order asc/desc; keyset-пагинация по cursor.
+        Возвращает (rows, next_cursor), rows — sqlite3.Row.
+        """
+        rel = norm_rel(rel)
+        sort = sort if sort in SORT_COLUMNS else "name"
+        desc = order == "desc"
+        col = SORT_COLUMNS[sort]
+        self.ensure_synced(rel)
+
+        sql = "SELECT * FROM entries WHERE parent=?"
+        args = [rel]
+        after = decode_cursor(cursor, sort) if cursor else None
+        if after:
+            op = "<" if desc else ">"
+            sql += (f" AND (is_dir < ? OR (is_dir = ? AND ({col}, name) {op} (?, ?)))")
+            args += [after[0], after[0], after[1], after[2]]
+        direction = "DESC" if desc else "ASC"
+        sql += f" ORDER BY is_dir DESC, {col} {direction}, name {direction}"
+        if limit:
+            sql += " LIMIT ?"
+            args.append(limit + 1)
+        rows = self.conn.execute(sql, args).fetchall()
+        if limit and len(rows) > limit:
+            return rows[:limit], encode_cursor(rows[limit - 1], sort)
+        return rows, None
+
+    def _refresh_entry(self, rel, drop_subtree=True):
+        """
+        Обновить строку для одного пути (или удалить, если его больше нет).
+        drop_subtree — забыть и содержимое (папку переместили/удалили).
+        """
+        parent, name = posixpath.split(rel)
+        try:
+            st = os.stat(self._full(rel))
+        except OSError:
+            st = None
+        self.conn.execute("DELETE FROM entries WHERE parent=? AND name=?", (parent, name))
+        if drop_subtree or st is None:
+            self.conn.execute("DELETE FROM entries WHERE parent=? OR parent LIKE ? ESCAPE '\\'",
+                              (rel, like_prefix(rel)))
+            self.conn.execute("DELETE FROM dirs WHERE path=? OR path LIKE ? ESCAPE '\\'",
+                              (rel, like_prefix(rel)))
+        if st is not None and not is_hidden_entry(name):
+            is_dir = os.path.isdir(self._full(rel))
+            self.conn.execute("INSERT INTO entries VALUES (?, ?, ?, ?, ?, ?)",
+                              self._row(parent, name, st, is_dir))
+
+    @contextmanager
+    def change(self, *rel_paths):
+        """
+        Оборачиваем изменение файлов:
+            with index.change(old_path, new_path):
+                os.rename(...)
+        После выхода строки для этих путей обновляются; если папка-родитель
+        до изменения была синхронизирована, запоминаем её новый mtime,
+        чтобы не сканировать её заново.
+        """
+        rels = [norm_rel(r) for r in rel_paths if norm_rel(r)]
+        # промежуточные папки, которые могли появиться (move в a/b/c создаёт a и a/b)
+        ancestors = {posixpath.dirname(r) for r in rels}
+        for a in list(ancestors):
+            while a:
+                ancestors.add(a)
+                a = posixpath.dirname(a)
+        ancestors.discard("")
+        parents = {posixpath.dirname(r) for r in rels} | {posixpath.dirname(a) for a in ancestors}
+        synced = {p for p in parents if self._is_synced(p)}
+        yield
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            tree_changed = False
+            tree = self._tree_built()
+            for a in sorted(ancestors):
+                self._refresh_entry(a, drop_subtree=False)
+                if tree and os.path.isdir(self._full(a)):
+                    tree_changed |= self._tree_add(a, walk=False)
+            for rel in rels:
+                self._refresh_entry(rel)
+                if tree:
+                    tree_changed |= self._tree_drop(rel)
+                    if os.path.isdir(self._full(rel)):
+                        tree_changed |= self._tree_add(rel)
+            if tree_changed:
+                self._bump_tree()
+            for p in synced:
+                self.conn.execute("UPDATE dirs SET mtime_ns=? WHERE path=?", (self._dir_mtime(p), p))
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+
+
+    # ---------- дерево папок ----------
+
+    def _meta(self, key):
+        row = self.conn.execute("SELECT value FROM meta WHERE key=?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _tree_built(self):
+        return self._meta("tree_version") is not None
+
+    def _walk_folders(self, rel):
+        """Все папки внутри rel (рекурсивно): [(path, parent)]."""
+        result, stack = [], [rel]
+        while stack:
+            cur = stack.pop()
+            try:
+                with os.scandir(self._full(cur)) as it:
+                    for entry in it:
+                        if is_hidden_entry(entry.name):
+                            continue
+                        try:
+                            if not entry.is_dir():
+                                continue
+                        except OSError:
+                            continue
+                        path = posixpath.join(cur, entry.name)
+                        result.append((path, cur))
+                        stack.append(path)
+            except OSError:
+                continue
+        return result
+
+    def _tree_add(self, rel, walk=True):
+        """Добавить папку rel (и, если walk, всё её содержимое). True, если дерево изменилось."""
+        before = self.conn.total_changes
+        self.conn.execute("INSERT OR IGNORE INTO folders(path, parent) VALUES (?, ?)",
+                          (rel, posixpath.dirname(rel)))
+        if walk:
+            self.conn.executemany("INSERT OR IGNORE INTO folders(path, parent) VALUES (?, ?)",
+                                  self._walk_folders(rel))
+        return self.conn.total_changes != before
+
+    def _tree_drop(self, rel):
+        before = self.conn.total_changes
+        self.conn.execute("DELETE FROM folders WHERE path=? OR path LIKE ? ESCAPE '\\'",
+                          (rel, like_prefix(rel)))
+        return self.conn.total_changes != before
+
+    def _reconcile_children(self, rel, child_dirs):
+        """Папку изменили в обход приложения: сверяем её подпапки с деревом."""
+        known = {r[0] for r in self.conn.execute("SELECT path FROM folders WHERE parent=?", (rel,))}
+        changed = False
+        for gone in known - child_dirs:
+            changed |= self._tree_drop(gone)
+        for new in child_dirs - known:
+            changed |= self._tree_add(new)
+        if changed:
+            self._bump_tree()
+
+    def _bump_tree(self):
+        self.conn.execute("UPDATE meta SET value = CAST(value AS INTEGER) + 1 WHERE key='tree_version'")
+
+    def build_tree(self):
+        """Полный обход библиотеки — один раз (или по требованию)."""
+        folders = self._walk_folders("")
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            self.conn.execute("DELETE FROM folders")
+            self.conn.executemany("INSERT OR IGNORE INTO folders(path, parent) VALUES (?, ?)", folders)
+            # tree_id меняется при каждой перестройке — ETag не совпадёт со старым
+            self.conn.execute("INSERT OR REPLACE INTO meta(key, value) VALUES ('tree_id', ?)",
+                              (uuid.uuid4().hex[:12],))
+            self.conn.execute("INSERT OR REPLACE INTO meta(key, value) VALUES ('tree_version', '1')")
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+
+    def tree_etag(self):
+        """Строка, которая меняется при любом изменении дерева папок."""
+        if not self._tree_built():
+            self.build_tree()
+        return f"{self._meta('tree_id')}-{self._meta('tree_version')}"
+
+    def folder_tree(self):
+        """Все папки библиотеки (пути через '/'), отсортированные."""
+        if not self._tree_built():
+            self.build_tree()
+        return [r[0] for r in self.conn.execute("SELECT path FROM folders ORDER BY path")]
+
+
+def like_prefix(rel):
+    return rel.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "/%"
+
+
+@contextmanager
+def library_index(root):
+    """with library_index(root) as idx: ... — индекс открывается на время запроса."""
+    idx = LibraryIndex(root)
+    try:
+        yield idx
+    finally:
+        idx.close()
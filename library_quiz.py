@@ -0,0 +1,142 @@
+import os
+from flask import Blueprint, request
+from markupsafe import escape
+from jobs import render_job_wait
+from library import (get_user_library_root, conversion_job, converted, cached_docx_html, cached_pdf_pages,
+                     cached_docx_lines, convert_docx_to_html, doc_html_cache, pdf_pages_cache,
+                     docx_lines_cache, pdf_pages_text, read_text_file, html_to_text,
+                     mammoth, PyPDF2, SEARCH_TEXT_EXTS)
+from library_cache import is_hidden_entry
+from study_formats import iter_blocks, iter_text_lines, ParseIssues
+from quizz import render_quizz_page
+from matching import render_matching_page, matching_distractors, DEFAULT_DISTRACTORS
+from mc_quiz_word import render_mc_quiz_page, iter_quiz_json
+
+library_quiz_bp = Blueprint('library_quiz_bp', __name__, url_prefix='/library')
+
+# Квиз из файла библиотеки без повторной загрузки: документ конвертируется
+# один раз (кэши конвертации library.py, память + .cache на диске), а квизы
+# из него строятся сколько угодно раз с разными параметрами.
+#   quizz    — скрытые слова в HTML документа (docx -> mammoth, PDF -> текст);
+#   matching — строки "A ↔ B", mc — вопросы с "✓ - ..." / "✗ - ..."
+#              (docx -> абзацы study_formats, PDF/текст -> строки).
+QUIZ_KINDS = ("quizz", "matching", "mc")
+HTML_EXTS = ['.html', '.htm']
+
+
+class LibraryQuizError(Exception):
+    """Файл нельзя превратить в квиз этого вида (сообщение — для пользователя)."""
+
+
+def library_path(root, rel):
+    """
+    Полный путь к файлу библиотеки root/rel; None — нет такого файла или
+    путь выходит за пределы библиотеки / ведёт в служебную папку (.cache).
+    """
+    parts = [p for p in rel.replace("\\", "/").split("/") if p and p != "."]
+    if not parts or any(p == ".." or is_hidden_entry(p) for p in parts):
+        return None
+    full = os.path.join(root, *parts)
+    if os.path.commonpath([os.path.realpath(root), os.path.realpath(full)]) != os.path.realpath(root):
+        return None
+    return full if os.path.isfile(full) else None
+
+
+def text_to_html(text):
+    """Обычный текст -> HTML: непустая строка — абзац."""
+    return "".join(f"<p>{escape(line.strip())}</p>" for line in text.splitlines() if line.strip())
+
+
+def _converted(cache, convert, root, rel, title):
+    """
+    Результат конвертации -> (value, None): из кэша или из задачи ?job=<id>
+    (library.converted). Если его нет — (None, страница ожидания):
+    конвертация уходит в фон, страница перезагрузится, когда она завершится.
+    """
+    value = converted(cache, convert, root, rel, request.args.get("job"))
+    if value is not None:
+        return value, None
+    job = conversion_job(convert, root, rel)
+    if job is None:
+        return None, ("Server is busy, please try again in a minute.", 503)
+    return None, render_job_wait(job, title)
+
+
+def document_html(root, rel, full):
+    """HTML документа для quizz -> (html, None) или (None, ответ), пока идёт конвертация."""
+    ext = os.path.splitext(rel)[1].lower()
+    name = os.path.basename(rel)
+    if ext in ['.doc', '.docx']:
+        if not mammoth:
+            return convert_docx_to_html(full), None
+        return _converted(doc_html_cache, cached_docx_html, root, rel, f"Converting {name}...")
+    if ext == '.pdf':
+        pages, wait = _pdf_pages(root, rel)
+        return (None, wait) if wait else (text_to_html(pdf_pages_text(pages)), None)
+    if ext in HTML_EXTS:
+        return read_text_file(full), None
+    if ext in SEARCH_TEXT_EXTS:
+        return text_to_html(read_text_file(full)), None
+    raise LibraryQuizError(f"Cannot make a quiz from {ext or 'this'} files.")
+
+
+def document_lines(root, rel, full):
+    """
+    Строки документа для matching / multiple choice -> ((номер, строка) ..., None)
+    или (None, ответ), пока идёт конвертация.
+    """
+    ext = os.path.splitext(rel)[1].lower()
+    if ext == '.docx':
+        return _converted(docx_lines_cache, cached_docx_lines, root, rel,
+                          f"Reading {os.path.basename(rel)}...")
+    if ext == '.doc':
+        raise LibraryQuizError("File .doc is not supported. Please convert to .docx.")
+    if ext == '.pdf':
+        pages, wait = _pdf_pages(root, rel)
+        return (None, wait) if wait else (iter_text_lines(pdf_pages_text(pages)), None)
+    if ext in HTML_EXTS:
+        return iter_text_lines(html_to_text(read_text_file(full))), None
+    if ext in SEARCH_TEXT_EXTS:
+        return iter_text_lines(read_text_file(full)), None
+    raise LibraryQuizError(f"Cannot make a quiz from {ext or 'this'} files.")
+
+
+def _pdf_pages(root, rel):
+    if not PyPDF2:
+        raise LibraryQuizError("PyPDF2 not installed.")
+    return _converted(pdf_pages_cache, cached_pdf_pages, root, rel,
+                      f"Extracting text from {os.path.basename(rel)}...")
+
+
+@library_quiz_bp.route('/quiz')
+def library_quiz():
+    """
+    Квиз из файла библиотеки: ?path=<путь в библиотеке>&kind=quizz|matching|mc
+    и параметры квиза тех же имён, что в формах страниц (mode, hide_percent,
+    chosen_words, distractors, mc_output, seed). Первый запрос к файлу может
+    вернуть страницу ожидания (202) — конвертация идёт в фоне.
+    """
+    root = get_user_library_root()
+    rel = request.args.get("path", "").strip()
+    kind = request.args.get("kind", "quizz")
+    if kind not in QUIZ_KINDS:
+        return f"Unknown quiz kind {escape(kind)}. Use one of: {', '.join(QUIZ_KINDS)}.", 400
+    full = library_path(root, rel)
+    if full is None:
+        return "File not found", 404
+    rel = os.path.relpath(full, root)
+
+    try:
+        if kind == "quizz":
+            html_code, wait = document_html(root, rel, full)
+            return wait or render_quizz_page(html_code, request.args)
+        lines, wait = document_lines(root, rel, full)
+        if wait:
+            return wait
+        if kind == "matching":
+            issues = ParseIssues()
+            distractors = matching_distractors(request.args.get("distractors", DEFAULT_DISTRACTORS))
+            return render_matching_page(list(iter_blocks(lines, issues)), issues, distractors)
+        return render_mc_quiz_page(iter_quiz_json(lines))
+    except LibraryQuizError as e:
+        return str(e), 400
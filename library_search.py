@@ -0,0 +1,191 @@
+import os
+import re
+import sqlite3
+import posixpath
+from contextlib import contextmanager
+from markupsafe import escape
+
+from library_cache import CACHE_DIRNAME
+from library_index import norm_rel, like_prefix
+
+# Полнотекстовый индекс библиотеки пользователя: <library_root>/.cache/search.db
+SEARCH_DB_NAME = "search.db"
+
+# Сколько текста одного файла индексируем (огромные логи/дампы обрезаем)
+MAX_INDEXED_CHARS = 5_000_000
+# Длина фрагмента текста вокруг первого совпадения в результатах
+SNIPPET_CHARS = 200
+# Слова короче — ищем целиком (префикс "ab*" совпадает с половиной словаря)
+PREFIX_MIN_CHARS = 3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS docs USING fts5(
+    name, body, tokenize = 'unicode61 remove_diacritics 2'
+);
+"""
+
+
+def query_words(text):
+    return re.findall(r"\w+", text or "")
+
+
+def fts_query(words):
+    """
+    Слова запроса -> запрос FTS5: все слова обязательны, длинные — как префикс
+    ("нейрон" найдёт и "нейроны"). Операторы FTS5 из ввода не пропускаем.
+    """
+    return " ".join(f'"{w}"*' if len(w) >= PREFIX_MIN_CHARS else f'"{w}"' for w in words)
+
+
+def match_regex(words):
+    """Те же совпадения, что и fts_query, но для подсветки в тексте."""
+    parts = [re.escape(w) + (r"\w*" if len(w) >= PREFIX_MIN_CHARS else r"\b") for w in words]
+    return re.compile(r"\b(?:" + "|".join(parts) + ")", re.IGNORECASE)
+
+
+def make_snippet(body, regex):
+    """
+    Кусок текста вокруг первого совпадения -> безопасный HTML с <mark>.
+    Считаем сами, а не snippet() FTS5: тот перебирает все вхождения
+    в документе и на больших файлах работает в разы дольше самого поиска.
+    """
+    m = regex.search(body)
+    start = max(m.start() - SNIPPET_CHARS // 2, 0) if m else 0
+    chunk = " ".join(body[start:start + SNIPPET_CHARS].split())
+    out, pos = [], 0
+    for m in regex.finditer(chunk):
+        out.append(str(escape(chunk[pos:m.start()])))
+        out.append(f"<mark>{escape(m.group())}</mark>")
+        pos = m.end()
+    out.append(str(escape(chunk[pos:])))
+    prefix = "…" if start > 0 else ""
+    suffix = "…" if start + SNIPPET_CHARS < len(body) else ""
+    return prefix + "".join(out) + suffix
+
+
+class SearchIndex:
+    """
+    Инвертированный индекс (SQLite FTS5) по тексту файлов одной библиотеки.
+
+    files — путь и подпись (size, mtime) каждого проиндексированного файла,
+    docs — его имя и текст; rowid в docs = files.id. Перемещение и
+    переименование меняют только путь, текст заново не извлекается.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        cache_dir = os.path.join(root, CACHE_DIRNAME)
+        os.makedirs(cache_dir, exist_ok=True)
+        self.conn = sqlite3.connect(os.path.join(cache_dir, SEARCH_DB_NAME), timeout=30,
+                                    isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def _full(self, rel):
+        return os.path.join(self.root, *rel.split("/"))
+
+    def index_file(self, rel, extract):
+        """
+        (Пере)индексировать файл root/rel; extract(rel) -> текст или None
+        (тип файла не индексируем). Неизменённый файл пропускается.
+        Возвращает True, если индекс обновлён.
+        """
+        rel = norm_rel(rel)
+        try:
+            st = os.stat(self._full(rel))
+        except OSError:
+            self.remove(rel)
+            return False
+        row = self.conn.execute("SELECT size, mtime_ns FROM files WHERE path=?", (rel,)).fetchone()
+        if row and tuple(row) == (st.st_size, st.st_mtime_ns):
+            return False
+        text = extract(rel)
+        if text is None:
+            return False
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._delete(rel)
+            cur = self.conn.execute("INSERT INTO files(path, size, mtime_ns) VALUES (?, ?, ?)",
+                                    (rel, st.st_size, st.st_mtime_ns))
+            self.conn.execute("INSERT INTO docs(rowid, name, body) VALUES (?, ?, ?)",
+                              (cur.lastrowid, posixpath.basename(rel), text[:MAX_INDEXED_CHARS]))
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+        return True
+
+    def _delete(self, rel):
+        ids = [(r[0],) for r in self.conn.execute(
+            "SELECT id FROM files WHERE path=? OR path LIKE ? ESCAPE '\\'", (rel, like_prefix(rel)))]
+        self.conn.executemany("DELETE FROM docs WHERE rowid=?", ids)
+        self.conn.executemany("DELETE FROM files WHERE id=?", ids)
+
+    def remove(self, rel):
+        """Убрать из индекса файл или всю папку."""
+        rel = norm_rel(rel)
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            self._delete(rel)
+
+    def move(self, old_rel, new_rel):
+        """Файл/папку переместили или переименовали: переписываем пути."""
+        old_rel, new_rel = norm_rel(old_rel), norm_rel(new_rel)
+        if old_rel == new_rel:
+            return
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            self._delete(new_rel)  # на месте назначения был другой файл
+            rows = self.conn.execute(
+                "SELECT id, path FROM files WHERE path=? OR path LIKE ? ESCAPE '\\'",
+                (old_rel, like_prefix(old_rel))).fetchall()
+            for file_id, path in rows:
+                self.conn.execute("UPDATE files SET path=? WHERE id=?",
+                                  (new_rel + path[len(old_rel):], file_id))
+            if len(rows) == 1 and rows[0][1] == old_rel:
+                self.conn.execute("UPDATE docs SET name=? WHERE rowid=?",
+                                  (posixpath.basename(new_rel), rows[0][0]))
+
+    def paths(self):
+        return {r[0] for r in self.conn.execute("SELECT path FROM files")}
+
+    def search(self, query, limit=20, offset=0):
+        """
+        Ранжированный поиск (bm25, имя файла весит больше текста).
+        Возвращает [{"path", "snippet", "score"}]; snippet — безопасный HTML.
+        """
+        words = query_words(query)
+        if not words:
+            return []
+        rows = self.conn.execute(
+            "SELECT f.id, f.path, hit.score FROM ("
+            "  SELECT rowid, bm25(docs, 10.0, 1.0) AS score FROM docs"
+            "  WHERE docs MATCH ? ORDER BY score LIMIT ? OFFSET ?"
+            ") AS hit JOIN files f ON f.id = hit.rowid ORDER BY hit.score",
+            (fts_query(words), limit, offset)).fetchall()
+        regex = match_regex(words)
+        results = []
+        for file_id, path, score in rows:
+            body = self.conn.execute("SELECT body FROM docs WHERE rowid=?", (file_id,)).fetchone()[0]
+            results.append({"path": path, "snippet": make_snippet(body, regex),
+                            "score": round(-score, 4)})
+        return results
+
+
+@contextmanager
+def search_index(root):
+    """with search_index(root) as s: ... — индекс открывается на время запроса."""
+    idx = SearchIndex(root)
+    try:
+        yield idx
+    finally:
+        idx.close()
@@ -1,8 +1,10 @@
 import os
 import random
-from flask import Blueprint, request, render_template
-from werkzeug.utils import secure_filename
-import docx  # pip install python-docx
+from flask import Blueprint, request, render_template, redirect, url_for
+from jobs import submit_job, get_user_job, render_job_wait, JobQueueFull, PENDING_STATES, DONE
+from uploads import read_upload, UploadTooLarge
+from quiz_engine import AnswerSampler
+from study_formats import iter_blocks, iter_docx_paragraphs, iter_text_lines, ParseIssues
 
 matching_bp = Blueprint('matching_bp', __name__, url_prefix='/matching')
 
@@ -10,143 +12,138 @@ matching_bp = Blueprint('matching_bp', __name__, url_prefix='/matching')
 # (1 правильный + (MAX_OPTIONS - 1) неправильных).
 MAX_OPTIONS = 4
 
-def parse_docx_into_blocks(filepath):
+# Какие неправильные варианты предпочитать (см. quiz_engine.AnswerSampler)
+DISTRACTOR_MODES = {
+    "mixed": ("group", "shape"),  # сначала из того же блока, потом похожие по виду
+    "group": ("group",),
+    "shape": ("shape",),
+    "any": (),
+}
+DEFAULT_DISTRACTORS = "mixed"
+
+def parse_docx_into_blocks(source, issues=None):
     """
-    Читаем .docx-файл и делим содержимое на «блоки»:
+    Читаем .docx (путь или файловый объект) и делим содержимое на «блоки»:
       - Строки без "↔" считаем заголовком блока (title).
       - Строки с "↔" добавляем как пару (left, right) в текущий блок.
-    Пример структуры блока:
-      {
-        "title": "Epileptic Seizures",
-        "pairs": [("Generalized seizure", "Loss of consciousness"), ...]
-      }
-    Возвращаем список таких блоков.
+    Возвращаем список study_formats.Block (title, pairs — Pair(left, right, line)).
+    Абзацы читаются потоком; пропущенные строки — в issues (ParseIssues).
     """
-    doc = docx.Document(filepath)
-    lines = []
-    for p in doc.paragraphs:
-        txt = p.text.strip()
-        if txt:
-            lines.append(txt)
-
-    blocks = []
-    current_block = {"title": None, "pairs": []}
-
-    for line in lines:
-        if "↔" in line:
-            left, right = line.split("↔", 1)
-            left = left.strip()
-            right = right.strip()
-            current_block["pairs"].append((left, right))
-        else:
-            # считаем это заголовком нового блока
-            if current_block["title"] or current_block["pairs"]:
-                blocks.append(current_block)
-            current_block = {
-                "title": line,
-                "pairs": []
-            }
-    # Добавляем последний блок
-    if current_block["title"] or current_block["pairs"]:
-        blocks.append(current_block)
-
-    return blocks
-
-def parse_text_into_blocks(raw_text):
+    return list(iter_blocks(iter_docx_paragraphs(source), issues))
+
+def parse_uploaded_docx(upload):
+    """Фоновая задача: разбираем загруженный .docx (uploads.Upload) -> (blocks, issues)."""
+    issues = ParseIssues()
+    try:
+        with upload.open() as f:
+            return parse_docx_into_blocks(f, issues), issues
+    finally:
+        upload.discard()
+
+def parse_text_into_blocks(raw_text, issues=None):
     """
     Аналогичная логика, но для текста, введённого вручную:
       - Строки без "↔" => заголовок
       - Строки с "↔" => пара (left, right)
     """
-    lines = [l.strip() for l in raw_text.splitlines() if l.strip()]
-    blocks = []
-    current_block = {"title": None, "pairs": []}
+    return list(iter_blocks(iter_text_lines(raw_text), issues))
 
-    for line in lines:
-        if "↔" in line:
-            left, right = line.split("↔", 1)
-            left = left.strip()
-            right = right.strip()
-            current_block["pairs"].append((left, right))
-        else:
-            if current_block["title"] or current_block["pairs"]:
-                blocks.append(current_block)
-            current_block = {
-                "title": line,
-                "pairs": []
-            }
-    if current_block["title"] or current_block["pairs"]:
-        blocks.append(current_block)
+def build_matching_rows(blocks, distractors=DEFAULT_DISTRACTORS, rng=None):
+    """
+    Блоки (study_formats.Block) -> {"title", "rows"}: для каждой пары
+    1 правильный + (MAX_OPTIONS-1) неправильных вариантов в случайном порядке.
+    Сэмплер строится один раз на документ.
+    """
+    rng = rng or random
+    sampler = AnswerSampler(
+        ((i, pair.right) for i, blk in enumerate(blocks) for pair in blk.pairs),
+        prefer=DISTRACTOR_MODES.get(distractors, DISTRACTOR_MODES[DEFAULT_DISTRACTORS]),
+        rng=rng)
+    final_blocks = []
+    for i, blk in enumerate(blocks):
+        new_rows = []
+        for pair in blk.pairs:
+            opts = [pair.right] + sampler.sample(pair.right, MAX_OPTIONS - 1, group=i)
+            rng.shuffle(opts)
+            new_rows.append({
+                "left": pair.left,
+                "correct": pair.right,
+                "options": opts
+            })
+        final_blocks.append({
+            "title": blk.title,
+            "rows": new_rows
+        })
+    return final_blocks
 
-    return blocks
+def matching_distractors(value):
+    """Режим неправильных вариантов из запроса (неизвестный -> DEFAULT_DISTRACTORS)."""
+    return value if value in DISTRACTOR_MODES else DEFAULT_DISTRACTORS
+
+def render_matching_page(blocks=(), issues=None, distractors=DEFAULT_DISTRACTORS, error_message=""):
+    """Страница matching для разобранных блоков; замечания парсера (issues) — над квизом."""
+    if issues:
+        error_message = f"Some lines were skipped: {issues}"
+
+    return render_template(
+        "matching.html",
+        blocks=build_matching_rows(blocks, distractors),
+        distractors=distractors,
+        error_message=error_message
+    )
 
 @matching_bp.route('/', methods=['GET','POST'])
 def matching():
     """
     /matching:
     - Пользователь загружает .docx-файл либо вводит вручную (строки "A ↔ B").
+      .docx разбирается в фоне: POST -> ?job=<id> -> страница ожидания -> результат.
     - Формируем список блоков (каждый со своим title и pairs).
-    - Для каждой пары выдаём 1 правильный + (MAX_OPTIONS-1) неправильных вариантов.
+    - Для каждой пары выдаём 1 правильный + (MAX_OPTIONS-1) неправильных вариантов
+      (distractors — какие предпочитать, см. DISTRACTOR_MODES).
     - Наверху NavBar, внизу бегущий человечек, при 100% правильных ответов → фейерверк.
     """
     blocks = []
+    issues = None
     error_message = ""
+    distractors = matching_distractors(request.values.get("distractors", DEFAULT_DISTRACTORS))
 
     if request.method == 'POST':
         if 'word_file' in request.files and request.files['word_file'].filename:
             f = request.files['word_file']
-            filename = secure_filename(f.filename)
-            ext = os.path.splitext(filename)[1].lower()
-            upload_dir = os.path.join('static', 'uploads')
-            os.makedirs(upload_dir, exist_ok=True)
-            full_path = os.path.join(upload_dir, filename)
-            f.save(full_path)
+            ext = os.path.splitext(f.filename)[1].lower()
 
             if ext == ".docx":
+                upload = None
                 try:
-                    blocks = parse_docx_into_blocks(full_path)
-                except Exception as e:
-                    error_message = f"Error reading .docx: {e}"
+                    upload = read_upload(f)
+                    job = submit_job(parse_uploaded_docx, upload)
+                except UploadTooLarge as e:
+                    error_message = str(e)
+                except JobQueueFull:
+                    upload.discard()
+                    error_message = "Server is busy, please try again in a minute."
+                else:
+                    return redirect(url_for('matching_bp.matching', job=job.id, distractors=distractors))
             elif ext == ".doc":
                 error_message = "File .doc is not supported. Please convert to .docx."
             else:
                 error_message = f"Unsupported file format {ext}. Please use .docx or paste text."
-
-            # Удалим файл, чтобы не захламлять
-            os.remove(full_path)
         else:
             # Попытка прочитать текст вручную
             raw_text = request.form.get("input_text","").strip()
             if raw_text:
-                blocks = parse_text_into_blocks(raw_text)
-
-    # Собираем все "right"-стороны для генерации wrong-вариантов
-    all_right = []
-    for blk in blocks:
-        for (l, r) in blk["pairs"]:
-            all_right.append(r)
-
-    final_blocks = []
-    for blk in blocks:
-        new_rows = []
-        for (left, correct) in blk["pairs"]:
-            wrong_candidates = [x for x in all_right if x != correct]
-            random.shuffle(wrong_candidates)
-            chosen_wrongs = wrong_candidates[:(MAX_OPTIONS - 1)]
-            opts = [correct] + chosen_wrongs
-            random.shuffle(opts)
-            new_rows.append({
-                "left": left,
-                "correct": correct,
-                "options": opts
-            })
-        final_blocks.append({
-            "title": blk["title"],
-            "rows": new_rows
-        })
+                issues = ParseIssues()
+                blocks = parse_text_into_blocks(raw_text, issues)
+    elif request.args.get("job"):
+        job = get_user_job(request.args["job"])
+        if job is None:
+            error_message = "This upload has expired. Please upload the file again."
+        elif job.state in PENDING_STATES:
+            return render_job_wait(job, "Reading .docx...")
+        elif job.state == DONE:
+            blocks, issues = job.result
+        else:
+            error_message = f"Error reading .docx: {job.error}"
 
-    return render_template(
-        "matching.html",
-        blocks=final_blocks,
-        error_message=error_message
-    )
+    return render_matching_page(blocks, issues, distractors, error_message)
@@ -1,130 +1,158 @@
-import re
 import random
-import os
-from flask import Blueprint, request, render_template
-from markupsafe import escape
-import docx
+from flask import Blueprint, request, redirect, url_for, jsonify, current_app
+from jobs import submit_job, get_user_job, render_job_wait, JobQueueFull, PENDING_STATES, DONE
+from uploads import read_upload, UploadTooLarge
+from study_formats import iter_questions, iter_docx_paragraphs, iter_text_lines, ParseIssues
+from streaming import stream_page
+from quiz_engine import html_json
 
 mc_quiz_word_bp = Blueprint('mc_quiz_word', __name__)
 
-def process_word_quiz(doc_path):
-    document = docx.Document(doc_path)
-    paragraphs = [p.text.strip() for p in document.paragraphs if p.text.strip()]
-
-    quiz_questions = []
-    i = 0
-    question_index = 0
-    while i < len(paragraphs):
-        question = paragraphs[i]
-        i += 1
-        options = []
-        correct_answer = None
-
-        while i < len(paragraphs) and (paragraphs[i].startswith("✓") or paragraphs[i].startswith("✗")):
-            line = paragraphs[i]
-            parts = line.split("-", 1)
-            if len(parts) == 2:
-                marker = parts[0].strip()
-                option_text = parts[1].strip()
-                options.append(option_text)
-                if marker.startswith("✓"):
-                    correct_answer = option_text
-            i += 1
-
-        if question and options and correct_answer:
-            html = f'<p>{escape(question)}</p>'
-            html += '<div class="mc-options" data-correct="{escape(correct_answer)}">'
-
-            random.shuffle(options)
-            for opt in options:
-                html += (
-                    f'<div class="mc-option-row" data-correct="{escape(correct_answer)}">'
-                    f'  <input type="radio" name="q_{question_index}">'
-                    f'  <span class="mc-option-label">{escape(opt)}</span>'
-                    f'  <span class="trash-icon">🗑</span>'
-                    f'</div>'
-                )
-            html += '</div>'
-            quiz_questions.append(html)
-            question_index += 1
-
-    return quiz_questions
-
-def process_text_quiz(raw_text):
-    lines = [l.strip() for l in raw_text.splitlines()]
-    lines = [l for l in lines if l]  # убрали пустые
-
-    i = 0
-    n = len(lines)
-    quiz_questions = []
-    question_index = 0
-
-    while i < n:
-        question = lines[i]
-        i += 1
-        options = []
-        correct_answer = None
-
-        while i < n:
-            line = lines[i]
-            if line.startswith("✓") or line.startswith("✗"):
-                parts = line.split("-", 1)
-                if len(parts) == 2:
-                    marker = parts[0].strip()
-                    option_text = parts[1].strip()
-                    options.append(option_text)
-                    if marker.startswith("✓"):
-                        correct_answer = option_text
-                i += 1
-            else:
-                break
-
-        if question and options and correct_answer:
-            html = f'<p>{escape(question)}</p>'
-            html += '<div class="mc-options" data-correct="{escape(correct_answer)}">'
-
-            random.shuffle(options)
-            for opt in options:
-                html += (
-                    f'<div class="mc-option-row" data-correct="{escape(correct_answer)}">'
-                    f'  <input type="radio" name="q_{question_index}">'
-                    f'  <span class="mc-option-label">{escape(opt)}</span>'
-                    f'  <span class="trash-icon">🗑</span>'
-                    f'</div>'
-                )
-            html += '</div>'
-            quiz_questions.append(html)
-            question_index += 1
+def iter_quiz_questions(questions, rng=None):
+    """
+    Вопросы (итератор study_formats.Question) -> вопросы модели квиза по одному:
+      {"text": "...", "options": ["...", ...], "answer": 2}
+    Варианты уже перемешаны, answer — индекс верного варианта в options.
+    """
+    rng = rng or random
+    for q in questions:
+        correct = q.correct_option
+        options = list(q.options)
+        rng.shuffle(options)
+        yield {"text": q.text,
+               "options": [opt.text for opt in options],
+               "answer": options.index(correct)}
+
+def dumps_quiz(model):
+    """
+    JSON модели одной строкой (quiz_engine.html_json): ту же строку можно и
+    отдать из API, и вставить в <script> на странице.
+    """
+    return html_json(model)
 
-    return quiz_questions
+def iter_quiz_json(lines, issues=None):
+    """
+    (номер, строка) -> JSON квиза кусками, по вопросу (тот же текст, что
+    dumps_quiz модели с "issues"). Строки читаются по мере отдачи, так что
+    ни модель, ни JSON целиком в памяти не собираются.
+    """
+    issues = issues if issues is not None else ParseIssues()
+    yield '{"questions":['
+    sep = ""
+    for question in iter_quiz_questions(iter_questions(lines, issues)):
+        yield sep + dumps_quiz(question)
+        sep = ","
+    yield '],"issues":' + dumps_quiz(str(issues)) + '}'
+
+def process_word_quiz(source):
+    """
+    Квиз из Word-файла (путь или файловый объект) -> (JSON квиза, замечания
+    парсера строкой); абзацы читаются потоком.
+    """
+    issues = ParseIssues()
+    return "".join(iter_quiz_json(iter_docx_paragraphs(source), issues)), str(issues)
+
+def process_uploaded_quiz(upload):
+    """Фоновая задача: квиз из загруженного Word-файла (uploads.Upload) -> (JSON, issues)."""
+    try:
+        with upload.open() as f:
+            return process_word_quiz(f)
+    finally:
+        upload.discard()
+
+def submit_quiz_upload(file):
+    """Принимаем Word-файл и ставим разбор в очередь (UploadTooLarge / JobQueueFull — наружу)."""
+    upload = read_upload(file)
+    try:
+        return submit_job(process_uploaded_quiz, upload)
+    except JobQueueFull:
+        upload.discard()
+        raise
 
 @mc_quiz_word_bp.route('/mc_quiz_word', methods=['GET','POST'])
 def mc_quiz_word():
     """
     Страница Multiple Choice:
-      - Можно загрузить doc/docx
+      - Можно загрузить doc/docx (разбирается в фоне, страница ждёт ?job=<id>)
       - Или вставить текст (с вопросами/вариантами)
-      - Показываем красивый quiz
+      - Показываем красивый quiz: страница получает модель квиза одним JSON
+        (тем же, что отдаёт /mc_quiz_word/api) и рисует вопросы на клиенте
     """
-    quiz_questions = []
+    quiz_chunks = []
+    error_message = ""
+    api_url = ""
 
     if request.method == 'POST':
         # Загрузили Word-файл?
         if 'word_file' in request.files and request.files['word_file'].filename:
-            file = request.files['word_file']
-            from werkzeug.utils import secure_filename
-            filename = secure_filename(file.filename)
-            upload_dir = os.path.join('static', 'uploads')
-            os.makedirs(upload_dir, exist_ok=True)
-            file_path = os.path.join(upload_dir, filename)
-            file.save(file_path)
-
-            quiz_questions = process_word_quiz(file_path)
-            os.remove(file_path)
+            try:
+                job = submit_quiz_upload(request.files['word_file'])
+            except UploadTooLarge as e:
+                error_message = str(e)
+            except JobQueueFull:
+                error_message = "Server is busy, please try again in a minute."
+            else:
+                return redirect(url_for('mc_quiz_word.mc_quiz_word', job=job.id))
         else:
             input_text = request.form.get("input_text","").strip()
             if input_text:
-                quiz_questions = process_text_quiz(input_text)
+                # JSON квиза пишется в страницу по ходу отдачи (streaming.stream_page);
+                # замечания парсера известны только в конце — их показывает JS из quiz.issues
+                quiz_chunks = iter_quiz_json(iter_text_lines(input_text))
+    elif request.args.get("job"):
+        job = get_user_job(request.args["job"])
+        if job is None:
+            error_message = "This upload has expired. Please upload the file again."
+        elif job.state in PENDING_STATES:
+            return render_job_wait(job, "Reading Word file...")
+        elif job.state == DONE:
+            quiz_json, _ = job.result
+            quiz_chunks = [quiz_json]
+            api_url = url_for('mc_quiz_word.mc_quiz_api', job=job.id)
+        else:
+            error_message = f"Error reading Word file: {job.error}"
+
+    return render_mc_quiz_page(quiz_chunks, api_url, error_message)
 
-    return render_template("mc_quiz_word.html", quiz_questions=quiz_questions)
+def render_mc_quiz_page(quiz_chunks=(), api_url="", error_message=""):
+    """Страница квиза: quiz_chunks — JSON модели (строка целиком или куски iter_quiz_json)."""
+    return stream_page("mc_quiz_word.html", quiz_chunks=quiz_chunks, api_url=api_url,
+                       error_message=error_message)
 
+def quiz_json_response(quiz_json):
+    """Готовый JSON квиза (строка или куски) без повторной сериализации."""
+    return current_app.response_class(quiz_json, mimetype="application/json")
+
+@mc_quiz_word_bp.route('/mc_quiz_word/api', methods=['GET', 'POST'])
+def mc_quiz_api():
+    """
+    Модель квиза в JSON: {"questions": [{"text", "options", "answer"}], "issues"}.
+      POST input_text (форма или JSON {"input_text": ...}) -> 200 и модель;
+      POST word_file -> 202 {"job", "status_url"}, разбор идёт в фоне;
+      GET ?job=<id> -> 200 и модель / 202, пока задача не готова.
+    """
+    if request.method == 'POST':
+        if 'word_file' in request.files and request.files['word_file'].filename:
+            try:
+                job = submit_quiz_upload(request.files['word_file'])
+            except UploadTooLarge as e:
+                return jsonify({"error": str(e)}), 413
+            except JobQueueFull:
+                return jsonify({"error": "Server is busy"}), 503
+            return jsonify({"job": job.id, "status_url": url_for('mc_quiz_word.mc_quiz_api', job=job.id)}), 202
+        data = request.get_json(silent=True) if request.is_json else request.form
+        input_text = ((data or {}).get("input_text") or "").strip()
+        if not input_text:
+            return jsonify({"error": "Send input_text or word_file"}), 400
+        return quiz_json_response(iter_quiz_json(iter_text_lines(input_text)))
+
+    job = get_user_job(request.args.get("job"))
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    if job.state in PENDING_STATES:
+        return jsonify({"job": job.id, "state": job.state,
+                        "status_url": url_for('mc_quiz_word.mc_quiz_api', job=job.id)}), 202
+    if job.state != DONE:
+        return jsonify({"error": f"Error reading Word file: {job.error}"}), 400
+    quiz_json, _ = job.result
+    return quiz_json_response(quiz_json)
@@ -1,64 +1,69 @@
 import os
-import json
 import datetime
-from flask import Blueprint, request, render_template, redirect, url_for, jsonify
+import threading
+from flask import Blueprint, request, render_template, redirect, url_for, jsonify, make_response
+from calendar_store import open_store, parse_date_with_formats, find_subtask, add_subtask as append_subtask
 
 mycalendar_bp = Blueprint('mycalendar_bp', __name__, url_prefix='/calendar')
 
-EVENTS_FILE = "calendar_events.json"
+EVENTS_FILE = "calendar_events.json"  # старый формат (переносится в БД при первом запуске)
+CALENDAR_DB = "calendar.db"
+CALENDAR_BACKEND = os.environ.get("CALENDAR_BACKEND", "sqlite")  # "sqlite" или "json"
 
-def save_events(events):
-    with open(EVENTS_FILE, 'w', encoding='utf-8') as f:
-        json.dump(events, f, indent=2, ensure_ascii=False)
+# Окно календаря по умолчанию: последние 30 дней и всё будущее, по 100 дедлайнов
+CALENDAR_DEFAULT_PAST_DAYS = 30
+CALENDAR_PAGE_SIZE = 100
+CALENDAR_MAX_PAGE_SIZE = 500
 
-def load_events():
-    """
-    Считываем объекты (категории + дедлайны) из JSON,
-    если нет файла – создаём пустой список.
-    Проверяем/добавляем 'id', 'subtasks' (для дедлайнов).
-    """
-    if os.path.exists(EVENTS_FILE):
-        with open(EVENTS_FILE, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-    else:
-        data = []
-
-    max_id=0
-    for obj in data:
-        if isinstance(obj.get('id'), int) and obj['id']>max_id:
-            max_id=obj['id']
-
-    changed=False
-    for obj in data:
-        if 'id' not in obj:
-            max_id+=1
-            obj['id']=max_id
-            changed=True
-        if not obj.get('isCategory'):
-            if 'subtasks' not in obj:
-                obj['subtasks']=[]
-                changed=True
-
-    if changed:
-        save_events(data)
-    return data
-
-def parse_date_with_formats(date_str):
+_store = None
+_store_lock = threading.Lock()
+
+def get_store():
+    """Хранилище календаря (создаётся при первом обращении)."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = open_store(CALENDAR_BACKEND, CALENDAR_DB, EVENTS_FILE)
+    return _store
+
+def parse_window(args, default_from=None):
     """
-    Пытаемся распарсить строку, проверяя несколько форматов:
-      - YYYY-MM-DD
-      - MM/DD/YYYY
-      - DD/MM/YYYY
-    При успехе возвращаем datetime.datetime, иначе None.
+    from / to / limit / cursor из query-параметров.
+    Отсутствующий from => default_from, пустой from => без нижней границы.
+    Возвращает (date_from, date_to, limit, cursor) или строку-ошибку.
     """
-    fmts = ("%Y-%m-%d", "%m/%d/%Y", "%d/%m/%Y")
-    for fmt in fmts:
-        try:
-            dt = datetime.datetime.strptime(date_str, fmt)
-            return dt
-        except:
-            pass
-    return None
+    bounds = []
+    for name, default in (("from", default_from), ("to", None)):
+        raw = args.get(name)
+        if raw is None:
+            bounds.append(default)
+        elif not raw.strip():
+            bounds.append(None)
+        else:
+            dt = parse_date_with_formats(raw.strip())
+            if not dt:
+                return f"Invalid '{name}' date: {raw}"
+            bounds.append(dt.strftime("%Y-%m-%d"))
+    try:
+        limit = int(args.get("limit", CALENDAR_PAGE_SIZE))
+    except ValueError:
+        return "Invalid 'limit'"
+    limit = min(max(limit, 1), CALENDAR_MAX_PAGE_SIZE)
+    return bounds[0], bounds[1], limit, args.get("cursor") or None
+
+def prepare_deadline(d):
+    """Поля для шаблона: день недели и пронумерованные подзадачи."""
+    d['weekday']=''
+    try:
+        d['weekday']=datetime.date.fromisoformat(d.get('date','')).strftime("%A")  # Monday, Tuesday, ...
+    except ValueError:
+        pass  # иначе пустая строка
+    d['_subtasks_enumerated']=[
+        {"idx": i, "id": st.get('id'), "text": st['text'], "done": st['done']}
+        for i, st in enumerate(d['subtasks'])
+    ]
+    return d
 
 @mycalendar_bp.route('/', methods=['GET'])
 def index_calendar():
@@ -68,34 +73,65 @@ def index_calendar():
     - Форма Add Deadline (дата + заголовок + цвет + категория)
     - Категории (isCategory) со сворачиванием.
     - Дедлайны внутри категорий, плюс "No category".
+    - Только окно дат from/to (по умолчанию последние 30 дней + будущее),
+      страницами по limit, следующая страница — ?cursor=...
     """
-    data=load_events()
-
-    categories=[c for c in data if c.get('isCategory')]
-    deadlines=[d for d in data if not d.get('isCategory')]
+    default_from=(datetime.date.today()-datetime.timedelta(days=CALENDAR_DEFAULT_PAST_DAYS)).isoformat()
+    window=parse_window(request.args, default_from)
+    if isinstance(window, str):
+        window=parse_window({}, default_from)
+    date_from, date_to, limit, cursor = window
 
-    # Вычислим day-of-week для каждого дедлайна
+    store=get_store()
+    # версию читаем до выборки — изменения после неё придут через /changes
+    version=store.version()
+    categories=store.categories()
+    deadlines, next_cursor = store.deadlines(date_from, date_to, limit, cursor)
     for d in deadlines:
-        d['weekday']=''
-        if 'date' in d:
-            dt = parse_date_with_formats(d['date'])
-            if dt:
-                d['weekday']=dt.strftime("%A")  # Monday, Tuesday, ...
-            # иначе пустая строка
-
-    # Сортируем дедлайны
-    deadlines.sort(key=lambda x: x.get('date','9999-12-31'))
-
-    # Нумеруем подзадачи
-    for d in deadlines:
-        enumerated=[]
-        for i, st in enumerate(d['subtasks']):
-            enumerated.append({"idx": i, "text": st['text'], "done": st['done']})
-        d['_subtasks_enumerated']=enumerated
+        prepare_deadline(d)
 
     return render_template('mycalendar.html',
                            categories=categories,
-                           deadlines=deadlines)
+                           deadlines=deadlines,
+                           date_from=date_from or '',
+                           date_to=date_to or '',
+                           limit=limit,
+                           next_cursor=next_cursor,
+                           version=version)
+
+@mycalendar_bp.route('/changes', methods=['GET'])
+def changes():
+    """
+    Дельта для страницы календаря: ?since=<version>.
+    {"version", "changed": [объекты], "deleted": [id], "full"}.
+    ETag = since + текущая версия, так что "ничего не изменилось" -> 304.
+    """
+    try:
+        since=int(request.args.get("since", 0))
+    except ValueError:
+        return jsonify({"error": "Invalid 'since'"}), 400
+    store=get_store()
+    etag=f"{since}-{store.version()}"
+    if request.if_none_match.contains(etag):
+        resp=make_response("", 304)
+    else:
+        resp=jsonify(store.changes_since(since))
+    resp.set_etag(etag)
+    resp.headers['Cache-Control']='no-cache'
+    return resp
+
+@mycalendar_bp.route('/api/deadlines', methods=['GET'])
+def api_deadlines():
+    """
+    JSON: дедлайны в окне дат, страницами.
+    ?from=YYYY-MM-DD&to=YYYY-MM-DD&limit=100&cursor=<next_cursor>
+    """
+    window=parse_window(request.args)
+    if isinstance(window, str):
+        return jsonify({"error": window}), 400
+    date_from, date_to, limit, cursor = window
+    deadlines, next_cursor = get_store().deadlines(date_from, date_to, limit, cursor)
+    return jsonify({"deadlines": deadlines, "next_cursor": next_cursor})
 
 @mycalendar_bp.route('/add_category', methods=['POST'])
 def add_category():
@@ -104,16 +140,11 @@ def add_category():
     if not name:
         return redirect(url_for('mycalendar_bp.index_calendar'))
 
-    data=load_events()
-    new_id=1 if not data else max(o["id"] for o in data)+1
-
-    data.append({
-        "id": new_id,
+    get_store().add({
         "isCategory": True,
         "title": name,
         "color": color
     })
-    save_events(data)
     return redirect(url_for('mycalendar_bp.index_calendar'))
 
 @mycalendar_bp.route('/add_deadline', methods=['POST'])
@@ -126,11 +157,7 @@ def add_deadline():
     if not date or not title:
         return redirect(url_for('mycalendar_bp.index_calendar'))
 
-    data=load_events()
-    new_id=1 if not data else max(o["id"] for o in data)+1
-
-    data.append({
-        "id": new_id,
+    get_store().add({
         "isCategory": False,
         "date": date,
         "title": title,
@@ -138,14 +165,11 @@ def add_deadline():
         "subtasks": [],
         "category_id": cat_id
     })
-    save_events(data)
     return redirect(url_for('mycalendar_bp.index_calendar'))
 
 @mycalendar_bp.route('/delete_deadline/<int:item_id>', methods=['POST'])
 def delete_deadline(item_id):
-    data=load_events()
-    new_data=[obj for obj in data if obj['id']!=item_id]
-    save_events(new_data)
+    get_store().delete(item_id)
     return "OK"
 
 @mycalendar_bp.route('/add_subtask', methods=['POST'])
@@ -155,41 +179,107 @@ def add_subtask():
     if not st_text:
         return redirect(url_for('mycalendar_bp.index_calendar'))
 
-    data=load_events()
-    for d in data:
-        if d['id']==did and not d.get('isCategory'):
-            d['subtasks'].append({"text": st_text, "done":False})
-            break
-    save_events(data)
+    def add(d):
+        if not d.get('isCategory'):
+            append_subtask(d, st_text)
+    get_store().update(did, add)
     return redirect(url_for('mycalendar_bp.index_calendar'))
 
 @mycalendar_bp.route('/mark_subtask', methods=['POST'])
 def mark_subtask():
+    """{"deadline_id", "subtask_id", "done"}; subtask_index — для старых страниц."""
     info=request.get_json()
     did=info.get("deadline_id",-1)
+    sid=info.get("subtask_id")
     idx=info.get("subtask_index",-1)
     done=info.get("done",False)
 
-    data=load_events()
-    for d in data:
-        if d['id']==did and not d.get('isCategory'):
-            if 0<=idx<len(d['subtasks']):
-                d['subtasks'][idx]['done']=bool(done)
-            break
-    save_events(data)
+    def mark(d):
+        st=None if d.get('isCategory') else find_subtask(d, sid, idx)
+        if st:
+            st['done']=bool(done)
+    get_store().update(did, mark)
     return "OK"
 
 @mycalendar_bp.route('/delete_subtask', methods=['POST'])
 def delete_subtask():
+    """{"deadline_id", "subtask_id"}; subtask_index — для старых страниц."""
     info=request.get_json()
     did=info.get("deadline_id",-1)
+    sid=info.get("subtask_id")
     idx=info.get("subtask_index",-1)
 
-    data=load_events()
-    for d in data:
-        if d['id']==did and not d.get('isCategory'):
-            if 0<=idx<len(d['subtasks']):
-                d['subtasks'].pop(idx)
-            break
-    save_events(data)
+    def remove(d):
+        st=None if d.get('isCategory') else find_subtask(d, sid, idx)
+        if st:
+            d['subtasks'].remove(st)
+    get_store().update(did, remove)
     return "OK"
+
+def batch_operation(spec):
+    """
+    Одна операция из /calendar/batch -> операция хранилища.
+    Бросает ValueError на неверных данных (тогда весь batch отменяется).
+    """
+    op=spec.get("op")
+    if op=="delete_deadline":
+        return ("delete", spec.get("id", spec.get("deadline_id")))
+    did=spec.get("deadline_id")
+    sid=spec.get("subtask_id")
+
+    def subtask(d):
+        st=None if d.get('isCategory') else find_subtask(d, sid)
+        if not st:
+            raise ValueError(f"Subtask {sid} not found in deadline {did}")
+        return st
+
+    if op=="mark_subtask":
+        done=bool(spec.get("done", False))
+        def fn(d):
+            subtask(d)['done']=done
+    elif op=="delete_subtask":
+        def fn(d):
+            d['subtasks'].remove(subtask(d))
+    elif op=="add_subtask":
+        text=str(spec.get("text","")).strip()
+        if not text:
+            raise ValueError("Subtask text cannot be empty")
+        def fn(d):
+            if d.get('isCategory'):
+                raise ValueError(f"{did} is not a deadline")
+            append_subtask(d, text)
+    else:
+        raise ValueError(f"Unknown operation: {op}")
+    return ("update", did, fn)
+
+@mycalendar_bp.route('/batch', methods=['POST'])
+def batch():
+    """
+    Несколько изменений одним запросом, атомарно:
+      {"since": <version>, "ops": [
+         {"op": "mark_subtask", "deadline_id": 9, "subtask_id": 2, "done": true},
+         {"op": "delete_subtask", "deadline_id": 9, "subtask_id": 3},
+         {"op": "add_subtask", "deadline_id": 9, "text": "..."},
+         {"op": "delete_deadline", "id": 12}]}
+    Ответ — дельта от since (как /calendar/changes).
+    """
+    info=request.get_json(silent=True)
+    if not isinstance(info, dict):
+        return jsonify({"error": "Request body must be a JSON object"}), 400
+    since=info.get("since")
+    specs=info.get("ops", [])
+    if since is not None and (not isinstance(since, int) or isinstance(since, bool)):
+        return jsonify({"error": "Invalid 'since'"}), 400
+    if not isinstance(specs, list):
+        return jsonify({"error": "'ops' must be a list"}), 400
+    store=get_store()
+    if since is None:
+        since=store.version()
+    try:
+        ops=[batch_operation(spec) for spec in specs]
+        store.batch(ops)
+    except KeyError as e:
+        return jsonify({"error": f"Object {e.args[0]} not found"}), 404
+    except (ValueError, TypeError, AttributeError) as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(store.changes_since(since))
@@ -0,0 +1,505 @@
+import os
+import re
+import json
+import random
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from lazy_imports import lazy_import
+
+bs4 = lazy_import("bs4")
+
+# Один скомпилированный паттерн на все токены:
+# группа 1 — пробелы, группа 2 — пунктуация, группа 3 — слово (\w+)
+TOKEN_RE = re.compile(r'(\s+)|([^\w\s]+)|(\w+)')
+WORD_GROUP = 3
+
+
+@lru_cache(maxsize=None)
+def raw_html_type():
+    """
+    Класс RawHTML(NavigableString): строка, которая при сериализации
+    выводится как готовый HTML (без экранирования). Позволяет заменить
+    текстовый узел на сгенерированную разметку без повторного парсинга
+    BeautifulSoup. Создаётся при первом вызове, чтобы bs4 импортировался
+    лениво.
+    """
+
+    class RawHTML(bs4.NavigableString):
+        def output_ready(self, formatter="minimal"):
+            return str(self)
+
+    return RawHTML
+
+
+def tokenize(text):
+    """Разбиваем строку на [(token, is_word), ...] за один проход."""
+    return [(m.group(), m.lastindex == WORD_GROUP) for m in TOKEN_RE.finditer(text)]
+
+
+def escape_text(s):
+    """Экранирование текста так же, как его выводит BeautifulSoup (formatter="minimal")."""
+    return s.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+def escape_attr(s):
+    """Экранирование значения атрибута в двойных кавычках."""
+    return escape_text(s).replace('"', "&quot;")
+
+
+def html_json(obj):
+    """
+    JSON одной строкой, безопасный внутри <script>: <, >, & и ' заменены
+    на \\u-escape (тот же текст годится и как ответ API).
+    """
+    return (json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+            .replace("<", "\\u003c").replace(">", "\\u003e")
+            .replace("&", "\\u0026").replace("'", "\\u0027"))
+
+
+def is_text_node(node):
+    """
+    Обычный текст документа. Содержимое <script>/<style>, комментарии,
+    doctype и т.п. не токенизируются и выводятся как есть.
+    """
+    return not isinstance(node, (bs4.element.PreformattedString, bs4.Script, bs4.Stylesheet))
+
+
+def parse_text_nodes(html):
+    """
+    Парсим HTML один раз и собираем все непустые текстовые узлы
+    (is_text_node) вместе с токенами: (soup, [(node, tokens), ...]).
+    """
+    soup = bs4.BeautifulSoup(html, "html.parser")
+    text_nodes = []
+    for node in soup.find_all(string=True):
+        if node.strip() and is_text_node(node):
+            text_nodes.append((node, tokenize(node)))
+    return soup, text_nodes
+
+
+def render_soup(soup, text_nodes, fragments):
+    """
+    Подставляем готовый HTML вместо каждого текстового узла и
+    сериализуем документ одним проходом.
+    """
+    RawHTML = raw_html_type()
+    for (node, _), frag in zip(text_nodes, fragments):
+        node.replace_with(RawHTML(frag))
+    return str(soup)
+
+
+# Кэш разобранных документов: ключ — sha256 HTML, LRU с ограничением по памяти
+TOKEN_CACHE_MAX_BYTES = int(os.environ.get("TOKEN_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+# Метка места текстового узла в сериализованном документе (NUL из входа удаляется)
+_NODE_MARK = "\x00"
+
+
+def new_seed():
+    return random.randrange(1_000_000_000)
+
+
+def resolve_seed(value):
+    """Seed из формы: число -> int, пусто/не число -> новый случайный (его можно показать пользователю)."""
+    value = (value or "").strip()
+    return int(value) if value.isdigit() else new_seed()
+
+
+class TokenStream:
+    """
+    Разобранный документ, из которого можно много раз собрать новый HTML
+    без BeautifulSoup:
+      - skeleton — куски готового HTML между непустыми текстовыми узлами
+        (len(skeleton) == len(nodes) + 1);
+      - nodes — токены каждого узла [(token, is_word), ...];
+      - words — все слова документа по порядку (позиция = глобальный индекс).
+    Объект не меняется после создания, поэтому его можно делить между
+    запросами и потоками (см. TokenStreamCache).
+    """
+
+    def __init__(self, html):
+        soup, text_nodes = parse_text_nodes(html.replace(_NODE_MARK, ""))
+        self.nodes = [tokens for _, tokens in text_nodes]
+        self.skeleton = render_soup(soup, text_nodes, [_NODE_MARK] * len(text_nodes)).split(_NODE_MARK)
+        self.words = [tok for tokens in self.nodes for tok, is_word in tokens if is_word]
+        self._samplers = {}
+        # Грубая оценка памяти: строки HTML + ~100 байт на токен (кортеж, ссылки)
+        self.size = (sum(len(part) for part in self.skeleton) + len(html)
+                     + 100 * sum(len(tokens) for tokens in self.nodes))
+
+    def sampler(self, prefer=None):
+        """DistractorSampler по словарю документа (строится один раз на prefer)."""
+        sampler = self._samplers.get(prefer)
+        if sampler is None:
+            sampler = self._samplers[prefer] = DistractorSampler(self.words, prefer=prefer)
+        return sampler
+
+    def render(self, fragments):
+        """Новый HTML документа: fragments — разметка вместо каждого текстового узла."""
+        return "".join(self.iter_render(fragments))
+
+    def iter_render(self, fragments):
+        """
+        То же, что render, но кусками: fragments может быть генератором, и
+        документ целиком в памяти не собирается (для потоковой отдачи).
+        """
+        yield self.skeleton[0]
+        for frag, tail in zip(fragments, self.skeleton[1:]):
+            yield frag
+            yield tail
+
+
+class TokenStreamCache:
+    """
+    LRU-кэш TokenStream по sha256 HTML с ограничением по суммарному размеру
+    (оценка TokenStream.size). Повторная отправка того же текста с другим
+    процентом/режимом/seed не разбирает документ заново.
+    """
+
+    def __init__(self, max_bytes=TOKEN_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._mem = OrderedDict()  # sha256 -> TokenStream
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def get(self, html):
+        key = hashlib.sha256(html.encode("utf-8", "surrogatepass")).hexdigest()
+        with self._lock:
+            stream = self._mem.get(key)
+            if stream is not None:
+                self._mem.move_to_end(key)
+                self.stats["hits"] += 1
+                return stream
+            self.stats["misses"] += 1
+        stream = TokenStream(html)
+        if stream.size > self.max_bytes:
+            return stream
+        with self._lock:
+            if key not in self._mem:
+                self._mem[key] = stream
+                self._bytes += stream.size
+                while self._bytes > self.max_bytes:
+                    _, old = self._mem.popitem(last=False)
+                    self._bytes -= old.size
+                    self.stats["evictions"] += 1
+        return stream
+
+    def clear(self):
+        with self._lock:
+            self._mem.clear()
+            self._bytes = 0
+
+    def info(self):
+        with self._lock:
+            return dict(self.stats, entries=len(self._mem),
+                        bytes=self._bytes, max_bytes=self.max_bytes)
+
+
+token_cache = TokenStreamCache()
+
+
+def get_token_stream(html):
+    """TokenStream документа из общего кэша процесса."""
+    return token_cache.get(html)
+
+
+def word_case(word):
+    """Класс регистра слова: upper / title / lower / other."""
+    if word.isupper() and len(word) > 1:
+        return "upper"
+    if word.istitle():
+        return "title"
+    if word.islower():
+        return "lower"
+    return "other"
+
+
+class WordTable:
+    """
+    Общая таблица слов страницы для компактного multiple choice: пропуск
+    ссылается на верное и неправильные слова номерами, а сами слова уходят
+    на страницу один раз (dumps -> <script type="application/json" id="quizWords">).
+    """
+
+    def __init__(self):
+        self.words = []
+        self._ids = {}
+
+    def __len__(self):
+        return len(self.words)
+
+    def index(self, word):
+        """Номер слова в таблице (новое слово добавляется в конец)."""
+        i = self._ids.get(word)
+        if i is None:
+            i = self._ids[word] = len(self.words)
+            self.words.append(word)
+        return i
+
+    def dumps(self):
+        return html_json(self.words)
+
+
+class DistractorSampler:
+    """
+    Выбор неправильных вариантов для multiple choice.
+    Строится один раз на документ; sample() возвращает k слов за O(k)
+    (выборка с отбраковкой вместо копирования всего словаря).
+
+    prefer:
+      - None     — любые слова словаря;
+      - "length" — сначала слова той же длины;
+      - "case"   — сначала слова с тем же регистром (Title / UPPER / lower).
+    Если подходящих слов не хватает, добираем из всего словаря.
+    """
+
+    PREFER_MODES = ("length", "case")
+
+    def __init__(self, words, prefer=None, rng=None):
+        self.words = sorted(set(words))
+        self.vocab = frozenset(self.words)
+        self.prefer = prefer if prefer in self.PREFER_MODES else None
+        self.rng = rng or random
+        self.buckets = {}
+        if self.prefer:
+            for w in self.words:
+                self.buckets.setdefault(self._key(w), []).append(w)
+
+    def _key(self, word):
+        return len(word) if self.prefer == "length" else word_case(word)
+
+    def _draw(self, pool, correct, k, chosen, rng):
+        """
+        Добавляет в chosen до k слов из pool (без correct и без повторов).
+        pool — весь словарь или корзина correct, так что все уже выбранные
+        слова и само correct (если оно есть в словаре) лежат в pool.
+        """
+        available = len(pool) - len(chosen) - (correct in self.vocab)
+        if available <= k - len(chosen):
+            # Кандидатов мало — просто берём всех
+            for w in pool:
+                if w != correct and w not in chosen:
+                    chosen.append(w)
+            return chosen
+        n = len(pool)
+        while len(chosen) < k:
+            w = pool[int(rng.random() * n)]
+            if w != correct and w not in chosen:
+                chosen.append(w)
+        return chosen
+
+    def sample(self, correct, k=2, rng=None):
+        """
+        k неправильных вариантов для слова correct (correct никогда не возвращается).
+        rng — генератор запроса (иначе self.rng): один сэмплер можно делить между запросами.
+        """
+        rng = rng or self.rng
+        chosen = []
+        if self.prefer:
+            bucket = self.buckets.get(self._key(correct))
+            if bucket:
+                self._draw(bucket, correct, k, chosen, rng)
+        if len(chosen) < k:
+            self._draw(self.words, correct, k, chosen, rng)
+        return chosen
+
+
+def answer_key(text):
+    """Ключ сравнения ответов — как в шаблоне matching (trim + lower)."""
+    return text.strip().lower()
+
+
+def answer_shape(text):
+    """
+    Грубая «форма» ответа: классы символов со сжатыми повторами
+    (A — заглавная, a — строчная, 9 — цифра, остальное как есть) и
+    порядок длины. "Loss of consciousness" -> ("Aa a a", 5), "1848" -> ("9", 3).
+    """
+    shape = []
+    for ch in text.strip():
+        if ch.isupper():
+            c = "A"
+        elif ch.isalpha():
+            c = "a"
+        elif ch.isdigit():
+            c = "9"
+        elif ch.isspace():
+            c = " "
+        else:
+            c = ch
+        if not shape or shape[-1] != c:
+            shape.append(c)
+    return "".join(shape), len(text.strip()).bit_length()
+
+
+class AnswerSampler:
+    """
+    Неправильные варианты для matching: правые части всех пар документа.
+    Строится один раз на загрузку; sample() возвращает k вариантов за
+    ожидаемое O(k) (выборка с отбраковкой, без перемешивания всего списка).
+
+    items — [(group, answer), ...], group — номер блока. Ответы, совпадающие
+    после answer_key (повторы, регистр, пробелы по краям), считаются одним.
+
+    prefer — порядок предпочтений, кортеж из:
+      - "group" — ответы из того же блока;
+      - "shape" — ответы похожей длины и вида (answer_shape).
+    Если подходящих не хватает, добираем из всех ответов.
+    """
+
+    PREFER_MODES = ("group", "shape")
+
+    def __init__(self, items, prefer=("group", "shape"), rng=None):
+        self.prefer = tuple(p for p in (prefer or ()) if p in self.PREFER_MODES)
+        self.rng = rng or random
+        self.answers = []
+        self.pools = {}
+        seen = {}
+        for group, answer in items:
+            key = answer_key(answer)
+            if key not in seen:
+                seen[key] = answer
+                self.answers.append(answer)
+                if "shape" in self.prefer:
+                    self._add(("shape", answer_shape(answer)), key, answer)
+            if "group" in self.prefer:
+                self._add(("group", group), key, seen[key])
+        self.all = (self.answers, set(seen))
+
+    def _add(self, pool_id, key, answer):
+        pool = self.pools.get(pool_id)
+        if pool is None:
+            pool = self.pools[pool_id] = ([], set())
+        if key not in pool[1]:
+            pool[0].append(answer)
+            pool[1].add(key)
+
+    def _draw(self, pool, exclude, k, chosen):
+        """
+        Добавляет в chosen до k ответов из pool (без ключей из exclude).
+        pool — (список ответов, множество их ключей); exclude — ключи
+        правильного ответа и уже выбранных, пополняется.
+        """
+        answers, keys = pool
+        available = len(answers) - sum(1 for key in exclude if key in keys)
+        if available <= k - len(chosen):
+            # Кандидатов мало — просто берём всех
+            for a in answers:
+                key = answer_key(a)
+                if key not in exclude:
+                    exclude.add(key)
+                    chosen.append(a)
+            return chosen
+        n = len(answers)
+        while len(chosen) < k:
+            a = answers[int(self.rng.random() * n)]
+            key = answer_key(a)
+            if key not in exclude:
+                exclude.add(key)
+                chosen.append(a)
+        return chosen
+
+    def sample(self, correct, k=3, group=None):
+        """k неправильных вариантов для ответа correct из блока group."""
+        chosen = []
+        exclude = {answer_key(correct)}
+        for mode in self.prefer:
+            pool_id = ("group", group) if mode == "group" else ("shape", answer_shape(correct))
+            pool = self.pools.get(pool_id)
+            if pool is not None and len(chosen) < k:
+                self._draw(pool, exclude, k, chosen)
+        if len(chosen) < k:
+            self._draw(self.all, exclude, k, chosen)
+        return chosen
+
+
+# ---------- скрытие букв (главная страница) ----------
+
+FILL_LETTER_HTML = (
+    '<span class="hint-wrapper" style="position:relative; display:inline-block;">'
+    '  <input type="text" class="fill-input" maxlength="1" '
+    '         data-correct="{0}">'
+    # Небольшой вопросик, при наведении (или нажатии) показывает букву
+    '  <span class="hint-icon" '
+    '        style="position:absolute; top:-1.3em; left:0; '
+    '               cursor:pointer; font-size:12px; color:#999;" '
+    '        onmouseover="this.textContent=\'{0}\'" '
+    '        onmouseout="this.textContent=\'?\'" '
+    '        onclick="this.textContent=\'{0}\'" '
+    '>?</span>'
+    '</span>'
+)
+
+
+def hidden_letter_count(length, prob):
+    """Сколько букв скрыть в слове длины length (минимум одну)."""
+    n = max(1, int(length * prob)) if length > 1 else 1
+    return min(n, length)
+
+
+def pick_hidden_letters(lengths, prob, rng=None):
+    """
+    Позиции скрываемых букв для всех слов документа одним розыгрышем.
+    Случайные ключи для всех букв берутся одним rng.randbytes (32 бита на
+    букву); в каждом слове скрываются hidden_letter_count букв с наименьшими
+    ключами — это равномерный выбор без повторов, как random.sample.
+    Возвращает список (по словам) списков позиций.
+    """
+    rng = rng or random
+    total = sum(lengths)
+    keys = memoryview(rng.randbytes(4 * total)).cast("I") if total else ()
+    out = []
+    start = 0
+    for length in lengths:
+        n = hidden_letter_count(length, prob)
+        if n >= length:
+            out.append(range(length))
+        elif n == 1:
+            seg = keys[start:start + length]
+            out.append((min(range(length), key=seg.__getitem__),))
+        else:
+            seg = keys[start:start + length]
+            out.append(sorted(range(length), key=seg.__getitem__)[:n])
+        start += length
+    return out
+
+
+def hide_letters_html(html, prob=0.2, fill_mode=False, seed=None):
+    """
+    Скрываем буквы в каждом слове HTML: "_" вместо буквы или (fill_mode)
+    поле ввода с подсказкой. Каждый токен (кроме пробелов) оборачивается в
+    <span class="word">. Разобранный документ берётся из кэша (TokenStream),
+    позиции букв для всего документа выбираются одним розыгрышем, результат
+    собирается одним проходом. seed делает результат воспроизводимым.
+    """
+    return "".join(iter_hide_letters_html(html, prob, fill_mode, seed))
+
+
+def iter_hide_letters_html(html, prob=0.2, fill_mode=False, seed=None):
+    """
+    hide_letters_html кусками (по текстовому узлу). Генератор: документ
+    разбирается при первом next(), то есть уже во время отдачи страницы.
+    """
+    rng = random.Random(seed)
+    stream = get_token_stream(html)
+    hidden = iter(pick_hidden_letters([len(w) for w in stream.words], prob, rng))
+    yield from stream.iter_render(_hide_letters_fragments(stream, hidden, fill_mode))
+
+
+def _hide_letters_fragments(stream, hidden, fill_mode):
+    fill = FILL_LETTER_HTML.format
+    for tokens in stream.nodes:
+        parts = []
+        for tok, is_word in tokens:
+            if is_word:
+                chars = list(tok)
+                for i in next(hidden):
+                    chars[i] = fill(chars[i]) if fill_mode else "_"
+                parts.append('<span class="word">' + "".join(chars) + '</span>')
+            elif tok[0].isspace():
+                parts.append(tok)
+            else:
+                parts.append('<span class="word">' + escape_text(tok) + '</span>')
+        yield "".join(parts)
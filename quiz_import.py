@@ -0,0 +1,124 @@
+import io
+import csv
+import itertools
+import random
+from markupsafe import escape
+from lazy_imports import lazy_import
+
+openpyxl = lazy_import("openpyxl")
+
+# Импорт квиза из таблицы (xlsx или csv): строка с заголовками — первая,
+# где есть все колонки (выше могут быть пустые строки или шапка документа)
+QUIZ_COLUMNS = ("Question", "Correct", "Option1", "Option2", "Option3")
+# В скольких первых строках искать заголовки
+HEADER_SEARCH_ROWS = 20
+EXCEL_EXTS = (".xlsx", ".xlsm")
+CSV_EXTS = (".csv",)
+# Сколько ошибок перечислять в сообщении
+MAX_REPORTED_ERRORS = 20
+
+
+class QuizImportError(ValueError):
+    """Таблица не подходит: нет нужных колонок или строки заполнены не полностью."""
+
+
+def cell_text(value):
+    """Значение ячейки -> текст (4.0 -> "4", пусто -> "")."""
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def _sheet_rows(ws):
+    """(номер строки листа, значения): номер берём у ячейки (cell.row), у пустых
+    ячеек read_only его нет — тогда следующий за предыдущим."""
+    row_no = 0
+    for cells in ws.iter_rows():
+        row_no = next((c.row for c in cells if getattr(c, "row", None)), row_no + 1)
+        yield row_no, tuple(c.value for c in cells)
+
+
+def iter_table_rows(fileobj, ext):
+    """
+    Строки таблицы по одной — (номер строки как в Excel, кортеж значений),
+    не загружая файл целиком: xlsx — openpyxl в режиме read_only,
+    csv — csv.reader (UTF-8, с BOM или без; номер — номер записи).
+    """
+    if ext in EXCEL_EXTS:
+        wb = openpyxl.load_workbook(fileobj, read_only=True, data_only=True)
+        try:
+            yield from _sheet_rows(wb.worksheets[0])
+        finally:
+            wb.close()
+    elif ext in CSV_EXTS:
+        text = io.TextIOWrapper(fileobj, encoding="utf-8-sig", newline="")
+        yield from enumerate(csv.reader(text), start=1)
+    else:
+        raise QuizImportError(f"Unsupported file format {ext or '(none)'}. Please use .xlsx or .csv.")
+
+
+def find_header(rows):
+    """
+    Заголовки — первая из HEADER_SEARCH_ROWS строк, где есть все QUIZ_COLUMNS;
+    rows после неё остаются непрочитанными. Если такой нет — ошибка
+    по первой непустой строке.
+    """
+    first = None
+    for _, row in itertools.islice(rows, HEADER_SEARCH_ROWS):
+        header = [cell_text(v) for v in row]
+        if all(c in header for c in QUIZ_COLUMNS):
+            return header
+        if first is None and any(header):
+            first = header
+    missing = [c for c in QUIZ_COLUMNS if c not in (first or ())]
+    raise QuizImportError("Missing column(s): " + ", ".join(missing)
+                          + ". Expected: " + ", ".join(QUIZ_COLUMNS) + ".")
+
+
+def iter_questions(rows):
+    """
+    (номер строки, вопрос, правильный ответ, [неправильные]) для каждой
+    непустой строки после заголовков; rows — пары (номер строки, значения)
+    из iter_table_rows. Ошибки копятся и выбрасываются одним QuizImportError
+    в конце, с номерами строк как в самой таблице.
+    """
+    rows = iter(rows)
+    header = find_header(rows)
+    index = [header.index(c) for c in QUIZ_COLUMNS]
+
+    errors, n_errors = [], 0
+    for row_no, row in rows:
+        values = [cell_text(row[i]) if i < len(row) else "" for i in index]
+        if not any(values):
+            continue
+        empty = [c for c, v in zip(QUIZ_COLUMNS, values) if not v]
+        if empty:
+            n_errors += 1
+            if len(errors) < MAX_REPORTED_ERRORS:
+                errors.append(f"Row {row_no}: empty {', '.join(empty)}")
+            continue
+        if not n_errors:
+            yield row_no, values[0], values[1], values[2:]
+    if n_errors:
+        more = f" (and {n_errors - len(errors)} more)" if n_errors > len(errors) else ""
+        raise QuizImportError("; ".join(errors) + more)
+
+
+def question_html(question, correct, wrongs):
+    """Один вопрос: <p> + кнопки вариантов в случайном порядке."""
+    options = [correct] + wrongs
+    random.shuffle(options)
+    attr = escape(correct)
+    parts = [f'<div class="quiz-question"><p>{escape(question)}</p>']
+    parts.extend(f'<button class="mc-option-btn" data-correct="{attr}">{escape(opt)}</button>'
+                 for opt in options)
+    parts.append('</div>')
+    return "".join(parts)
+
+
+def import_quiz(fileobj, ext):
+    """Таблица -> список HTML-вопросов (QuizImportError, если таблица с ошибками)."""
+    return [question_html(q, correct, wrongs)
+            for _, q, correct, wrongs in iter_questions(iter_table_rows(fileobj, ext))]
@@ -1,11 +1,17 @@
-import re
 import random
 import os
-from flask import Blueprint, request, render_template, redirect, url_for, session
+from flask import Blueprint, request, redirect, url_for, session
 from markupsafe import escape
-from bs4 import BeautifulSoup
+from library import index_documents
+from library_index import library_index
+from jobs import submit_job, get_user_job, render_job_wait, JobQueueFull, PENDING_STATES, DONE
+from uploads import read_upload, UploadTooLarge
+from quiz_import import import_quiz
+from quiz_engine import get_token_stream, escape_text, escape_attr, resolve_seed, WordTable
+from lazy_imports import lazy_import
+from streaming import stream_page
 
-import pandas as pd  # Новый импорт для работы с Excel (не забудьте установить pandas!)
+bs4 = lazy_import("bs4")
 
 quizz_bp = Blueprint('quizz', __name__)
 
@@ -21,31 +27,64 @@ def get_user_library_root():
 
 def get_plain_text(html):
     """Если нужно извлекать обычный текст без HTML."""
-    soup = BeautifulSoup(html, "html.parser")
+    soup = bs4.BeautifulSoup(html, "html.parser")
     return soup.get_text(separator="\n")
 
-def quizz_process(html, mode, hide_percent, chosen_words=None):
+def _render_hidden(tok, mode, sampler, rng, word_table=None):
+    """HTML-разметка для одного скрытого слова в зависимости от mode."""
+    if mode == "multiple_choice":
+        correct = tok
+        wrongs = sampler.sample(correct, 2, rng)
+        if word_table is not None:
+            # компактный вывод: номера слов в общей таблице страницы (WordTable)
+            wi = ",".join(str(word_table.index(w)) for w in wrongs)
+            return f'<span class="mc-gap" data-c="{word_table.index(correct)}" data-w="{wi}">???</span>'
+        wr = "|".join(wrongs)
+        return (
+            f'<span class="mc-gap" data-correct="{escape_attr(correct)}" '
+            f'data-wrongs="{escape_attr(wr)}">???</span>'
+        )
+    elif mode == "missing_words_write":
+        wlen = len(tok)
+        return (
+            f'<input class="fill-input" data-correct="{escape_attr(tok)}" '
+            f'maxlength="{wlen}" style="width:{max(wlen*1.3,5)}ch" type="text"/>'
+        )
+    else:
+        # missing_words_no_write
+        return (
+            f'<span class="hidden-word" data-original="{escape_attr(tok)}" '
+            f'style="width:{max(len(tok)*1.3,4)}ch;"></span>'
+        )
+
+def quizz_process(html, mode, hide_percent, chosen_words=None, distractors=None, seed=None,
+                  word_table=None):
     """
     Обрабатывает HTML, пряча некоторый процент слов 
     (multiple_choice / missing_words_write / missing_words_no_write).
     Если hide_percent равен "chosen", то скрываются только слова, указанные в chosen_words (через запятую).
+    distractors ("length" / "case" / None) — какие неправильные варианты
+    предпочитать в multiple choice (см. DistractorSampler).
+    seed — тот же seed и те же параметры дают тот же квиз.
+    word_table (quiz_engine.WordTable) — компактный multiple choice: пропуски
+    ссылаются на слова таблицы номерами, таблица выводится на страницу один раз.
+
+    Разобранный документ (текстовые узлы, токены, словарь) берётся из кэша
+    по хэшу HTML, так что при смене процента/режима заново выполняются
+    только выбор слов и сборка HTML.
+    """
+    return "".join(iter_quizz_process(html, mode, hide_percent, chosen_words, distractors, seed, word_table))
+
+def iter_quizz_process(html, mode, hide_percent, chosen_words=None, distractors=None, seed=None,
+                       word_table=None):
     """
-    soup = BeautifulSoup(html, "html.parser")
-    text_nodes = []
-    # Собираем все текстовые узлы
-    for node in soup.find_all(string=True):
-        raw = node
-        if raw.strip():
-            # Разбиваем строку на (\s+), (\w+) и "не-пробельные символы"
-            tokens = re.findall(r'\s+|[^\w\s]+|\w+', raw)
-            text_nodes.append((node, tokens))
-
-    # Собираем все слова (только \w+)
-    all_words = []
-    for nodeIdx, (nd, toks) in enumerate(text_nodes):
-        for tokIdx, tok in enumerate(toks):
-            if re.match(r'^\w+$', tok):
-                all_words.append((nodeIdx, tokIdx, tok))
+    quizz_process кусками, по текстовому узлу. Генератор: документ разбирается
+    при первом next(), то есть уже во время отдачи страницы (streaming.stream_page);
+    word_table заполняется по ходу и готов, когда генератор исчерпан.
+    """
+    rng = random.Random(seed)
+    stream = get_token_stream(html)
+    all_words = stream.words
 
     if hide_percent == "chosen":
         chosen_set = set(word.strip().lower() for word in chosen_words.split(",") if word.strip()) if chosen_words else set()
@@ -55,68 +94,96 @@ def quizz_process(html, mode, hide_percent, chosen_words=None):
         if n_hide > len(all_words):
             n_hide = len(all_words)
         indices = list(range(len(all_words)))
-        random.shuffle(indices)
+        rng.shuffle(indices)
         hideSet = set(indices[:n_hide])
 
-    # Уникальные слова (если надо для multiple choice)
-    unique_words = set(w for (_, _, w) in all_words)
-
-    # Обходим все слова, вставляем замену
-    global_idx = 0
-    for nodeIdx, (nd, toks) in enumerate(text_nodes):
-        newToks = []
-        for tokIdx, tok in enumerate(toks):
-            if re.match(r'^\w+$', tok):
-                hide_this = False
-                if hide_percent == "chosen":
-                    if tok.lower() in chosen_set:
-                        hide_this = True
-                else:
-                    if global_idx in hideSet:
-                        hide_this = True
-
-                if hide_this:
-                    # Прячем это слово в зависимости от mode
-                    if mode == "multiple_choice":
-                        correct = tok
-                        inc = [w for w in unique_words if w != correct]
-                        wrongs = []
-                        if len(inc) > 2:
-                            wrongs = random.sample(inc, 2)
-                        elif inc:
-                            wrongs = inc[:2]
-                        wr = "|".join(wrongs)
-                        replaced = (
-                            f'<span class="mc-gap" data-correct="{escape(correct)}" '
-                            f'data-wrongs="{escape(wr)}">???</span>'
-                        )
-                        newToks.append(replaced)
-                    elif mode == "missing_words_write":
-                        wlen = len(tok)
-                        replaced = (
-                            f'<input type="text" class="fill-input" data-correct="{escape(tok)}" '
-                            f'style="width:{max(wlen*1.3,5)}ch" maxlength="{wlen}">'
-                        )
-                        newToks.append(replaced)
+    # Словарь для неправильных вариантов строится один раз на документ (и кэшируется)
+    sampler = stream.sampler(distractors or None) if mode == "multiple_choice" else None
+
+    # Обходим все слова, собираем HTML для каждого текстового узла
+    def fragments():
+        global_idx = 0
+        for toks in stream.nodes:
+            newToks = []
+            for tok, is_word in toks:
+                if is_word:
+                    if hide_percent == "chosen":
+                        hide_this = tok.lower() in chosen_set
+                    else:
+                        hide_this = global_idx in hideSet
+
+                    if hide_this:
+                        newToks.append(_render_hidden(tok, mode, sampler, rng, word_table))
                     else:
-                        # missing_words_no_write
-                        replaced = (
-                            f'<span class="hidden-word" data-original="{escape(tok)}" '
-                            f'style="width:{max(len(tok)*1.3,4)}ch;"></span>'
-                        )
-                        newToks.append(replaced)
+                        # Слово не скрывается
+                        newToks.append(escape_text(tok))
+                    global_idx += 1
                 else:
-                    # Слово не скрывается
-                    newToks.append(escape(tok))
-                global_idx += 1
-            else:
-                # пробелы/пунктуация
-                newToks.append(escape(tok))
-        replaced = "".join(newToks)
-        frag = BeautifulSoup(replaced, "html.parser")
-        nd.replace_with(frag)
-
-    return str(soup)
+                    # пробелы/пунктуация
+                    newToks.append(escape_text(tok))
+            yield "".join(newToks)
+
+    yield from stream.iter_render(fragments())
+
+def excel_to_questions(upload):
+    """
+    Фоновая задача: квиз из таблицы xlsx/csv (колонки Question, Correct,
+    Option1-3), upload — uploads.Upload. Строки читаются потоком.
+    """
+    try:
+        with upload.open() as f:
+            return import_quiz(f, upload.ext)
+    finally:
+        upload.discard()
+
+def render_quizz_page(editor_initial="", params=None, quiz_questions=()):
+    """
+    Страница квиза. params (request.form / request.args: mode, hide_percent,
+    chosen_words, distractors, mc_output, seed) — если переданы, квиз
+    строится из editor_initial по ходу отдачи страницы (streaming.stream_page).
+    quiz_questions — готовые вопросы (импорт из Excel).
+    """
+    mode = "multiple_choice"
+    hide_percent = 30
+    chosen_words = ""
+    distractors = ""
+    seed_input = ""
+    seed = None
+    mc_output = "table"
+    word_table = None
+
+    if params is not None:
+        mode = params.get("mode", "multiple_choice")
+        distractors = params.get("distractors", "")
+        # "table" — слова multiple choice одной таблицей на страницу, "inline" — в каждом пропуске
+        mc_output = params.get("mc_output", "table")
+        # Без seed в форме берём новый и показываем его — квиз можно повторить
+        seed_input = params.get("seed", "").strip()
+        seed = resolve_seed(seed_input)
+        hide_percent = params.get("hide_percent", "30")
+        if hide_percent == "chosen":
+            chosen_words = params.get("chosen_words", "")
+        else:
+            try:
+                hide_percent = int(hide_percent)
+            except:
+                hide_percent = 30
+        if mode == "multiple_choice" and mc_output != "inline":
+            word_table = WordTable()
+        quiz_questions = [iter_quizz_process(editor_initial, mode, hide_percent, chosen_words,
+                                             distractors, seed, word_table)]
+
+    return stream_page("quizz.html",
+                       mode=mode,
+                       hide_percent=hide_percent,
+                       editor_initial=editor_initial,
+                       quiz_questions=quiz_questions,
+                       chosen_words=chosen_words,
+                       distractors=distractors,
+                       seed_input=seed_input,
+                       seed=seed,
+                       mc_output=mc_output,
+                       word_table=word_table)
 
 @quizz_bp.route('/quizz', methods=['GET', 'POST'])
 def quizz():
@@ -126,64 +193,37 @@ def quizz():
       - Выбирает mode и hide_percent,
       - Нажимает Create Quiz => обрабатываем (quizz_process) или импортируем квиз из Excel,
       - Показываем результат.
+    Excel разбирается в фоне: POST -> ?job=<id> -> страница ожидания -> результат.
     """
-    mode = "multiple_choice"
-    hide_percent = 30
-    editor_initial = ""
-    quiz_questions = []
-    chosen_words = ""
-
     if request.method == 'POST':
         # Проверяем: загружен ли Excel?
         if 'excel_file' in request.files and request.files['excel_file'].filename:
             file = request.files['excel_file']
-            from werkzeug.utils import secure_filename
-            filename = secure_filename(file.filename)
-            excel_path = os.path.join('static', 'uploads', filename)
-            os.makedirs(os.path.join('static', 'uploads'), exist_ok=True)
-            file.save(excel_path)
-
-            df = pd.read_excel(excel_path)
-
-            for idx, row in df.iterrows():
-                question = row['Question']
-                correct = row['Correct']
-                wrong1 = row['Option1']
-                wrong2 = row['Option2']
-                wrong3 = row['Option3']
-                options = [correct, wrong1, wrong2, wrong3]
-                random.shuffle(options)
-                question_html = f'<div class="quiz-question"><p>{question}</p>'
-                for opt in options:
-                    question_html += (
-                        f'<button class="mc-option-btn" data-correct="{escape(correct)}">{opt}</button>'
-                    )
-                question_html += '</div>'
-                quiz_questions.append(question_html)
-
-            os.remove(excel_path)
-
-        else:
-            # Обработка HTML из редактора
-            editor_initial = request.form.get("input_text", "")
-            mode = request.form.get("mode", "multiple_choice")
-            hide_percent = request.form.get("hide_percent", "30")
-            if hide_percent == "chosen":
-                chosen_words = request.form.get("chosen_words", "")
-            else:
-                try:
-                    hide_percent = int(hide_percent)
-                except:
-                    hide_percent = 30
-            out = quizz_process(editor_initial, mode, hide_percent, chosen_words)
-            quiz_questions = [out]
-
-    return render_template("quizz.html",
-                           mode=mode,
-                           hide_percent=hide_percent,
-                           editor_initial=editor_initial,
-                           quiz_questions=quiz_questions,
-                           chosen_words=chosen_words)
+            upload = None
+            try:
+                upload = read_upload(file)
+                job = submit_job(excel_to_questions, upload)
+            except UploadTooLarge as e:
+                return str(e), 413
+            except JobQueueFull:
+                upload.discard()
+                return "Server is busy, please try again in a minute.", 503
+            return redirect(url_for('quizz.quizz', job=job.id))
+
+        # Обработка HTML из редактора
+        return render_quizz_page(request.form.get("input_text", ""), request.form)
+
+    if request.args.get("job"):
+        job = get_user_job(request.args["job"])
+        if job is None:
+            return "This import has expired. Please upload the Excel file again.", 404
+        if job.state in PENDING_STATES:
+            return render_job_wait(job, "Importing Excel...")
+        if job.state != DONE:
+            return f"Error importing quiz table: {escape(job.error)}", 400
+        return render_quizz_page(quiz_questions=job.result)
+
+    return render_quizz_page()
 
 @quizz_bp.route('/save_original', methods=['POST'])
 def save_original():
@@ -201,7 +241,9 @@ def save_original():
     os.makedirs(root, exist_ok=True)
 
     path = os.path.join(root, filename)
-    with open(path, 'w', encoding='utf-8') as f:
-        f.write(original_html)
+    with library_index(root) as idx, idx.change(filename):
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(original_html)
+    index_documents(root, filename)
 
     return redirect(url_for("library_bp.browse_library"))
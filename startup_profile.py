@@ -0,0 +1,107 @@
+import os
+import re
+import sys
+import json
+import subprocess
+
+# Профиль холодного старта: приложение загружается в свежем процессе
+# (python -X importtime), поэтому уже импортированные в текущем процессе
+# модули не искажают результат.
+APP_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "import random.py")
+
+IMPORTTIME_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|( *)(\S.*)$")
+
+_CHILD_CODE = r"""
+import sys, json, time, importlib.util
+t0 = time.perf_counter()
+spec = importlib.util.spec_from_file_location("startup_app", sys.argv[1])
+module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(module)
+result = {"startup": time.perf_counter() - t0, "lazy": {}, "lazy_costs": {}}
+try:
+    import lazy_imports
+except ImportError:  # версия приложения без ленивой загрузки
+    lazy_imports = None
+if lazy_imports is not None:
+    if sys.argv[2] == "1":
+        t0 = time.perf_counter()
+        lazy_imports.preload()
+        result["preload"] = time.perf_counter() - t0
+    result["lazy"] = lazy_imports.registered_modules()
+    result["lazy_costs"] = lazy_imports.import_costs()
+sys.stdout.write(json.dumps(result))
+"""
+
+
+def parse_importtime(stderr):
+    """
+    Строки `-X importtime` -> [(модуль, self_us, cumulative_us, depth)].
+    depth 0 — модули, импортированные непосредственно при загрузке приложения
+    (их cumulative включает всё, что они потянули за собой).
+    """
+    rows = []
+    for line in stderr.splitlines():
+        m = IMPORTTIME_RE.match(line)
+        if m:
+            self_us, cum_us, indent, name = m.groups()
+            rows.append((name, int(self_us), int(cum_us), len(indent) // 2))
+    return rows
+
+
+def profile_startup(app_file=APP_FILE, preload=False, python=None, importtime=True):
+    """
+    Загружаем приложение в отдельном процессе и возвращаем
+    {"startup": сек, "modules": [(модуль, self_us, cumulative_us, depth)],
+     "lazy": {модуль: загружен ли}, "lazy_costs": {модуль: сек}}.
+    preload=True дополнительно импортирует все ленивые модули (как было
+    до ленивой загрузки) — их время попадает в "preload" и "lazy_costs".
+    importtime=False — без -X importtime (он сам замедляет импорт;
+    для замеров времени), "modules" тогда пустой.
+    """
+    app_dir = os.path.dirname(os.path.abspath(app_file))
+    cmd = [python or sys.executable]
+    if importtime:
+        cmd += ["-X", "importtime"]
+    cmd += ["-c", _CHILD_CODE, os.path.abspath(app_file), "1" if preload else "0"]
+    proc = subprocess.run(cmd, cwd=app_dir, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip()
+                           else f"exit code {proc.returncode}")
+    result = json.loads(proc.stdout)
+    result["modules"] = parse_importtime(proc.stderr)
+    return result
+
+
+def top_level_costs(modules):
+    """
+    Время импорта по пакетам верхнего уровня: {"flask": cumulative_us, ...}.
+    Считаем только depth 0, чтобы вложенные импорты не учитывались дважды.
+    """
+    costs = {}
+    for name, _, cum_us, depth in modules:
+        if depth == 0:
+            package = name.split(".", 1)[0]
+            costs[package] = costs.get(package, 0) + cum_us
+    return sorted(costs.items(), key=lambda kv: kv[1], reverse=True)
+
+
+def format_profile(result, top=25):
+    """Текстовый отчёт: самые дорогие пакеты верхнего уровня и ленивые модули."""
+    lines = [f"Cold start: {result['startup'] * 1000:.0f} ms"]
+    if "preload" in result:
+        lines.append(f"Preloading lazy modules: {result['preload'] * 1000:.0f} ms")
+    lines.append("")
+    lines.append(f"{'import, ms':>11}  module")
+    costs = top_level_costs(result["modules"])
+    for name, cum_us in costs[:top]:
+        lines.append(f"{cum_us / 1000:>11.1f}  {name}")
+    if len(costs) > top:
+        rest = sum(us for _, us in costs[top:])
+        lines.append(f"{rest / 1000:>11.1f}  ({len(costs) - top} more)")
+    lines.append("")
+    lines.append("Lazy modules (imported on first use):")
+    for name, loaded in sorted(result["lazy"].items()):
+        cost = result["lazy_costs"].get(name)
+        state = f"{cost * 1000:.0f} ms" if cost is not None else ("loaded" if loaded else "not loaded")
+        lines.append(f"  {name:<12} {state}")
+    return "\n".join(lines)
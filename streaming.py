@@ -0,0 +1,106 @@
+import os
+import zlib
+from flask import current_app, request, stream_template
+
+# Потоковая отдача страниц квизов и сжатие ответов.
+#
+# stream_page рендерит шаблон по мере отдачи: генераторы в контексте
+# (quizz.iter_quizz_process, quiz_engine.iter_hide_letters_html, ...)
+# выполняются, когда шаблон до них доходит, и готовый HTML целиком в памяти
+# не собирается. compress_response (after_request приложения) сжимает gzip/
+# deflate текстовые ответы не меньше COMPRESS_MIN_BYTES и потоковые ответы.
+COMPRESS_MIN_BYTES = int(os.environ.get("COMPRESS_MIN_BYTES", "2048"))
+COMPRESS_LEVEL = int(os.environ.get("COMPRESS_LEVEL", "6"))
+# Куски потокового ответа склеиваются до этого размера (Jinja отдаёт мелкие строки)
+STREAM_CHUNK_BYTES = 64 * 1024
+
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/javascript", "image/svg+xml")
+# wbits для zlib.compressobj: gzip-обёртка / zlib-поток (так понимают "deflate" браузеры)
+_WBITS = {"gzip": 16 + zlib.MAX_WBITS, "deflate": zlib.MAX_WBITS}
+
+
+def stream_page(template_name, **context):
+    """render_template, но ответ отдаётся кусками по мере рендера шаблона."""
+    return current_app.response_class(stream_template(template_name, **context), mimetype="text/html")
+
+
+def accepted_encoding():
+    """gzip или deflate из Accept-Encoding запроса (gzip при равенстве), иначе None."""
+    gzip_q = request.accept_encodings.quality("gzip")
+    deflate_q = request.accept_encodings.quality("deflate")
+    if gzip_q and gzip_q >= deflate_q:
+        return "gzip"
+    if deflate_q:
+        return "deflate"
+    return None
+
+
+def _coalesce(chunks, first=COMPRESS_MIN_BYTES, size=STREAM_CHUNK_BYTES):
+    """
+    Склеиваем мелкие куски bytes: первый — как только набралось first байт
+    (начало страницы уходит сразу, время до первого байта не зависит от
+    размера документа), дальше — куски около size байт.
+    """
+    buf, n, limit = [], 0, first
+    for chunk in chunks:
+        buf.append(chunk)
+        n += len(chunk)
+        if n >= limit:
+            yield b"".join(buf)
+            buf, n, limit = [], 0, size
+    if buf:
+        yield b"".join(buf)
+
+
+def _compress_stream(chunks, encoding):
+    """
+    Сжимаем поток по кускам. После каждого куска Z_SYNC_FLUSH: браузер
+    может разжать и показать уже полученную часть страницы.
+    """
+    comp = zlib.compressobj(COMPRESS_LEVEL, zlib.DEFLATED, _WBITS[encoding])
+    for chunk in chunks:
+        out = comp.compress(chunk) + comp.flush(zlib.Z_SYNC_FLUSH)
+        if out:
+            yield out
+    yield comp.flush()
+
+
+def _stream_body(chunks, source, encoding):
+    """Тело потокового ответа: склеенные и (если encoding) сжатые куски."""
+    try:
+        chunks = _coalesce(chunks)
+        yield from (_compress_stream(chunks, encoding) if encoding else chunks)
+    finally:
+        if hasattr(source, "close"):
+            source.close()
+
+
+def compress_response(response):
+    """
+    after_request: сжатие gzip/deflate по Accept-Encoding. Не текстовые
+    ответы, не 200 и файлы (send_file) не трогаем; обычные ответы сжимаются,
+    если они не меньше COMPRESS_MIN_BYTES. Потоковый ответ сжимается на лету
+    всегда: размер заранее неизвестен, а прочитать начало здесь нельзя —
+    генератор stream_with_context сам входит в контекст запроса при отдаче
+    (страницы stream_page и так больше порога — один шаблон весит десятки КБ).
+    """
+    if (request.method == "HEAD" or response.status_code != 200 or response.direct_passthrough
+            or "Content-Encoding" in response.headers
+            or not (response.mimetype or "").startswith(COMPRESSIBLE_TYPES)):
+        return response
+    response.vary.add("Accept-Encoding")
+    encoding = accepted_encoding()
+
+    if not response.is_streamed:
+        data = response.get_data()
+        if encoding and len(data) >= COMPRESS_MIN_BYTES:
+            comp = zlib.compressobj(COMPRESS_LEVEL, zlib.DEFLATED, _WBITS[encoding])
+            response.set_data(comp.compress(data) + comp.flush())
+            response.headers["Content-Encoding"] = encoding
+        return response
+
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+        response.headers.pop("Content-Length", None)
+    response.response = _stream_body(response.iter_encoded(), response.response, encoding)
+    return response
@@ -0,0 +1,243 @@
+import zipfile
+import xml.etree.ElementTree as ET
+
+# Учебные форматы, общие для matching и mc_quiz_word:
+#
+#   matching — строки "A ↔ B" (пара), любая другая строка — заголовок блока;
+#   multiple choice — строка вопроса, за ней варианты "✓ - верный" / "✗ - неверный".
+#
+# Источник — текст или .docx — читается построчно генератором, парсеры тоже
+# генераторы, так что банк вопросов из сотен тысяч строк не держится в памяти
+# целиком (в памяти только текущий блок/вопрос и то, что собирает вызывающий).
+PAIR_SEP = "↔"
+CORRECT_MARK = "✓"
+WRONG_MARK = "✗"
+OPTION_SEP = "-"
+# Сколько замечаний перечислять в сообщении
+MAX_REPORTED_ISSUES = 20
+
+W_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_W_BODY, _W_P, _W_T = W_NS + "body", W_NS + "p", W_NS + "t"
+# Элементы run, которые python-docx превращает в символы paragraph.text
+_W_CHARS = {W_NS + "tab": "\t", W_NS + "ptab": "\t", W_NS + "br": "\n",
+            W_NS + "cr": "\n", W_NS + "noBreakHyphen": "-"}
+
+
+class StudyFormatError(ValueError):
+    """Файл не читается как .docx."""
+
+
+class ParseIssues:
+    """
+    Замечания парсера (пропущенные строки) с номерами строк. Хранятся только
+    первые MAX_REPORTED_ISSUES, остальные лишь считаются.
+    """
+
+    def __init__(self, limit=MAX_REPORTED_ISSUES):
+        self.limit = limit
+        self.items = []
+        self.count = 0
+
+    def add(self, line, message):
+        self.count += 1
+        if len(self.items) < self.limit:
+            self.items.append(f"Line {line}: {message}")
+
+    def __bool__(self):
+        return self.count > 0
+
+    def __str__(self):
+        more = f" (and {self.count - len(self.items)} more)" if self.count > len(self.items) else ""
+        return "; ".join(self.items) + more
+
+
+class Pair:
+    def __init__(self, left, right, line):
+        self.left = left
+        self.right = right
+        self.line = line
+
+
+class Block:
+    """Блок matching: заголовок (может быть None у первого блока) и пары."""
+
+    def __init__(self, title, line):
+        self.title = title
+        self.line = line
+        self.pairs = []
+
+
+class Option:
+    def __init__(self, text, correct, line):
+        self.text = text
+        self.correct = correct
+        self.line = line
+
+
+class Question:
+    """Вопрос multiple choice с вариантами."""
+
+    def __init__(self, text, line):
+        self.text = text
+        self.line = line
+        self.options = []
+
+    @property
+    def correct_option(self):
+        """Верный вариант (если отмечено несколько — последний), иначе None."""
+        for opt in reversed(self.options):
+            if opt.correct:
+                return opt
+        return None
+
+    @property
+    def answer(self):
+        """Текст верного варианта или None."""
+        opt = self.correct_option
+        return opt.text if opt is not None else None
+
+
+# ---------- источники строк: (номер строки, текст) для непустых строк ----------
+
+def _split_lines(text):
+    """Строки str по одной, без копии всего текста (в отличие от splitlines/StringIO)."""
+    start, size = 0, len(text)
+    while start < size:
+        end = text.find("\n", start)
+        if end < 0:
+            end = size
+        yield text[start:end]
+        start = end + 1
+
+
+def iter_text_lines(text):
+    """Строки текста (str или текстовый файловый объект), без пробелов по краям."""
+    lines = _split_lines(text) if isinstance(text, str) else text
+    for n, line in enumerate(lines, start=1):
+        line = line.strip()
+        if line:
+            yield n, line
+
+
+def iter_docx_paragraphs(source):
+    """
+    Абзацы .docx (путь или файловый объект) — номер абзаца и текст, как
+    python-docx Document.paragraphs, но потоком: word/document.xml читается
+    iterparse, обработанные абзацы сразу удаляются из дерева.
+    """
+    try:
+        zf = zipfile.ZipFile(source)
+        xml = zf.open("word/document.xml")
+    except (zipfile.BadZipFile, KeyError) as e:
+        raise StudyFormatError("Not a valid .docx file") from e
+    with zf, xml:
+        stack = []
+        body = None
+        parts = None  # текст текущего абзаца верхнего уровня
+        n = 0
+        try:
+            for event, el in ET.iterparse(xml, events=("start", "end")):
+                if event == "start":
+                    if el.tag == _W_BODY:
+                        body = el
+                    elif el.tag == _W_P and stack and stack[-1] == _W_BODY:
+                        parts = []
+                    stack.append(el.tag)
+                    continue
+                stack.pop()
+                if parts is not None and stack.count(_W_P) == 1:
+                    # только собственный текст абзаца (без надписей внутри)
+                    if el.tag == _W_T:
+                        parts.append(el.text or "")
+                    elif el.tag in _W_CHARS:
+                        parts.append(_W_CHARS[el.tag])
+                if body is not None and stack and stack[-1] == _W_BODY:
+                    if el.tag == _W_P:
+                        n += 1
+                        text = "".join(parts).strip()
+                        parts = None
+                        if text:
+                            yield n, text
+                    body.clear()
+        except ET.ParseError as e:
+            raise StudyFormatError("Not a valid .docx file") from e
+
+
+# ---------- парсеры ----------
+
+def iter_blocks(lines, issues=None):
+    """
+    (номер, строка) -> Block по одному. Строка с "↔" — пара в текущий блок,
+    иначе — заголовок нового блока. Пары с пустой стороной пропускаются
+    (и попадают в issues, если передан ParseIssues).
+    """
+    block = None
+    for n, line in lines:
+        if PAIR_SEP in line:
+            left, right = line.split(PAIR_SEP, 1)
+            left, right = left.strip(), right.strip()
+            if not left or not right:
+                if issues is not None:
+                    issues.add(n, f"empty side in \"{PAIR_SEP}\" pair")
+                continue
+            if block is None:
+                block = Block(None, n)
+            block.pairs.append(Pair(left, right, n))
+        else:
+            if block is not None:
+                yield block
+            block = Block(line, n)
+    if block is not None:
+        yield block
+
+
+def parse_option(line):
+    """"✓ - текст" -> (True, "текст"); None, если строка не вариант ответа."""
+    if not line.startswith((CORRECT_MARK, WRONG_MARK)):
+        return None
+    marker, sep, text = line.partition(OPTION_SEP)
+    if not sep:
+        return False, None
+    return marker.strip().startswith(CORRECT_MARK), text.strip()
+
+
+def iter_questions(lines, issues=None):
+    """
+    (номер, строка) -> Question по одному. Строка без ✓/✗ начинает вопрос,
+    строки "✓ - ..." / "✗ - ..." после неё — его варианты. Отдаются только
+    вопросы с вариантами и верным ответом; строки без вариантов (заголовки,
+    пояснения) пропускаются молча, остальные проблемы — в issues.
+    """
+    question = None
+    for n, line in lines:
+        option = parse_option(line)
+        if option is None:
+            if question is not None:
+                if _complete(question, issues):
+                    yield question
+            question = Question(line, n)
+            continue
+        correct, text = option
+        if text is None:
+            if issues is not None:
+                issues.add(n, f"option without \"{OPTION_SEP}\" after the mark")
+        elif not text:
+            if issues is not None:
+                issues.add(n, "empty option")
+        elif question is None:
+            if issues is not None:
+                issues.add(n, "option before any question")
+        else:
+            question.options.append(Option(text, correct, n))
+    if question is not None and _complete(question, issues):
+        yield question
+
+
+def _complete(question, issues):
+    if not question.options:
+        return False
+    if question.answer is None:
+        if issues is not None:
+            issues.add(question.line, f"question has no {CORRECT_MARK} option")
+        return False
+    return True
@@ -0,0 +1,30 @@
+"""Общие настройки тестов: модули проекта импортируются из корня репозитория."""
+import os
+import sys
+import importlib.util
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+@pytest.fixture(scope="session")
+def app():
+    """Приложение из "import random.py" (имя с пробелом — грузим через importlib)."""
+    spec = importlib.util.spec_from_file_location("main_app", os.path.join(ROOT, "import random.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    module.app.config["TESTING"] = True
+    return module.app
+
+
+@pytest.fixture
+def calendar_store(tmp_path, monkeypatch):
+    """Календарь приложения во временной SQLite-базе."""
+    import mycalendar
+    monkeypatch.setattr(mycalendar, "CALENDAR_BACKEND", "sqlite")
+    monkeypatch.setattr(mycalendar, "CALENDAR_DB", str(tmp_path / "calendar.db"))
+    monkeypatch.setattr(mycalendar, "EVENTS_FILE", str(tmp_path / "calendar_events.json"))
+    monkeypatch.setattr(mycalendar, "_store", None)
+    return mycalendar.get_store()
@@ -0,0 +1,27 @@
+from test_calendar_store import new_deadline
+
+
+def test_changes_rejects_bad_since(app, calendar_store):
+    client = app.test_client()
+    assert client.get("/calendar/changes?since=abc").status_code == 400
+    assert client.get("/calendar/changes?since=0").status_code == 200
+
+
+def test_changes_not_modified_after_noop_mark(app, calendar_store):
+    client = app.test_client()
+    did = calendar_store.add(new_deadline(1))
+    first = client.get("/calendar/changes?since=0")
+    client.post("/calendar/mark_subtask", json={"deadline_id": did, "subtask_index": 5, "done": True})
+    client.post("/calendar/delete_subtask", json={"deadline_id": did, "subtask_id": 999})
+    again = client.get("/calendar/changes?since=0", headers={"If-None-Match": first.headers["ETag"]})
+    assert again.status_code == 304
+
+
+def test_batch_rejects_malformed_body(app, calendar_store):
+    client = app.test_client()
+    bad = [dict(data="{not json", content_type="application/json"), dict(json=[1, 2]),
+           dict(json={"ops": {"op": "mark_subtask"}}), dict(json={"since": "1", "ops": []})]
+    for kwargs in bad:
+        resp = client.post("/calendar/batch", **kwargs)
+        assert resp.status_code == 400 and "error" in resp.get_json()
+    assert client.post("/calendar/batch", json={"ops": []}).status_code == 200
@@ -0,0 +1,89 @@
+import threading
+
+import pytest
+
+from calendar_store import SqliteCalendarStore, JsonCalendarStore, find_subtask
+
+THREADS = 16
+ROUNDS = 20
+
+
+def new_deadline(n_subtasks=0, title="t"):
+    return {"isCategory": False, "date": "2030-01-01", "title": title, "color": "#000",
+            "category_id": 0, "subtasks": [{"text": f"s{i}", "done": False} for i in range(n_subtasks)]}
+
+
+@pytest.fixture(params=["sqlite", "json"])
+def store(request, tmp_path):
+    if request.param == "sqlite":
+        return SqliteCalendarStore(str(tmp_path / "calendar.db"))
+    return JsonCalendarStore(str(tmp_path / "calendar_events.json"))
+
+
+def run_threads(target):
+    threads = [threading.Thread(target=target, args=(i,)) for i in range(THREADS)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+
+def test_concurrent_mark_subtask_loses_no_updates(store):
+    did = store.add(new_deadline(THREADS))
+    ids = [st["id"] for st in store.get(did)["subtasks"]]
+    errors = []
+
+    def worker(i):
+        try:
+            for r in range(ROUNDS):
+                done = r % 2 == 0 or r == ROUNDS - 1
+
+                def mark(d):
+                    find_subtask(d, ids[i])["done"] = done
+                store.update(did, mark)
+        except Exception as e:
+            errors.append(e)
+
+    run_threads(worker)
+    assert not errors
+    assert [st["done"] for st in store.get(did)["subtasks"]] == [True] * THREADS
+
+
+def test_concurrent_add_gives_unique_ids(store):
+    added = []
+
+    def worker(i):
+        for r in range(ROUNDS):
+            added.append(store.add(new_deadline(title=f"t{i}-{r}")))
+
+    run_threads(worker)
+    ids = [obj["id"] for obj in store.all()]
+    assert len(ids) == len(set(ids)) == THREADS * ROUNDS
+    assert sorted(added) == sorted(ids)
+
+
+def test_noop_update_keeps_version(store):
+    did = store.add(new_deadline(2))
+    sid = store.get(did)["subtasks"][0]["id"]
+    version = store.version()
+
+    def mark_missing(d):
+        st = find_subtask(d, 999, -1)
+        if st:
+            st["done"] = True
+    assert store.update(did, mark_missing) is not None
+    assert store.update(did, lambda d: None) is not None
+    assert store.version() == version
+
+    def mark(d):
+        find_subtask(d, sid)["done"] = True
+    store.update(did, mark)
+    assert store.version() != version
+
+
+def test_noop_update_is_not_in_changes(tmp_path):
+    store = SqliteCalendarStore(str(tmp_path / "calendar.db"))
+    did = store.add(new_deadline(1))
+    version = store.version()
+    store.update(did, lambda d: None)
+    assert store.changes_since(version) == {"version": version, "changed": [], "deleted": [], "full": False}
@@ -0,0 +1,141 @@
+import io
+import os
+import time
+
+import pytest
+
+import jobs
+from jobs import JobManager, DONE, CANCELLED, FAILED, PENDING_STATES
+
+
+@pytest.fixture
+def managers(tmp_path):
+    """Два JobManager с общей таблицей — как два процесса WSGI."""
+    db = str(tmp_path / "jobs.db")
+    pair = [JobManager(workers=1, db_path=db), JobManager(workers=1, db_path=db)]
+    yield pair
+    for m in pair:
+        m.shutdown()
+
+
+def wait_done(manager, job_id, timeout=30):
+    end = time.monotonic() + timeout
+    while time.monotonic() < end:
+        job = manager.get(job_id)
+        if job.state not in PENDING_STATES:
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"job {job_id} still {job.state}")
+
+
+def test_result_visible_from_other_process(managers):
+    a, b = managers
+    job = a.submit(sum, [1, 2, 3], owner="alice")
+    snapshot = b.get(job.id)
+    assert snapshot.owner == "alice" and snapshot.state in PENDING_STATES
+    done = wait_done(b, job.id)
+    assert done.state == DONE and done.result == 6
+    assert done.to_dict(with_result=True)["result"] == 6
+    assert b.get("no-such-job") is None
+
+
+def test_failure_visible_from_other_process(managers):
+    a, b = managers
+    job = a.submit(int, "x")
+    done = wait_done(b, job.id)
+    assert done.state == FAILED and "ValueError" in done.error
+
+
+def test_cancel_from_other_process(managers):
+    a, b = managers
+    running = a.submit(time.sleep, 30)
+    queued = a.submit(time.sleep, 30)
+    assert b.cancel(queued.id) and b.cancel(running.id)
+    assert wait_done(b, running.id, timeout=10).state == CANCELLED
+    assert wait_done(b, queued.id, timeout=10).state == CANCELLED
+    assert not b.cancel(running.id)
+
+
+def test_job_of_dead_process_is_reported_lost(tmp_path, monkeypatch):
+    db = str(tmp_path / "jobs.db")
+    a = JobManager(workers=1, db_path=db)
+    job = a.submit(time.sleep, 30)
+    a.shutdown()  # процесс "упал": таблица больше не обновляется
+    monkeypatch.setattr(jobs, "JOB_LOST_AFTER", 0.2)
+    time.sleep(0.5)
+    lost = JobManager(db_path=db).get(job.id)
+    assert lost.state == FAILED and "lost" in lost.error
+
+
+def test_status_endpoint_with_non_json_result(app, managers, monkeypatch):
+    a, b = managers
+    monkeypatch.setattr(jobs, "_manager", b)
+    job = a.submit(set, [1, 2], owner="_guest")
+    wait_done(b, job.id)
+    client = app.test_client()
+    data = client.get(f"/jobs/{job.id}").get_json()
+    assert data["state"] == DONE and "result" not in data
+    text_job = a.submit(str, 5, owner="_guest")
+    wait_done(b, text_job.id)
+    assert client.get(f"/jobs/{text_job.id}").get_json()["result"] == "5"
+    other = a.submit(str, 5, owner="someone")
+    assert client.get(f"/jobs/{other.id}").status_code == 404
+
+
+def hold(upload, seconds):
+    """Задача, которая держит загрузку (как разбор большого файла)."""
+    try:
+        time.sleep(seconds)
+        return upload.size
+    finally:
+        upload.discard()
+
+
+def spooled_upload(tmp_path):
+    from werkzeug.datastructures import FileStorage
+    from uploads import read_upload
+    f = FileStorage(io.BytesIO(b"x" * 4096), filename="big.xlsx")
+    upload = read_upload(f, spool_bytes=1024)
+    assert upload.path is not None and os.path.exists(upload.path)
+    return upload
+
+
+@pytest.mark.parametrize("how", ["cancel queued", "cancel running", "timeout", "done"])
+def test_upload_removed_however_job_ends(tmp_path, how):
+    manager = JobManager(workers=1, timeout=60, db_path=str(tmp_path / "jobs.db"))
+    try:
+        upload = spooled_upload(tmp_path)
+        path = upload.path
+        if how == "cancel queued":
+            manager.submit(time.sleep, 30)
+            job = manager.submit(hold, upload, 30)
+            manager.cancel(job.id)
+        elif how == "cancel running":
+            job = manager.submit(hold, upload, 30)
+            time.sleep(0.5)
+            manager.cancel(job.id)
+        elif how == "timeout":
+            job = manager.submit(hold, upload, 30, timeout=0.5)
+        else:
+            job = manager.submit(hold, upload, 0)
+        wait_done(manager, job.id, timeout=20)
+        assert not os.path.exists(path)
+    finally:
+        manager.shutdown()
+
+
+def test_submit_not_blocked_while_worker_is_replaced(tmp_path, monkeypatch):
+    import signal
+    monkeypatch.setattr(jobs, "JOB_KILL_WAIT", 2.0)
+    manager = JobManager(workers=1, db_path=str(tmp_path / "jobs.db"))
+    try:
+        # воркер не выходит по terminate: снятие ждёт JOB_KILL_WAIT, потом kill
+        wait_done(manager, manager.submit(signal.signal, signal.SIGTERM, signal.SIG_IGN).id)
+        stuck = manager.submit(time.sleep, 30, timeout=0.2)
+        assert wait_done(manager, stuck.id).state == jobs.TIMEOUT
+        t0 = time.monotonic()
+        job = manager.submit(sum, [1, 2])
+        assert time.monotonic() - t0 < 0.5
+        assert wait_done(manager, job.id).result == 3
+    finally:
+        manager.shutdown()
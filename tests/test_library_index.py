@@ -0,0 +1,145 @@
+import os
+from pathlib import Path
+
+import pytest
+
+from library_cache import is_hidden_entry
+from library_index import LibraryIndex, norm_rel
+
+GUEST_ROOT = os.path.join("static", "library", "_guest")
+
+
+def legacy_gather_all_folders(base_dir, rel=""):
+    """Исходный обход (listdir + isdir на каждую запись) — эталон для дерева папок."""
+    results = []
+    folder_path = os.path.join(base_dir, rel)
+    if os.path.isdir(folder_path):
+        for entry in os.listdir(folder_path):
+            if is_hidden_entry(entry):
+                continue
+            full = os.path.join(folder_path, entry)
+            if os.path.isdir(full):
+                sub_rel = os.path.join(rel, entry).replace("\\", "/")
+                results.append(sub_rel if sub_rel else ".")
+                results.extend(legacy_gather_all_folders(base_dir, sub_rel))
+    return results
+
+
+def make_tree(root, n_folders, files_per_folder=3):
+    """Дерево примерно из n_folders папок: по 10 подпапок на уровень."""
+    made, queue = 0, [""]
+    while made < n_folders:
+        parent = queue.pop(0)
+        for i in range(10):
+            if made >= n_folders:
+                break
+            rel = os.path.join(parent, f"dir{made}")
+            os.makedirs(os.path.join(root, rel))
+            for j in range(files_per_folder):
+                with open(os.path.join(root, rel, f"f{j}.txt"), "w") as f:
+                    f.write("x")
+            queue.append(rel)
+            made += 1
+
+
+def write(path, size=1, mtime=None):
+    path.write_bytes(b"x" * size)
+    if mtime is not None:
+        os.utime(path, ns=(mtime, mtime))
+
+
+@pytest.fixture
+def index(tmp_path):
+    root = tmp_path / "lib"
+    root.mkdir()
+    (root / "b_dir").mkdir()
+    (root / "a_dir").mkdir()
+    for i, (name, size) in enumerate([("c.txt", 30), ("a.pdf", 10), ("B.docx", 20), ("d.txt", 10)]):
+        write(root / name, size, mtime=(i + 1) * 10**9)
+    write(root / ".hidden")
+    idx = LibraryIndex(str(root))
+    yield idx
+    idx.close()
+
+
+def names(rows):
+    return [r["name"] for r in rows]
+
+
+@pytest.mark.parametrize("rel, expected", [("./a//b/", "a/b"), (".", ""), ("", ""), (None, ""), ("a\\b", "a/b")])
+def test_norm_rel(rel, expected):
+    assert norm_rel(rel) == expected
+
+
+@pytest.mark.parametrize("sort, order, expected", [
+    ("name", "asc", ["a_dir", "b_dir", "B.docx", "a.pdf", "c.txt", "d.txt"]),
+    ("name", "desc", ["b_dir", "a_dir", "d.txt", "c.txt", "a.pdf", "B.docx"]),
+    ("size", "asc", ["a_dir", "b_dir", "a.pdf", "d.txt", "B.docx", "c.txt"]),
+    ("date", "desc", ["d.txt", "B.docx", "a.pdf", "c.txt"]),
+])
+def test_listing_folders_first_and_sorted(index, sort, order, expected):
+    rows, cursor = index.listing("", sort, order)
+    files = [n for n, r in zip(names(rows), rows) if not r["is_dir"]]
+    assert cursor is None and ".hidden" not in names(rows)
+    assert (files if sort == "date" else names(rows)) == expected
+
+
+@pytest.mark.parametrize("sort", ["name", "size", "date"])
+@pytest.mark.parametrize("order", ["asc", "desc"])
+def test_keyset_pages_cover_listing(index, sort, order):
+    full, _ = index.listing("", sort, order)
+    pages, cursor = [], None
+    while True:
+        rows, cursor = index.listing("", sort, order, limit=4 if pages else 1, cursor=cursor)
+        pages.append(names(rows))
+        if cursor is None:
+            break
+    assert [n for page in pages for n in page] == names(full)
+    # испорченный курсор — первая страница
+    assert names(index.listing("", sort, order, limit=2, cursor="junk")[0]) == names(full)[:2]
+
+
+def test_outside_change_rescanned(index):
+    index.listing("")
+    write(Path(index.root, "new.txt"))
+    os.remove(os.path.join(index.root, "c.txt"))
+    listed = names(index.listing("")[0])
+    assert "new.txt" in listed and "c.txt" not in listed
+
+
+def test_change_updates_rows(index):
+    index.listing("")
+    index.listing("b_dir")
+    with index.change("a.pdf", "b_dir/moved.pdf"):
+        os.rename(os.path.join(index.root, "a.pdf"), os.path.join(index.root, "b_dir", "moved.pdf"))
+    assert "a.pdf" not in names(index.listing("")[0])
+    rows = index.listing("b_dir")[0]
+    assert names(rows) == ["moved.pdf"] and rows[0]["size"] == 10 and rows[0]["ext"] == ".pdf"
+    # родитель синхронизирован после change — повторного сканирования нет
+    assert index._is_synced("") and index._is_synced("b_dir")
+
+
+@pytest.fixture
+def library(app, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs(GUEST_ROOT)
+    return GUEST_ROOT
+
+
+def test_folder_tree_incremental_matches_full_walk(app, library):
+    client = app.test_client()
+    make_tree(library, 50)
+    first = client.get("/library/all_folders_json")  # строим дерево
+    client.post("/library/dir1/create_folder", data={"folder_name": "new one"})
+    client.post("/library/move_item", data={"old_path": "dir2", "new_path": "dir3/moved"})
+    client.post("/library/move_item", data={"old_path": "dir4", "new_path": "x/y/dir4"})
+    client.post("/library/rename_item", data={"old_path": "dir5", "new_name": "renamed"})
+    client.post("/library/dir6")  # delete
+    os.makedirs(os.path.join(library, "outside", "app"))  # изменение в обход приложения
+    client.get("/library/")  # просмотр корня пересканирует его
+    resp = client.get("/library/all_folders_json")
+    expected = ["."] + legacy_gather_all_folders(library)
+    assert sorted(resp.get_json()) == sorted(expected)
+    assert resp.headers["ETag"] != first.headers["ETag"]
+    assert client.get("/library/all_folders_json",
+                      headers={"If-None-Match": resp.headers["ETag"]}).status_code == 304
@@ -0,0 +1,88 @@
+import os
+import re
+import time
+
+import docx
+import pytest
+
+import jobs
+from jobs import JobManager, PENDING_STATES
+
+GUEST_ROOT = os.path.join("static", "library", "_guest")
+
+
+@pytest.fixture
+def library(app, tmp_path, monkeypatch):
+    """Библиотека гостя и очередь задач во временной папке."""
+    monkeypatch.chdir(tmp_path)
+    os.makedirs(GUEST_ROOT)
+    manager = JobManager(workers=1, db_path=str(tmp_path / "jobs.db"))
+    monkeypatch.setattr(jobs, "_manager", manager)
+    yield tmp_path / GUEST_ROOT
+    manager.shutdown()
+
+
+def make_docx(path):
+    doc = docx.Document()
+    for line in ["What is 2+2?", "✓ - four", "✗ - five", "France ↔ Paris", "Italy ↔ Rome"]:
+        doc.add_paragraph(line)
+    doc.save(path)
+
+
+def wait_page_job(resp):
+    assert resp.status_code == 202
+    job_id = re.search(r'const jobId = "(\w+)"', resp.data.decode()).group(1)
+    end = time.monotonic() + 30
+    while jobs.get_jobs().get(job_id).state in PENDING_STATES:
+        assert time.monotonic() < end
+        time.sleep(0.05)
+    return job_id
+
+
+def test_text_file_quiz(app, library):
+    (library / "notes.txt").write_text("Q1\n✓ - yes\n✗ - no\nalpha ↔ beta\n", encoding="utf-8")
+    client = app.test_client()
+    assert '"yes"' in client.get("/library/quiz?kind=mc&path=notes.txt").data.decode()
+    assert "beta" in client.get("/library/quiz?kind=matching&path=notes.txt").data.decode()
+
+
+def test_bad_requests(app, library):
+    (library / "notes.txt").write_text("x", encoding="utf-8")
+    client = app.test_client()
+    for path in ("../../../x.txt", ".cache/notes.txt", "missing.txt", ""):
+        assert client.get(f"/library/quiz?kind=mc&path={path}").status_code == 404
+    assert client.get("/library/quiz?kind=nope&path=notes.txt").status_code == 400
+
+
+def test_docx_quiz_served_from_cache_after_wait(app, library):
+    make_docx(library / "deck.docx")
+    client = app.test_client()
+    wait_page_job(client.get("/library/quiz?kind=mc&path=deck.docx"))
+    resp = client.get("/library/quiz?kind=mc&path=deck.docx")
+    assert resp.status_code == 200 and '"four"' in resp.data.decode()
+
+
+def test_docx_quiz_when_cache_cannot_be_written(app, library):
+    make_docx(library / "deck.docx")
+    (library / ".cache").write_text("not a directory")  # запись кэша на диск падает
+    client = app.test_client()
+    job_id = wait_page_job(client.get("/library/quiz?kind=matching&path=deck.docx"))
+    resp = client.get(f"/library/quiz?kind=matching&path=deck.docx&job={job_id}")
+    assert resp.status_code == 200 and "Paris" in resp.data.decode()
+    # результат задачи не подходит к другому файлу / другой конвертации
+    make_docx(library / "other.docx")
+    assert client.get(f"/library/quiz?kind=matching&path=other.docx&job={job_id}").status_code == 202
+    assert client.get(f"/library/quiz?kind=quizz&path=deck.docx&job={job_id}").status_code == 202
+
+
+def test_cache_stats_count_misses_and_worker_conversions(app, library):
+    make_docx(library / "deck.docx")
+    client = app.test_client()
+    before = client.get("/library/cache_stats").get_json()["docx_lines"]
+    wait_page_job(client.get("/library/quiz?kind=mc&path=deck.docx"))
+    assert client.get("/library/quiz?kind=mc&path=deck.docx").status_code == 200
+    after = client.get("/library/cache_stats").get_json()["docx_lines"]
+    assert after["misses"] == before["misses"] + 1
+    assert after["disk_hits"] == before["disk_hits"] + 1
+    # конвертация прошла в процессе-воркере, её промах пришёл с результатом задачи
+    assert after["workers"]["misses"] == 1
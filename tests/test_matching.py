@@ -0,0 +1,60 @@
+import random
+import string
+
+import pytest
+
+from quiz_engine import AnswerSampler, answer_key
+from matching import build_matching_rows, parse_text_into_blocks, DISTRACTOR_MODES, MAX_OPTIONS
+
+
+def make_blocks(n_pairs, block_size=25, seed=0):
+    rnd = random.Random(seed)
+    lines = []
+    for i in range(n_pairs):
+        if i % block_size == 0:
+            lines.append(f"Block {i // block_size}")
+        words = ["".join(rnd.choice(string.ascii_lowercase) for _ in range(rnd.randint(3, 10)))
+                 for _ in range(rnd.randint(1, 4))]
+        right = " ".join(words).capitalize() if rnd.random() < 0.8 else str(rnd.randint(1000, 2100))
+        lines.append(f"term {i} ↔ {right}")
+    return parse_text_into_blocks("\n".join(lines))
+
+
+DUPLICATES = ("Dup\na ↔ Paris\nb ↔ paris \nc ↔ Paris\nd ↔ Rome\n"
+              "One\ne ↔ Rome\n"
+              "Rest\nf ↔ Oslo\ng ↔ Bern\nh ↔ OSLO")
+BLOCKS = {
+    "duplicates": parse_text_into_blocks(DUPLICATES),
+    "tiny": parse_text_into_blocks("a ↔ x\nb ↔ X\nc ↔ y"),
+    "empty": parse_text_into_blocks("Empty"),
+    "small blocks": make_blocks(500, block_size=3),
+}
+
+
+@pytest.mark.parametrize("distractors", DISTRACTOR_MODES)
+@pytest.mark.parametrize("name", BLOCKS)
+def test_correct_answer_and_its_duplicates_never_wrong(name, distractors):
+    blocks = BLOCKS[name]
+    unique = {answer_key(pair.right) for blk in blocks for pair in blk.pairs}
+    for blk in build_matching_rows(blocks, distractors, rng=random.Random(1)):
+        for row in blk["rows"]:
+            keys = [answer_key(o) for o in row["options"]]
+            assert keys.count(answer_key(row["correct"])) == 1, row
+            assert len(keys) == len(set(keys)), row
+            assert len(keys) == min(MAX_OPTIONS, len(unique)), row
+
+
+def test_duplicate_right_sides_differ_only_in_case_and_spaces():
+    sampler = AnswerSampler([(0, "Paris"), (0, "paris "), (0, "PARIS"), (1, "Rome")])
+    for _ in range(50):
+        assert sampler.sample("Paris", 3) == ["Rome"]
+
+
+def test_group_preference():
+    blocks = make_blocks(2000)
+    items = [(i, pair.right) for i, blk in enumerate(blocks) for pair in blk.pairs]
+    sampler = AnswerSampler(items, prefer=("group",))
+    for i, blk in enumerate(blocks[:20]):
+        own = {answer_key(pair.right) for pair in blk.pairs}
+        for pair in blk.pairs:
+            assert all(answer_key(w) in own for w in sampler.sample(pair.right, 3, group=i))
@@ -0,0 +1,179 @@
+import random
+import string
+import hashlib
+
+import pytest
+from bs4 import BeautifulSoup
+
+from quiz_engine import (DistractorSampler, hide_letters_html, pick_hidden_letters, hidden_letter_count,
+                         TOKEN_RE, WORD_GROUP, TokenStream, TokenStreamCache, token_cache, resolve_seed)
+from quizz import quizz_process
+
+
+def make_vocab(n, seed=0):
+    rnd = random.Random(seed)
+    vocab = set()
+    while len(vocab) < n:
+        w = "".join(rnd.choice(string.ascii_lowercase) for _ in range(rnd.randint(2, 12)))
+        vocab.add(w.capitalize() if rnd.random() < 0.2 else w)
+    return sorted(vocab)
+
+
+VOCABS = [["a"], ["a", "b"], ["a", "b", "c"], ["a", "B", "cc", "DD"], make_vocab(500)]
+
+
+@pytest.mark.parametrize("prefer", [None, "length", "case"])
+@pytest.mark.parametrize("vocab", VOCABS, ids=lambda v: f"{len(v)}words")
+def test_correct_word_never_returned(vocab, prefer):
+    sampler = DistractorSampler(vocab, prefer=prefer, rng=random.Random(1))
+    for correct in vocab + ["missing"]:
+        for k in (1, 2, 3):
+            wrongs = sampler.sample(correct, k)
+            assert correct not in wrongs
+            assert len(wrongs) == len(set(wrongs))
+            assert len(wrongs) == min(k, len(set(vocab) - {correct}))
+            assert set(wrongs) <= set(vocab)
+
+
+def test_single_word_vocab_has_no_distractors():
+    assert DistractorSampler(["only"]).sample("only", 2) == []
+
+
+def test_duplicate_words_do_not_repeat():
+    sampler = DistractorSampler(["a", "a", "b", "b", "c"])
+    assert sorted(sampler.sample("a", 5)) == ["b", "c"]
+
+
+def test_length_preference():
+    sampler = DistractorSampler(make_vocab(2000), prefer="length", rng=random.Random(2))
+    for _ in range(200):
+        assert [len(w) for w in sampler.sample("abcdefg", 2)] == [7, 7]
+
+
+def test_case_preference_falls_back_to_whole_vocab():
+    sampler = DistractorSampler(["Alpha", "beta", "gamma", "delta"], prefer="case", rng=random.Random(3))
+    wrongs = sampler.sample("Alpha", 2)
+    assert len(wrongs) == 2 and "Alpha" not in wrongs
+
+
+def test_same_rng_seed_gives_same_sample():
+    sampler = DistractorSampler(make_vocab(500))
+    first = [sampler.sample("x", 3, rng=random.Random(7)) for _ in range(3)]
+    assert first[0] == first[1] == first[2]
+
+
+def make_letters_html(n_words, seed=0):
+    rnd = random.Random(seed)
+    letters = "abcdefghijklmnopqrstuvwxyzабвгдежзиклмнопрстуфхцчшщыэюя"
+    paras, words = [], 0
+    while words < n_words:
+        k = min(rnd.randint(20, 80), n_words - words)
+        text = " ".join("".join(rnd.choice(letters) for _ in range(rnd.randint(1, 12))) for _ in range(k))
+        paras.append(f"<p>{text.capitalize()}, <b>bold part</b> &amp; end.</p>")
+        words += k + 4
+    return "".join(paras)
+
+
+def expected_hidden(html, prob):
+    text = BeautifulSoup(html, "html.parser").get_text()
+    return sum(hidden_letter_count(len(m.group()), prob)
+               for m in TOKEN_RE.finditer(text) if m.lastindex == WORD_GROUP)
+
+
+@pytest.mark.parametrize("prob", [0.2, 0.5, 0.8])
+def test_pick_hidden_letters(prob):
+    lengths = [1, 2, 3, 7, 12, 30] * 20
+    picked = pick_hidden_letters(lengths, prob, random.Random(1))
+    assert len(picked) == len(lengths)
+    for length, positions in zip(lengths, picked):
+        assert len(set(positions)) == len(positions) == hidden_letter_count(length, prob)
+        assert all(0 <= i < length for i in positions)
+    assert [list(p) for p in pick_hidden_letters(lengths, prob, random.Random(1))] == \
+        [list(p) for p in picked]
+
+
+def test_pick_hidden_letters_covers_all_positions():
+    counts = [0] * 5
+    for positions in pick_hidden_letters([5] * 2000, 0.2, random.Random(3)):
+        counts[positions[0]] += 1
+    assert min(counts) > 300
+
+
+@pytest.mark.parametrize("prob", [0.2, 0.8])
+def test_hide_letters_html(prob):
+    html = make_letters_html(2000)
+    out = hide_letters_html(html, prob, seed=1)
+    assert out.count("_") == expected_hidden(html, prob)
+    assert out == hide_letters_html(html, prob, seed=1)
+    assert out != hide_letters_html(html, prob, seed=2)
+    fill = hide_letters_html(html, prob, fill_mode=True, seed=1)
+    assert fill.count('class="fill-input"') == expected_hidden(html, prob)
+    assert len(BeautifulSoup(out, "html.parser").get_text()) == len(BeautifulSoup(html, "html.parser").get_text())
+
+
+def test_hide_letters_html_escapes_text():
+    assert hide_letters_html("<p>a &lt;b&gt; c</p>", seed=0) == \
+        '<p><span class="word">_</span> <span class="word">&lt;</span><span class="word">_</span>' \
+        '<span class="word">&gt;</span> <span class="word">_</span></p>'
+
+
+def doc(i, n_words=300):
+    return "".join(f"<p>word{i} {j} &amp; <b>bold</b></p>" for j in range(n_words))
+
+
+def test_token_cache_hit_returns_same_tokens():
+    cache = TokenStreamCache()
+    html = doc(0)
+    first = cache.get(html)
+    again = cache.get("".join([html[:10], html[10:]]))  # другой объект str, тот же текст
+    assert again is first
+    fresh = TokenStream(html)
+    assert (first.nodes, first.skeleton, first.words) == (fresh.nodes, fresh.skeleton, fresh.words)
+    assert cache.info()["hits"] == 1 and cache.info()["misses"] == 1
+
+
+def test_token_cache_key_is_sha256_of_html():
+    cache = TokenStreamCache()
+    cache.get(doc(0))
+    cache.get(doc(0) + " ")
+    assert list(cache._mem) == [hashlib.sha256(doc(0).encode("utf-8")).hexdigest(),
+                                hashlib.sha256((doc(0) + " ").encode("utf-8")).hexdigest()]
+    cache.get("<p>\ud800</p>")  # одиночный суррогат из формы не ломает ключ
+    assert cache.info()["entries"] == 3
+
+
+def test_token_cache_lru_eviction_by_size():
+    size = TokenStream(doc(0)).size
+    cache = TokenStreamCache(max_bytes=int(size * 2.5))
+    cache.get(doc(0))
+    cache.get(doc(1))
+    cache.get(doc(0))  # doc(1) теперь самый старый
+    cache.get(doc(2))
+    info = cache.info()
+    assert info["entries"] == 2 and info["evictions"] == 1 and info["bytes"] <= info["max_bytes"]
+    cache.get(doc(0))
+    assert cache.info()["hits"] == 2
+    cache.get(doc(1))
+    assert cache.info()["misses"] == 4
+
+
+def test_token_cache_skips_documents_larger_than_cache():
+    cache = TokenStreamCache(max_bytes=10)
+    assert cache.get(doc(0)).words
+    assert cache.info()["entries"] == 0 and cache.info()["bytes"] == 0
+
+
+@pytest.mark.parametrize("mode", ["multiple_choice", "missing_words_write", "missing_words_no_write"])
+def test_cached_quiz_same_as_fresh_parse(mode):
+    html = doc(5)
+    token_cache.clear()
+    cold = quizz_process(html, mode, 30, seed=7)
+    assert quizz_process(html, mode, 30, seed=7) == cold
+    assert quizz_process(html, mode, 30, seed=8) != cold
+    token_cache.clear()
+    assert hide_letters_html(html, 0.3, seed=7) == hide_letters_html(html, 0.3, seed=7)
+
+
+def test_resolve_seed():
+    assert resolve_seed(" 12 ") == 12
+    assert isinstance(resolve_seed("abc"), int) and isinstance(resolve_seed(None), int)
@@ -0,0 +1,46 @@
+import io
+
+import openpyxl
+import pytest
+
+from quiz_import import import_quiz, QuizImportError, QUIZ_COLUMNS
+
+
+def xlsx(rows, first_row=1, first_col=1):
+    """Книга, где таблица начинается с ячейки (first_row, first_col)."""
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    for r, row in enumerate(rows, start=first_row):
+        for c, value in enumerate(row, start=first_col):
+            ws.cell(row=r, column=c, value=value)
+    buf = io.BytesIO()
+    wb.save(buf)
+    buf.seek(0)
+    return buf
+
+
+def row_errors(fileobj, ext):
+    with pytest.raises(QuizImportError) as e:
+        import_quiz(fileobj, ext)
+    return str(e.value)
+
+
+def test_xlsx_row_numbers_after_leading_blank_rows():
+    rows = [QUIZ_COLUMNS, ("q1", "a", "b", "c", "d"), ("q2", "", "b", "c", "d")]
+    assert row_errors(xlsx(rows, first_row=4, first_col=2), ".xlsx") == "Row 6: empty Correct"
+
+
+def test_xlsx_header_below_title():
+    rows = [("Экзамен по анатомии",), (), QUIZ_COLUMNS, ("q1", "a", "b", "c", "d"), ("q2", "a", "b", "", "d")]
+    assert row_errors(xlsx(rows), ".xlsx") == "Row 5: empty Option2"
+    assert len(import_quiz(xlsx(rows[:4]), ".xlsx")) == 1
+
+
+def test_csv_row_numbers_after_preamble():
+    data = ("Вопросы к зачёту\n\n" + ",".join(QUIZ_COLUMNS) + "\nq1,a,b,c,d\n\nq3,a,,c,d\n").encode("utf-8")
+    assert row_errors(io.BytesIO(data), ".csv") == "Row 6: empty Option1"
+
+
+def test_missing_columns_reported_from_first_non_empty_row():
+    data = b"\nQuestion,Answer\nq,a\n"
+    assert row_errors(io.BytesIO(data), ".csv").startswith("Missing column(s): Correct, Option1")
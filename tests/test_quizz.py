@@ -0,0 +1,167 @@
+import re
+import html as html_lib
+import json
+import random
+
+import pytest
+from bs4 import BeautifulSoup
+from markupsafe import escape
+
+from quizz import quizz_process
+from quiz_engine import WordTable
+
+WORDS = ("neuron synapse cortex & <axon> dendrite glia \"myelin\" potential "
+         "receptor it's channel sodium").split()
+WRONGS_RE = re.compile(r' data-wrongs="[^"]*"')
+INLINE_RE = re.compile(r'<span class="mc-gap" data-correct="([^"]*)" data-wrongs="([^"]*)">')
+TABLE_RE = re.compile(r'<span class="mc-gap" data-c="(\d+)" data-w="([\d,]*)">')
+WORDS_RE = re.compile(r'<script type="application/json" id="quizWords">(.*?)</script>', re.S)
+MODES = ("multiple_choice", "missing_words_write", "missing_words_no_write")
+
+
+def _legacy_quizz_process(html, mode, hide_percent, chosen_words=None):
+    """Исходная реализация (до однопроходного движка)."""
+    soup = BeautifulSoup(html, "html.parser")
+    text_nodes = []
+    for node in soup.find_all(string=True):
+        raw = node
+        if raw.strip():
+            tokens = re.findall(r'\s+|[^\w\s]+|\w+', raw)
+            text_nodes.append((node, tokens))
+    all_words = []
+    for nodeIdx, (nd, toks) in enumerate(text_nodes):
+        for tokIdx, tok in enumerate(toks):
+            if re.match(r'^\w+$', tok):
+                all_words.append((nodeIdx, tokIdx, tok))
+    if hide_percent == "chosen":
+        chosen_set = set(w.strip().lower() for w in chosen_words.split(",") if w.strip()) if chosen_words else set()
+    else:
+        n_hide = int(len(all_words) * (hide_percent / 100.0)) if all_words else 0
+        indices = list(range(len(all_words)))
+        random.shuffle(indices)
+        hideSet = set(indices[:n_hide])
+    unique_words = set(w for (_, _, w) in all_words)
+    global_idx = 0
+    for nodeIdx, (nd, toks) in enumerate(text_nodes):
+        newToks = []
+        for tokIdx, tok in enumerate(toks):
+            if re.match(r'^\w+$', tok):
+                if hide_percent == "chosen":
+                    hide_this = tok.lower() in chosen_set
+                else:
+                    hide_this = global_idx in hideSet
+                if hide_this:
+                    if mode == "multiple_choice":
+                        inc = [w for w in unique_words if w != tok]
+                        wrongs = random.sample(inc, 2) if len(inc) > 2 else inc[:2]
+                        newToks.append(f'<span class="mc-gap" data-correct="{escape(tok)}" '
+                                       f'data-wrongs="{escape("|".join(wrongs))}">???</span>')
+                    elif mode == "missing_words_write":
+                        wlen = len(tok)
+                        newToks.append(f'<input type="text" class="fill-input" data-correct="{escape(tok)}" '
+                                       f'style="width:{max(wlen*1.3,5)}ch" maxlength="{wlen}">')
+                    else:
+                        newToks.append(f'<span class="hidden-word" data-original="{escape(tok)}" '
+                                       f'style="width:{max(len(tok)*1.3,4)}ch;"></span>')
+                else:
+                    newToks.append(escape(tok))
+                global_idx += 1
+            else:
+                newToks.append(escape(tok))
+        nd.replace_with(BeautifulSoup("".join(newToks), "html.parser"))
+    return str(soup)
+
+
+@pytest.fixture
+def legacy_quizz_process():
+    def run(html, mode, hide_percent, chosen_words=None, seed=42):
+        random.seed(seed)
+        # неправильные варианты теперь выбирает DistractorSampler — их не сравниваем
+        return WRONGS_RE.sub("", _legacy_quizz_process(html, mode, hide_percent, chosen_words))
+    return run
+
+
+def new_quizz_process(html, mode, hide_percent, chosen_words=None, seed=42):
+    return WRONGS_RE.sub("", quizz_process(html, mode, hide_percent, chosen_words, seed=seed))
+
+
+def make_html(n_words, seed=0):
+    rnd = random.Random(seed)
+    paras, words = [], 0
+    while words < n_words:
+        k = min(rnd.randint(20, 60), n_words - words)
+        ws = [rnd.choice(WORDS) for _ in range(k)]
+        ws[k // 2] = f"<b>{ws[k // 2]}</b>"
+        paras.append("<p>" + " ".join(ws) + ", end.</p>")
+        words += k
+    return "\n".join(paras)
+
+
+TEXT = make_html(500, seed=1) + "<ul><li>x &amp; y</li><li>'q' \"z\"</li></ul><br>"
+SCRIPT = "<script>if (1 < 2 && a > b) { neuron(); }</script>"
+STYLE = "<style>div > p { color: red } a[title=\"x&y\"] {}</style>"
+COMMENT = "<!-- neuron < cortex & glia -->"
+DOCTYPE = "<!DOCTYPE html>"
+
+
+@pytest.mark.parametrize("mode", MODES)
+@pytest.mark.parametrize("hide", [30, "chosen"])
+def test_same_output_as_legacy(legacy_quizz_process, mode, hide):
+    chosen = "neuron, Cortex" if hide == "chosen" else None
+    assert new_quizz_process(TEXT, mode, hide, chosen) == legacy_quizz_process(TEXT, mode, hide, chosen)
+
+
+@pytest.mark.parametrize("raw", [SCRIPT, STYLE], ids=["script", "style"])
+def test_script_and_style_same_as_legacy(legacy_quizz_process, raw):
+    html = "<p>neuron cortex</p>" + raw + "<p>glia</p>"
+    for mode in MODES:
+        assert new_quizz_process(html, mode, 0) == legacy_quizz_process(html, mode, 0)
+        assert raw in new_quizz_process(html, mode, 0)
+
+
+@pytest.mark.parametrize("raw", [SCRIPT, STYLE, COMMENT, DOCTYPE], ids=["script", "style", "comment", "doctype"])
+@pytest.mark.parametrize("mode", MODES)
+def test_raw_nodes_kept_verbatim_and_never_hidden(mode, raw):
+    text = "<p>neuron cortex glia</p>"
+    for hide, chosen in ((100, None), ("chosen", "neuron, cortex, glia")):
+        # слова внутри raw не считаются: остальной документ — как без него
+        out = quizz_process(raw + text, mode, hide, chosen, seed=1)
+        assert out.startswith(raw)
+        assert out.endswith(quizz_process(text, mode, hide, chosen, seed=1))
+
+
+def inline_answers(out):
+    return [(html_lib.unescape(c), html_lib.unescape(w).split("|")) for c, w in INLINE_RE.findall(out)]
+
+
+def table_answers(out, words):
+    return [(words[int(c)], [words[int(i)] for i in w.split(",") if i]) for c, w in TABLE_RE.findall(out)]
+
+
+WORD_TABLE_DOC = TEXT + "<p>A &amp; B &lt;tag&gt; \"quoted\" it's</p>"
+
+
+@pytest.mark.parametrize("pct", [30, 100])
+def test_word_table_gives_same_answers_as_inline(pct):
+    inline = quizz_process(WORD_TABLE_DOC, "multiple_choice", pct, seed=5)
+    table = WordTable()
+    compact = quizz_process(WORD_TABLE_DOC, "multiple_choice", pct, seed=5, word_table=table)
+    expected = inline_answers(inline)
+    assert len(expected) == inline.count('class="mc-gap"') > 0
+    assert table_answers(compact, json.loads(table.dumps())) == expected
+    for correct, wrongs in expected:
+        assert correct not in wrongs and len(set(wrongs)) == len(wrongs) == 2
+
+
+def test_quizz_page_word_table(app):
+    client = app.test_client()
+
+    def page(mc_output):
+        return client.post("/quizz", data={"input_text": WORD_TABLE_DOC, "mode": "multiple_choice",
+                                           "hide_percent": "30", "seed": "1",
+                                           "mc_output": mc_output}).data.decode("utf-8")
+
+    compact = page("table")
+    words = json.loads(WORDS_RE.search(compact).group(1))
+    expected = inline_answers(page("inline"))
+    assert expected and table_answers(compact, words) == expected
@@ -0,0 +1,74 @@
+import json
+import zlib
+import random
+
+import pytest
+
+from quizz import quizz_process
+from streaming import compress_response, COMPRESS_MIN_BYTES
+
+DECOMPRESS_WBITS = {"gzip": 16 + zlib.MAX_WBITS, "deflate": zlib.MAX_WBITS}
+
+
+def make_html(n_words, seed=0):
+    rnd = random.Random(seed)
+    words = ["neuron", "Cortex", "synapse", "axon", "Dendrite", "glia", "receptor", "signal"]
+    return "".join("<p>" + " ".join(rnd.choice(words) for _ in range(40)) + ", <b>bold</b>.</p>"
+                   for _ in range(n_words // 40))
+
+
+QUIZ_FORM = {"input_text": make_html(3000), "mode": "missing_words_write", "hide_percent": "30", "seed": "7"}
+
+
+@pytest.mark.parametrize("encoding", ["gzip", "deflate"])
+def test_streamed_page_compressed(app, encoding):
+    client = app.test_client()
+    plain = client.post("/quizz", data=QUIZ_FORM)
+    assert plain.is_streamed and "Content-Encoding" not in plain.headers
+    packed = client.post("/quizz", data=QUIZ_FORM, headers={"Accept-Encoding": encoding})
+    assert packed.is_streamed
+    assert packed.headers["Content-Encoding"] == encoding and "Content-Length" not in packed.headers
+    assert "Accept-Encoding" in packed.headers["Vary"]
+    chunks = list(packed.response)
+    assert len(chunks) > 1
+    # после каждого куска sync flush: первый кусок разжимается сам по себе
+    first = zlib.decompressobj(DECOMPRESS_WBITS[encoding]).decompress(chunks[0])
+    assert plain.data.startswith(first) and first
+    assert zlib.decompress(b"".join(chunks), DECOMPRESS_WBITS[encoding]) == plain.data
+    assert quizz_process(QUIZ_FORM["input_text"], "missing_words_write", 30, seed=7) in plain.data.decode("utf-8")
+
+
+def compressed(app, body, mimetype="text/html", status=200, encoding="gzip"):
+    with app.test_request_context(headers={"Accept-Encoding": encoding}):
+        return compress_response(app.response_class(body, status=status, mimetype=mimetype))
+
+
+def test_plain_response_compressed_above_threshold(app):
+    small = "x" * (COMPRESS_MIN_BYTES - 1)
+    assert "Content-Encoding" not in compressed(app, small).headers
+    big = "<p>" + "y" * COMPRESS_MIN_BYTES + "</p>"
+    for encoding in ("gzip", "deflate"):
+        resp = compressed(app, big, encoding=encoding)
+        assert resp.headers["Content-Encoding"] == encoding
+        assert zlib.decompress(resp.get_data(), DECOMPRESS_WBITS[encoding]).decode() == big
+    assert "Content-Encoding" not in compressed(app, b"\0" * 10_000, mimetype="image/png").headers
+    assert "Content-Encoding" not in compressed(app, big, status=404).headers
+
+
+def test_streamed_api_response_compressed(app):
+    client = app.test_client()
+    text = "\n".join(f"Question {i}?\n✓ - right {i}\n✗ - wrong {i}" for i in range(200))
+    plain = client.post("/mc_quiz_word/api", data={"input_text": text})
+    packed = client.post("/mc_quiz_word/api", data={"input_text": text}, headers={"Accept-Encoding": "gzip"})
+    assert packed.headers["Content-Encoding"] == "gzip"
+    # варианты перемешиваются при каждом запросе — сравниваем без порядка
+    questions = [json.loads(data)["questions"]
+                 for data in (plain.data, zlib.decompress(packed.data, DECOMPRESS_WBITS["gzip"]))]
+    assert [[q["text"], sorted(q["options"])] for q in questions[0]] == \
+        [[q["text"], sorted(q["options"])] for q in questions[1]]
+    assert len(questions[0]) == 200
+
+
+def test_errors_not_compressed(app):
+    resp = app.test_client().post("/mc_quiz_word/api", data={}, headers={"Accept-Encoding": "gzip"})
+    assert resp.status_code == 400 and "Content-Encoding" not in resp.headers
@@ -0,0 +1,158 @@
+import io
+import random
+import zipfile
+from xml.sax.saxutils import escape
+
+import docx
+import pytest
+
+from study_formats import (iter_blocks, iter_questions, iter_docx_paragraphs, iter_text_lines,
+                           ParseIssues, StudyFormatError)
+
+
+# ---------- прежние парсеры (matching.py / mc_quiz_word.py до переделки) ----------
+
+def legacy_blocks(lines):
+    blocks = []
+    current_block = {"title": None, "pairs": []}
+    for line in lines:
+        if "↔" in line:
+            left, right = line.split("↔", 1)
+            current_block["pairs"].append((left.strip(), right.strip()))
+        else:
+            if current_block["title"] or current_block["pairs"]:
+                blocks.append(current_block)
+            current_block = {"title": line, "pairs": []}
+    if current_block["title"] or current_block["pairs"]:
+        blocks.append(current_block)
+    return [(b["title"], b["pairs"]) for b in blocks]
+
+
+def legacy_questions(paragraphs):
+    out = []
+    i = 0
+    while i < len(paragraphs):
+        question = paragraphs[i]
+        i += 1
+        options = []
+        correct_answer = None
+        while i < len(paragraphs) and (paragraphs[i].startswith("✓") or paragraphs[i].startswith("✗")):
+            parts = paragraphs[i].split("-", 1)
+            if len(parts) == 2:
+                options.append(parts[1].strip())
+                if parts[0].strip().startswith("✓"):
+                    correct_answer = parts[1].strip()
+            i += 1
+        if question and options and correct_answer:
+            out.append((question, options, correct_answer))
+    return out
+
+
+def legacy_docx_lines(source):
+    return [p.text.strip() for p in docx.Document(source).paragraphs if p.text.strip()]
+
+
+def legacy_text_lines(text):
+    return [l.strip() for l in text.splitlines() if l.strip()]
+
+
+def new_blocks(lines):
+    return [(b.title, [(p.left, p.right) for p in b.pairs]) for b in iter_blocks(lines)]
+
+
+def new_questions(lines):
+    return [(q.text, [o.text for o in q.options], q.answer) for q in iter_questions(lines)]
+
+
+def make_lines(n, seed=0):
+    """Смесь форматов: блоки пар и вопросы с вариантами, иногда пустые строки."""
+    rnd = random.Random(seed)
+    lines = []
+    while len(lines) < n:
+        if rnd.random() < 0.5:
+            lines.append(f"Block {len(lines)}")
+            lines += [f"term {len(lines)} {i} ↔ definition {rnd.randint(0, 10**6)}" for i in range(rnd.randint(1, 8))]
+        else:
+            lines.append(f"Question {len(lines)}: pick {rnd.randint(0, 99)}?")
+            right = rnd.randint(0, 3)
+            lines += [f"{'✓' if i == right else '✗'} - answer {i} of {len(lines)}" for i in range(4)]
+        if rnd.random() < 0.1:
+            lines.append("")
+    return lines
+
+
+def make_docx_bytes(lines):
+    """Минимальный .docx (только word/document.xml) — python-docx слишком медленно пишет 300k абзацев."""
+    body = "".join(f'<w:p><w:r><w:t xml:space="preserve">{escape(l)}</w:t></w:r></w:p>' for l in lines)
+    xml = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+           '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+           f'<w:body>{body}<w:sectPr/></w:body></w:document>')
+    tmpl = docx.Document()
+    buf = io.BytesIO()
+    tmpl.save(buf)
+    out = io.BytesIO()
+    with zipfile.ZipFile(buf) as src, zipfile.ZipFile(out, "w", zipfile.ZIP_DEFLATED) as dst:
+        for item in src.infolist():
+            data = xml.encode("utf-8") if item.filename == "word/document.xml" else src.read(item)
+            dst.writestr(item, data)
+    return out.getvalue()
+
+
+def make_tricky_docx():
+    """Документ python-docx: таблица, табуляция, перенос строки, пустые абзацы, надпись-подобный текст."""
+    d = docx.Document()
+    d.add_paragraph("Capitals")
+    d.add_paragraph("France ↔ Paris")
+    p = d.add_paragraph("Tab\there ")
+    p.add_run().add_break()
+    p.add_run("↔ after break")
+    d.add_paragraph("")
+    table = d.add_table(rows=1, cols=2)
+    table.cell(0, 0).text = "Inside ↔ table"
+    d.add_paragraph("What is 2+2?")
+    d.add_paragraph("✗ - 3")
+    d.add_paragraph("✓ - 4")
+    d.add_paragraph("✓ no dash")
+    d.add_paragraph("Lonely heading")
+    buf = io.BytesIO()
+    d.save(buf)
+    return buf.getvalue()
+
+
+@pytest.fixture(scope="module")
+def lines():
+    return make_lines(2000)
+
+
+def test_docx_paragraphs_match_python_docx():
+    tricky = make_tricky_docx()
+    assert [line for _, line in iter_docx_paragraphs(io.BytesIO(tricky))] == \
+        legacy_docx_lines(io.BytesIO(tricky))
+
+
+def test_docx_parsers_match_legacy(lines):
+    data = make_docx_bytes(lines)
+    old = legacy_docx_lines(io.BytesIO(data))
+    assert [line for _, line in iter_docx_paragraphs(io.BytesIO(data))] == old
+    assert new_blocks(iter_docx_paragraphs(io.BytesIO(data))) == legacy_blocks(old)
+    assert new_questions(iter_docx_paragraphs(io.BytesIO(data))) == legacy_questions(old)
+
+
+def test_text_parsers_match_legacy(lines):
+    text = "\n".join(lines)
+    assert new_blocks(iter_text_lines(text)) == legacy_blocks(legacy_text_lines(text))
+    assert new_questions(iter_text_lines(text)) == legacy_questions(legacy_text_lines(text))
+
+
+def test_parse_issues():
+    issues = ParseIssues()
+    bad = "✓ - orphan\nQ1\n✗ - a\n✗ - b\nQ2\n✓ nodash\n✓ - yes\nT\nA ↔\n↔ B\nC ↔ D"
+    assert [q.text for q in iter_questions(iter_text_lines(bad), issues)] == ["Q2"]
+    assert [len(b.pairs) for b in iter_blocks(iter_text_lines(bad), issues)]
+    assert str(issues).startswith("Line 1: option before any question; Line 2: question has no ✓ option")
+    assert issues.count == 5
+
+
+def test_bad_docx():
+    with pytest.raises(StudyFormatError):
+        list(iter_docx_paragraphs(io.BytesIO(b"not a zip")))
@@ -0,0 +1,40 @@
+import io
+import os
+
+import pytest
+from werkzeug.datastructures import FileStorage
+
+from uploads import read_upload, UploadTooLarge
+
+
+def storage(name, data=b"data"):
+    return FileStorage(io.BytesIO(data), filename=name)
+
+
+@pytest.mark.parametrize("name, ext", [("Вопросы.xlsx", ".xlsx"), ("тест.CSV", ".csv"),
+                                       ("quiz.xlsx", ".xlsx"), ("без расширения", "")])
+def test_extension_from_original_name(name, ext):
+    assert read_upload(storage(name)).ext == ext
+
+
+def test_spooled_upload_keeps_extension_and_is_discarded():
+    upload = read_upload(storage("Вопросы.xlsx", b"x" * 4096), spool_bytes=1024)
+    assert upload.ext == ".xlsx" and upload.path.endswith(".xlsx")
+    with upload.open() as f:
+        assert f.read() == b"x" * 4096
+    path = upload.path
+    upload.discard()
+    upload.discard()
+    assert not os.path.exists(path)
+
+
+def test_too_large():
+    with pytest.raises(UploadTooLarge):
+        read_upload(storage("a.xlsx", b"x" * 100), max_bytes=10)
+
+
+def test_cyrillic_named_table_is_imported():
+    from quizz import excel_to_questions
+    data = "Question,Correct,Option1,Option2,Option3\nСтолица Франции?,Париж,Рим,Мадрид,Берлин\n".encode("utf-8")
+    questions = excel_to_questions(read_upload(storage("Вопросы.csv", data)))
+    assert len(questions) == 1 and "Париж" in questions[0]
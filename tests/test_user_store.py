@@ -0,0 +1,61 @@
+import json
+
+import os
+
+import user_store
+from user_store import UserStore, needs_rehash
+
+ITERATIONS = 1_000
+
+
+def write_legacy(path, n):
+    path.write_text(json.dumps({f"user{i}": {"password": f"pw{i}"} for i in range(n)}), encoding="utf-8")
+
+
+def stored_hash(store, username):
+    return store._conn().execute(
+        "SELECT password_hash FROM users WHERE username=?", (username,)).fetchone()[0]
+
+
+def test_legacy_import_hashes_at_full_cost_and_removes_plaintext(tmp_path):
+    legacy = tmp_path / "users.json"
+    write_legacy(legacy, 200)
+    store = UserStore(str(tmp_path / "users.db"), legacy_json=str(legacy), iterations=ITERATIONS)
+    assert not legacy.exists()
+    assert not needs_rehash(stored_hash(store, "user7"), ITERATIONS)
+    assert store.verify("user1", "pw1") and not store.verify("user1", "pw2")
+
+
+def test_legacy_file_removed_by_another_process(tmp_path, monkeypatch):
+    legacy = tmp_path / "users.json"
+    write_legacy(legacy, 3)
+    real_remove = os.remove
+
+    def remove_twice(path):
+        real_remove(path)
+        real_remove(path)
+
+    monkeypatch.setattr(user_store.os, "remove", remove_twice)
+    store = UserStore(str(tmp_path / "users.db"), legacy_json=str(legacy), iterations=ITERATIONS)
+    assert store.verify("user0", "pw0")
+
+
+def test_import_runs_once(tmp_path):
+    legacy = tmp_path / "users.json"
+    write_legacy(legacy, 3)
+    db = str(tmp_path / "users.db")
+    UserStore(db, legacy_json=str(legacy), iterations=ITERATIONS)
+    legacy.write_text(json.dumps({"late": {"password": "x"}}), encoding="utf-8")
+    store = UserStore(db, legacy_json=str(legacy), iterations=ITERATIONS)
+    assert not store.verify("late", "x")
+    assert store.verify("user0", "pw0")
+
+
+def test_cache_is_bounded(tmp_path):
+    store = UserStore(str(tmp_path / "users.db"), iterations=ITERATIONS, cache_size=5)
+    for i in range(20):
+        assert store.create(f"u{i}", "pw")
+    for i in range(20):
+        assert store.verify(f"u{i}", "pw")
+    assert len(store._cache) == 5
+    assert not store.create("u3", "other")
@@ -0,0 +1,94 @@
+import io
+import os
+import tempfile
+from werkzeug.utils import secure_filename
+
+# Загрузки для квизов (matching, mc_quiz_word, Excel в quizz) не сохраняются
+# в static/uploads: файл читается из потока запроса в память, а если он
+# больше UPLOAD_SPOOL_BYTES — во временный файл с уникальным именем.
+UPLOAD_MAX_BYTES = int(os.environ.get("UPLOAD_MAX_BYTES", str(20 * 1024 * 1024)))
+UPLOAD_SPOOL_BYTES = int(os.environ.get("UPLOAD_SPOOL_BYTES", str(4 * 1024 * 1024)))
+UPLOAD_TMP_DIR = os.environ.get("UPLOAD_TMP_DIR") or None  # None -> системный tmp
+
+CHUNK_SIZE = 64 * 1024
+
+
+class UploadTooLarge(Exception):
+    """Файл больше UPLOAD_MAX_BYTES."""
+
+
+class Upload:
+    """
+    Принятый файл: либо bytes в памяти, либо путь к временному файлу.
+    Объект сериализуется pickle, поэтому его можно передать в фоновую
+    задачу (jobs.submit_job); парсеры получают файловый объект через open().
+    """
+
+    def __init__(self, filename, data=None, path=None, size=0, ext=None):
+        self.filename = filename
+        self.data = data
+        self.path = path
+        self.size = size
+        # расширение из исходного имени: secure_filename выбрасывает не-ASCII,
+        # и от "Вопросы.xlsx" осталось бы "xlsx" без расширения
+        self.ext = ext if ext is not None else os.path.splitext(filename)[1].lower()
+
+    def open(self):
+        if self.path is not None:
+            return open(self.path, "rb")
+        return io.BytesIO(self.data)
+
+    def discard(self):
+        """Удаляем временный файл (для данных в памяти — ничего не делаем)."""
+        if self.path is not None:
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+            self.path = None
+        self.data = None
+
+
+def format_size(n):
+    return f"{n // (1024 * 1024)} MB" if n >= 1024 * 1024 else f"{n // 1024} KB"
+
+
+def read_upload(file_storage, max_bytes=None, spool_bytes=None):
+    """
+    Читаем FileStorage из request.files кусками.
+    До spool_bytes — в память, дальше — в уникальный временный файл.
+    Больше max_bytes -> UploadTooLarge (временный файл удаляется).
+    """
+    max_bytes = max_bytes or UPLOAD_MAX_BYTES
+    spool_bytes = UPLOAD_SPOOL_BYTES if spool_bytes is None else spool_bytes
+    filename = secure_filename(file_storage.filename or "")
+    ext = os.path.splitext(file_storage.filename or "")[1].lower()
+    buf = io.BytesIO()
+    tmp = None
+    size = 0
+    try:
+        while True:
+            chunk = file_storage.stream.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > max_bytes:
+                raise UploadTooLarge(f"File is larger than the {format_size(max_bytes)} limit")
+            if tmp is None and size > spool_bytes:
+                tmp = tempfile.NamedTemporaryFile(prefix="upload-", suffix=ext if ext[1:].isalnum() else "",
+                                                  dir=UPLOAD_TMP_DIR, delete=False)
+                tmp.write(buf.getbuffer())
+                buf = None
+            if tmp is not None:
+                tmp.write(chunk)
+            else:
+                buf.write(chunk)
+    except BaseException:
+        if tmp is not None:
+            tmp.close()
+            os.remove(tmp.name)
+        raise
+    if tmp is not None:
+        tmp.close()
+        return Upload(filename, path=tmp.name, size=size, ext=ext)
+    return Upload(filename, data=buf.getvalue(), size=size, ext=ext)
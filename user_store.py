@@ -0,0 +1,154 @@
+import os
+import json
+import sqlite3
+import threading
+from collections import OrderedDict
+from werkzeug.security import generate_password_hash, check_password_hash
+
+# Стоимость хэширования паролей (PBKDF2-SHA256, число итераций).
+# Больше — медленнее подбор, но и медленнее логин; меняется без миграции:
+# старые хэши пересчитываются при следующем успешном входе.
+PASSWORD_HASH_ITERATIONS = int(os.environ.get("PASSWORD_HASH_ITERATIONS", "600000"))
+
+# Сколько хэшей держим в памяти процесса (LRU)
+USER_CACHE_SIZE = 10_000
+
+
+def hash_password(password, iterations=None):
+    return generate_password_hash(
+        password, method=f"pbkdf2:sha256:{iterations or PASSWORD_HASH_ITERATIONS}")
+
+
+def needs_rehash(pwhash, iterations=None):
+    """True, если хэш посчитан с другой стоимостью (или другим методом)."""
+    return not pwhash.startswith(f"pbkdf2:sha256:{iterations or PASSWORD_HASH_ITERATIONS}$")
+
+
+class UserStore:
+    """
+    Пользователи в SQLite: поиск по первичному ключу username,
+    уникальность гарантирует сама база (INSERT без гонок между процессами).
+    Хэши паролей кэшируются в памяти процесса (LRU на cache_size записей);
+    кэш сбрасывается при записи. Отрицательные ответы не кэшируются —
+    пользователь мог появиться через другой процесс.
+    """
+
+    def __init__(self, path, legacy_json=None, iterations=None, cache_size=USER_CACHE_SIZE):
+        self.path = path
+        self.iterations = iterations
+        self.cache_size = cache_size
+        self._local = threading.local()
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("CREATE TABLE IF NOT EXISTS users ("
+                         " username TEXT PRIMARY KEY,"
+                         " password_hash TEXT NOT NULL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        if legacy_json:
+            self.import_json(legacy_json)
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _migrated(self, conn):
+        return conn.execute("SELECT 1 FROM meta WHERE key='migrated_from_json'").fetchone() is not None
+
+    def import_json(self, json_path):
+        """
+        Одноразовый перенос из старого users.json (пароли там в открытом виде),
+        сам файл после переноса удаляется, чтобы пароли не лежали на диске.
+        Хэши — с полной стоимостью, и считаются до BEGIN IMMEDIATE: лок базы
+        держится только на вставку. Если другой процесс успел перенести раньше,
+        посчитанное просто выбрасываем.
+        """
+        if not os.path.exists(json_path):
+            return 0
+        conn = self._conn()
+        users = {}
+        if not self._migrated(conn):
+            with open(json_path, 'r', encoding='utf-8') as f:
+                users = json.load(f)
+            rows = [(username, hash_password(info["password"], self.iterations))
+                    for username, info in users.items()]
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if self._migrated(conn):
+                    users = {}
+                else:
+                    conn.executemany(
+                        "INSERT OR IGNORE INTO users(username, password_hash) VALUES (?, ?)", rows)
+                    conn.execute("INSERT INTO meta(key, value) VALUES ('migrated_from_json', ?)",
+                                 (os.path.abspath(json_path),))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        try:
+            os.remove(json_path)
+        except FileNotFoundError:
+            pass  # удалил другой процесс
+        self._invalidate()
+        return len(users)
+
+    def _invalidate(self, username=None):
+        with self._cache_lock:
+            if username is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(username, None)
+
+    def _get_hash(self, username):
+        with self._cache_lock:
+            pwhash = self._cache.get(username)
+            if pwhash is not None:
+                self._cache.move_to_end(username)
+                return pwhash
+        row = self._conn().execute(
+            "SELECT password_hash FROM users WHERE username=?", (username,)).fetchone()
+        if not row:
+            return None
+        with self._cache_lock:
+            self._cache[username] = row[0]
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return row[0]
+
+    def create(self, username, password):
+        """Регистрируем пользователя; False, если имя уже занято."""
+        pwhash = hash_password(password, self.iterations)
+        try:
+            with self._conn() as conn:
+                conn.execute("INSERT INTO users(username, password_hash) VALUES (?, ?)",
+                             (username, pwhash))
+        except sqlite3.IntegrityError:
+            return False
+        finally:
+            self._invalidate(username)
+        return True
+
+    def set_password(self, username, password):
+        pwhash = hash_password(password, self.iterations)
+        with self._conn() as conn:
+            conn.execute("UPDATE users SET password_hash=? WHERE username=?", (pwhash, username))
+        self._invalidate(username)
+
+    def verify(self, username, password):
+        """Проверяем пароль; хэш со старой стоимостью сразу пересчитываем."""
+        pwhash = self._get_hash(username)
+        if not pwhash or not check_password_hash(pwhash, password):
+            return False
+        if needs_rehash(pwhash, self.iterations):
+            self.set_password(username, password)
+        return True